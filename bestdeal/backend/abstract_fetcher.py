@@ -1,9 +1,17 @@
-import re
 import time
-from bestdeal.core.more_exceptions import SkipTweet
-from bestdeal.core.pricedatabase import PriceDatabase
+import threading
+import concurrent.futures
+from bestdeal.core.more_exceptions import SkipTweet, PageNotModified
+from bestdeal.core.cycle_summary import CycleSummary, PageMetrics
+from bestdeal.core.metrics import CommandMetrics, MetricsRegistry, MetricsServer, default_command_metrics, default_metrics_registry
+from bestdeal.core.classifier import ProductClassifier, ClassificationStore, get_token_matcher, compute_rules_version
+from bestdeal.core.storage import PriceStorage
 from abc import ABCMeta, abstractmethod
 from bestdeal.core.source import Source
+from bestdeal.core.fetch_pool import FetchPool
+from bestdeal.core.scheduler import AdaptiveScheduler
+from bestdeal.core.stream_writer import StreamingWriter
+from pymongo.write_concern import WriteConcern
 from typing import Optional, Dict, Tuple, List, Iterable
 from loguru import logger
 from bestdeal.core.toolbox import convert_datetime_to_date
@@ -11,27 +19,69 @@ from bestdeal.core.toolbox import get_north_east_arrow
 from bestdeal.core.toolbox import get_south_east_arrow
 from bestdeal.core.toolbox import get_rightwards_arrow
 from bestdeal.core.toolbox import get_today_date, get_today_datetime, get_yesterday_date
-from bestdeal.core.publish import tweet
+from bestdeal.core.publish import Publisher, TwitterPublisher, PublishQueue
 
 
 class AbstractFetcher:
     __metaclass__ = ABCMeta
 
-    def __init__(self, database: Optional[PriceDatabase]):
+    def __init__(self, database: Optional[PriceStorage]):
         """
-        database: PriceDatabase object to access database
-        wait_in_seconds: waiting time before two scans
+        database: PriceStorage object to access database (PriceDatabase or SqlitePriceDatabase)
+        name: identifies the fetcher in scheduler, metrics and cycle reports (class name by default)
+        wait_in_seconds: waiting time before two scans, or duration of a scheduled cycle when adaptive_schedule is set
+        adaptive_schedule: continuous_watch fetches every page when it comes due instead of scanning every page then sleeping
+        scheduler: next due time of every page, adapted to its price changes and failures (created on first use)
         fetch_prices: scrap data from vendors
         display_lowest: display lowest prices for all product types
         tweet_products: publish on Twitter lowest prices
         yesterday_rate_throttle: tweet only if price rate is greater than throttle
+        concurrent_fetch: fetch every source urls in parallel
+        max_fetch_workers: maximum number of fetches in flight
+        max_requests_per_host: maximum number of requests in flight for a single vendor host
+        classification_store: persist classifications between restarts (optional)
+        classification_cache_size: maximum number of classifications kept in memory
+        classifier: memoized _extract_product_data
+        write_batch_size: maximum number of posts per bulk write
+        write_concern: write concern of posts bulk writes (collection default when None)
+        max_pending_write_batches: scraping waits when this many batches are not written yet
+        cheapest_posts_by_day: cheapest post per product type by day, reset on each cycle
+        publisher: where tweets are published (Twitter when None, StubPublisher for tests and benchmarks)
+        publish_queue: publishes tweets from a background thread, created on first tweet
+        metrics_registry: receives the report of every cycle
+        metrics_port: continuous_watch serves metrics of the registry on this port (disabled when None)
+        stop_event: set by stop() to end continuous_watch from another thread
         """
         self.database = database
+        self.name = type(self).__name__
         self.wait_in_seconds = 900
+        self.adaptive_schedule = True
+        self.scheduler: Optional[AdaptiveScheduler] = None
         self.fetch_prices = True
         self.display_lowest = True
         self.tweet_products = True
         self.yesterday_rate_throttle = 1.5
+        self.concurrent_fetch = True
+        self.max_fetch_workers = 8
+        self.max_requests_per_host = 2
+        self.fetch_pool: Optional[FetchPool] = None
+        # A pool given by Runner is shared and shut down by Runner
+        self._own_fetch_pool = False
+        # Sources are kept between cycles to remember page validators
+        self.sources: Dict[type(Source), Source] = {}
+        self.cycle_summary = CycleSummary()
+        self.classification_store: Optional[ClassificationStore] = None
+        self.classification_cache_size = 4096
+        self.classifier: Optional[ProductClassifier] = None
+        self.write_batch_size = 500
+        self.write_concern: Optional[WriteConcern] = None
+        self.max_pending_write_batches = 4
+        self.cheapest_posts_by_day: Dict[str, Dict[str, dict]] = {}
+        self.publisher: Optional[Publisher] = None
+        self.publish_queue: Optional[PublishQueue] = None
+        self.metrics_registry: MetricsRegistry = default_metrics_registry
+        self.metrics_port: Optional[int] = None
+        self.stop_event = threading.Event()
 
     @abstractmethod
     def _get_source_product_urls(self) -> Dict[type(Source), Dict[str, str]]:
@@ -45,9 +95,38 @@ class AbstractFetcher:
     def _get_tweeted_product_types(self) -> List[str]:
         pass
 
-    def _retrieve_cheapest(self, product_type: str, timestamp_regex: Optional[str]):
+    def _get_classification_rules(self) -> dict:
+        """
+        Tables read by _extract_product_data, cached classifications are invalidated when they change
+        """
+        return {}
+
+    def _get_classifier(self) -> ProductClassifier:
+        if self.classifier is None:
+            self.classifier = ProductClassifier(self._extract_product_data,
+                                                max_size=self.classification_cache_size,
+                                                namespace=type(self).__name__,
+                                                version=compute_rules_version(self._get_classification_rules()),
+                                                store=self.classification_store)
+        return self.classifier
+
+    def _get_cheapest_posts(self, day: str) -> Dict[str, dict]:
+        """
+        One query per day for every product type, shared by the report and tweets of a cycle
+        """
+        if day not in self.cheapest_posts_by_day:
+            self.cheapest_posts_by_day[day] = self.database.find_cheapest_per_product_type(day)
+        return self.cheapest_posts_by_day[day]
+
+    def _retrieve_cheapest(self, product_type: str, day: Optional[str]):
         try:
-            cheapest_post = self.database.find_cheapest(product_type, timestamp_regex)
+            if day is None:
+                cheapest_post = self.database.find_cheapest(product_type, day)
+            else:
+                cheapest_post = self._get_cheapest_posts(day).get(product_type)
+                if cheapest_post is None:
+                    # TODO: implement specific exception
+                    raise Exception(f"Missing cheapest [{product_type}]")
             name = cheapest_post["product_name"]
             brand = cheapest_post["product_brand"]
             price = float(cheapest_post["product_price"])
@@ -89,20 +168,45 @@ class AbstractFetcher:
         logger.debug(f"Tweeting [{tweet_text}]")
         return tweet_text
 
+    def _get_publish_queue(self) -> PublishQueue:
+        if self.publish_queue is None:
+            if self.publisher is None:
+                self.publisher = TwitterPublisher()
+            self.publish_queue = PublishQueue(self.publisher, on_published=self._record_tweet)
+        return self.publish_queue
+
+    def _record_tweet(self, key: Tuple[str, str]) -> None:
+        product_type, day = key
+        self.database.insert_tweet_status(product_type, day)
+
+    def _close_publish_queue(self) -> None:
+        if self.publish_queue is not None:
+            self.publish_queue.close()
+            self.publish_queue = None
+
     def _tweet_products(self):
+        """
+        Format every tweet of the cycle then queue them, publication does not block the next cycle
+        """
+        today_date = get_today_date()
+        publish_queue = self._get_publish_queue()
+        # One tweet per day.
+        tweeted_product_types = set(self.database.find_tweeted_product_types(today_date))
         for product_type in self._get_tweeted_product_types():
+            if product_type in tweeted_product_types or publish_queue.is_pending((product_type, today_date)):
+                logger.info(f"A tweet has been already created today for [{product_type}], skipping.")
+                continue
+            if publish_queue.is_abandoned((product_type, today_date)):
+                logger.debug(f"Tweet for [{product_type}] has been abandoned today, skipping.")
+                continue
             try:
-                # One tweet per day.
-                if not self.database.tweet_exists(product_type):
-                    tweet_text = self._format_cheapest_product_tweet(product_type)
-                    tweet(tweet_text)
-                    self.database.insert_tweet_status(product_type)
-                else:
-                    logger.info(f"A tweet has been already created today for [{product_type}], skipping.")
+                tweet_text = self._format_cheapest_product_tweet(product_type)
             except SkipTweet:
                 continue
             except Exception as exception:
                 logger.exception(exception)
+                continue
+            publish_queue.submit((product_type, today_date), tweet_text)
 
     @staticmethod
     def _compute_evolution_rate(today_price: Optional[float], reference_price: Optional[float]) -> float:
@@ -143,21 +247,58 @@ class AbstractFetcher:
             logger.warning(f"Unable to compute statistics for [{product_type}] [{filter_date}]. Exception [{exception}]")
             return None, None
 
-    def main_loop(self):
-        try:
-            # self.database.delete_price_anomalies()
-            if self.fetch_prices:
-                self._scrap_and_store()
-            if self.display_lowest:
-                self._display_best_deals()
-            if self.tweet_products:
-                self._tweet_products()
-        except Exception as exception:
-            logger.exception(exception)
+    def main_loop(self, deadline: Optional[float] = None):
+        """
+        deadline: when given (time.monotonic), pages are fetched as they come due until deadline
+        otherwise every page is fetched once
+        """
+        self.cheapest_posts_by_day.clear()
+        self.cycle_summary = CycleSummary()
+        stage_timer = self.cycle_summary.stage_timer
+        # Database commands of this fetcher only, other categories of the process run their own cycles
+        with default_command_metrics.scoped(self.name):
+            commands_before = default_command_metrics.snapshot(self.name)
+            try:
+                # self.database.delete_price_anomalies()
+                if self.fetch_prices:
+                    self._scrap_and_store(deadline)
+                if self.display_lowest:
+                    with stage_timer.measure("report"):
+                        self._display_best_deals()
+                if self.tweet_products:
+                    with stage_timer.measure("tweet"):
+                        self._tweet_products()
+            except Exception as exception:
+                logger.exception(exception)
+            self._finish_cycle(commands_before)
+
+    def _finish_cycle(self, commands_before: dict) -> None:
+        """
+        Log the cycle summary, publish its report to the metrics registry and store it alongside prices
+        """
+        summary = self.cycle_summary
+        if self.database is not None:
+            summary.database_commands = CommandMetrics.difference(default_command_metrics.snapshot(self.name),
+                                                                  commands_before,
+                                                                  self.database.get_collection_names())
+        summary.log()
+        report = summary.to_report(self.name)
+        self.metrics_registry.update(report)
+        if self.database is not None:
+            try:
+                self.database.insert_cycle_report(report)
+            except Exception as exception:
+                logger.warning(f"Unable to store cycle report. Reason [{exception}]")
 
     def continuous_watch(self):
-        while 1:
+        metrics_server = None
+        if self.metrics_port is not None:
+            metrics_server = MetricsServer(self.metrics_registry, port=self.metrics_port).start()
+        while not self.stop_event.is_set():
             try:
+                if self.adaptive_schedule:
+                    self.main_loop(deadline=time.monotonic() + self.wait_in_seconds)
+                    continue
                 self.main_loop()
             except KeyboardInterrupt:
                 logger.info("Stopping gracefully...")
@@ -165,12 +306,23 @@ class AbstractFetcher:
 
             try:
                 logger.info(f"Waiting [{self.wait_in_seconds}] seconds until next deal watch")
-                time.sleep(self.wait_in_seconds)
+                self.stop_event.wait(self.wait_in_seconds)
             except KeyboardInterrupt:
                 logger.info("Stopping gracefully...")
                 break
+        self._close_publish_queue()
+        self._close_sources()
+        self._close_fetch_pool()
+        if metrics_server is not None:
+            metrics_server.stop()
+
+    def stop(self) -> None:
+        """
+        continuous_watch returns once fetches in flight are stored
+        """
+        self.stop_event.set()
 
-    def _scrap_and_store(self):
+    def _scrap_and_store(self, deadline: Optional[float] = None):
         """
         Example:
         source_class = TopAchat
@@ -181,65 +333,235 @@ class AbstractFetcher:
             logger.warning("Database is not available.")
             return
 
-        posts = []
+        stage_timer = self.cycle_summary.stage_timer
+        classifier = self._get_classifier()
+        # Latest price of the day for every product, loaded once per cycle
+        with stage_timer.measure("load_last_prices"):
+            last_prices = self.database.find_last_prices(get_today_date())
+        # Posts are written by bounded batches while next vendors are scraped
+        writer = StreamingWriter(self.database,
+                                 batch_size=self.write_batch_size,
+                                 write_concern=self.write_concern,
+                                 max_pending_batches=self.max_pending_write_batches)
+        pages = self._scrap_all_products() if deadline is None else self._scrap_due_products(deadline)
+        stored = False
+        try:
+            for source, page_metrics, deals in pages:
+                if deals:
+                    self._store_deals(source, page_metrics, deals, last_prices, writer)
+            stored = True
+        finally:
+            pages.close()
+            if not stored:
+                # Validators are remembered once a page is parsed, its deals would be skipped as unchanged
+                self._forget_pages()
+            self._close_writer(writer)
+
+        if not self.cycle_summary.inserted_posts and not self.cycle_summary.unacknowledged_posts:
+            logger.info("Nothing to insert")
+        else:
+            # Readers drop cached results of today
+            self.database.record_cycle(get_today_datetime(), self.cycle_summary.inserted_posts)
+        classifier.save()
+        classifier.log_statistics()
+
+    def _store_deals(self,
+                     source: Source,
+                     page_metrics: PageMetrics,
+                     deals: Dict[str, str],
+                     last_prices: Dict[str, float],
+                     writer: StreamingWriter) -> None:
+        """
+        Classify deals of one page and queue a post for every new price
+        """
+        classifier = self._get_classifier()
+        stage_timer = self.cycle_summary.stage_timer
+        misses_before = classifier.misses
+        for product_name, product_price in deals.items():
+            with stage_timer.measure("classify"):
+                brand, product_type = classifier.classify(product_name)
+
+            if product_type is None:
+                page_metrics.unclassified_count += 1
+                continue
+
+            last_price = last_prices.get(product_name)
+            if last_price == float(product_price):
+                continue
+
+            if last_price is not None:
+                logger.info(f"New price for [{product_name}] [{product_price}] (previous [{last_price}])")
+            else:
+                logger.info(f"First today price for [{product_name}] [{product_price}]")
+            last_prices[product_name] = float(product_price)
+
+            post = {"product_name": product_name,
+                    "product_brand": brand,
+                    "product_type": product_type,
+                    "product_price": float(product_price),
+                    "source": source.source_name,
+                    "url": page_metrics.url,
+                    "timestamp": get_today_datetime()}
+            writer.add(post)
+            page_metrics.new_posts += 1
+        page_metrics.classification_misses = classifier.misses - misses_before
+        # Written while next pages are processed, a later failure does not lose this page
+        writer.flush(source.source_name)
+
+    def _close_writer(self, writer: StreamingWriter) -> None:
+        try:
+            with self.cycle_summary.stage_timer.measure("wait_writes"):
+                self.cycle_summary.write_batches = writer.close()
+            for batch in self.cycle_summary.write_batches:
+                self.cycle_summary.stage_timer.add("write", batch.latency)
+        except Exception:
+            # Pages must be parsed again next cycle, otherwise their prices would be lost
+            self._forget_pages()
+            raise
+        finally:
+            self.cycle_summary.inserted_posts = writer.written_count
+            self.cycle_summary.unacknowledged_posts = writer.unacknowledged_count
+
+    def _get_source(self, source_class: type(Source)) -> Source:
+        if source_class not in self.sources:
+            self.sources[source_class] = source_class()
+        return self.sources[source_class]
+
+    def _close_sources(self) -> None:
+        """
+        Sources keep their page validators, only their threads are stopped
+        """
+        for source in self.sources.values():
+            source.close()
+
+    def _forget_pages(self) -> None:
+        for source in self.sources.values():
+            source.page_states.clear()
+
+    def _get_fetch_pool(self) -> FetchPool:
+        if self.fetch_pool is None:
+            self.fetch_pool = FetchPool(self.max_fetch_workers, self.max_requests_per_host)
+            self._own_fetch_pool = True
+        return self.fetch_pool
+
+    def _close_fetch_pool(self) -> None:
+        if self._own_fetch_pool:
+            self.fetch_pool.shutdown()
+            self.fetch_pool = None
+            self._own_fetch_pool = False
+
+    def _scrap_all_products(self) -> Iterable[Tuple[Source, PageMetrics, Optional[Dict[str, str]]]]:
+        """
+        Fetch deals for every product of every source.
+        Results are yielded in _get_source_product_urls order whether fetches run concurrently or not,
+        so the caller starts processing the first vendor while the others are still downloading.
+        """
+        jobs = []
         for source_class, product_url_mapping in self._get_source_product_urls().items():
             logger.debug(f"Processing source [{source_class}]")
-            source = source_class()
+            source = self._get_source(source_class)
+            for product, url in product_url_mapping.items():
+                jobs.append((source, PageMetrics(source.source_name, product, url)))
+
+        if not self.concurrent_fetch:
+            for source, page_metrics in jobs:
+                yield source, page_metrics, self._scrap_product(source, page_metrics)
+            return
+
+        fetch_pool = self._get_fetch_pool()
+        futures = []
+        for source, page_metrics in jobs:
+            source.host_limiter = fetch_pool.host_limiter
+            futures.append(fetch_pool.submit(self._scrap_product, source, page_metrics))
+        for (source, page_metrics), future in zip(jobs, futures):
+            yield source, page_metrics, future.result()
 
-            # Scrap every available products for current source
+    def _get_scheduler(self) -> AdaptiveScheduler:
+        if self.scheduler is None:
+            self.scheduler = AdaptiveScheduler(initial_interval=self.wait_in_seconds)
+        return self.scheduler
+
+    def _scrap_due_products(self, deadline: float) -> Iterable[Tuple[Source, PageMetrics, Optional[Dict[str, str]]]]:
+        """
+        Fetch every page when it comes due until deadline, results are yielded as fetches complete.
+        Pages are fetched one at a time in the calling thread when concurrent_fetch is disabled.
+        A page is reported to the scheduler once the caller processed its deals (new prices shorten its interval).
+        """
+        scheduler = self._get_scheduler()
+        group = self.name
+        pages = {}
+        for source_class, product_url_mapping in self._get_source_product_urls().items():
+            source = self._get_source(source_class)
             for product, url in product_url_mapping.items():
-                deals = self._scrap_product(source, product, url)
-                if not deals:
-                    continue
+                pages[(source.source_name, product)] = (source, url)
+        scheduler.sync(group, pages)
 
-                # Create posts to insert in mongodb
-                for product_name, product_price in deals.items():
-                    brand, product_type = self._extract_product_data(product_name)
-
-                    if product_type is None:
-                        continue
-
-                    try:
-                        last_update = self.database.find_last_price(product_name, get_today_date())
-                        last_price = last_update["product_price"]
-                        if last_price == float(product_price):
-                            continue
-                        previous_today_price = f"(previous [{last_price}])"
-                    except Exception:
-                        """ First price of the day """
-                        previous_today_price = None
-
-                    if previous_today_price:
-                        logger.info(f"New price for [{product_name}] [{product_price}] {previous_today_price}")
-                    else:
-                        logger.info(f"First today price for [{product_name}] [{product_price}]")
-
-                    post = {"product_name": product_name,
-                            "product_brand": brand,
-                            "product_type": product_type,
-                            "product_price": float(product_price),
-                            "source": source.source_name,
-                            "url": url,
-                            "timestamp": get_today_datetime()}
-                    posts.append(post)
-                    #logger.debug(post)
-
-        if posts:
-            self.database.bulk_insert(posts)
-        else:
-            logger.info("Nothing to insert")
+        in_flight = {}
+        try:
+            while True:
+                remaining_seconds = 0. if self.stop_event.is_set() else deadline - time.monotonic()
+                if remaining_seconds > 0.:
+                    for key in scheduler.pop_due(group):
+                        source, url = pages[key]
+                        page_metrics = PageMetrics(source.source_name, key[1], url)
+                        in_flight[self._submit_fetch(source, page_metrics)] = (key, source, page_metrics)
+                    delay = scheduler.get_delay(group)
+                    timeout = remaining_seconds if delay is None else min(delay, remaining_seconds)
+                elif in_flight:
+                    # Deadline reached, wait for fetches in flight
+                    timeout = None
+                else:
+                    break
+                if not in_flight:
+                    self.stop_event.wait(timeout)
+                    continue
+                done, _ = concurrent.futures.wait(in_flight, timeout=timeout, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    key, source, page_metrics = in_flight[future]
+                    yield source, page_metrics, future.result()
+                    del in_flight[future]
+                    scheduler.report(group, key,
+                                     changed=page_metrics.new_posts > 0,
+                                     failed=page_metrics.status == PageMetrics.FAILED)
+        finally:
+            # Results not processed, pages are fetched again after their current interval
+            for key, _, _ in in_flight.values():
+                scheduler.release(group, key)
+        scheduler.log_statistics(group)
+
+    def _submit_fetch(self, source: Source, page_metrics: PageMetrics) -> concurrent.futures.Future:
+        """
+        Fetch in the fetch pool, or right away in the calling thread when concurrent_fetch is disabled
+        """
+        if self.concurrent_fetch:
+            fetch_pool = self._get_fetch_pool()
+            source.host_limiter = fetch_pool.host_limiter
+            return fetch_pool.submit(self._scrap_product, source, page_metrics)
+        future = concurrent.futures.Future()
+        try:
+            future.set_result(self._scrap_product(source, page_metrics))
+        except Exception as exception:
+            future.set_exception(exception)
+        return future
 
-    def _scrap_product(self, source: Source, product: str, url: str) -> Dict[str, str]:
+    def _scrap_product(self, source: Source, page_metrics: PageMetrics) -> Dict[str, str]:
         """
         Fetch deals for ONE product (one url)
         :return: Dict["product_name"] = "product_price"
         """
         deals = None
+        product = page_metrics.product
         logger.info(f'Fetch [{product}] deals from [{source.source_name}]')
         try:
-            deals = source.fetch_deals(product, url)
+            deals = source.fetch_deals(product, page_metrics.url, page_metrics)
+            page_metrics.status = PageMetrics.FETCHED
+        except PageNotModified as exception:
+            logger.info(f'Skip [{product}] deals from [{source.source_name}]. Reason [{exception}]')
+            page_metrics.status = PageMetrics.UNCHANGED
         except Exception as exception:
             logger.warning('Failed to fetch deals for [{}]. Reason [{}]'.format(source.source_name, exception))
+            page_metrics.status = PageMetrics.FAILED
+        self.cycle_summary.add_page(page_metrics)
         return deals
 
     def _display_best_deals(self) -> None:
@@ -249,44 +571,23 @@ class AbstractFetcher:
 
         today_date = get_today_date()
         logger.info(f"Best deals for [{today_date}]")
-        cheapest_products = []
-        for product_type in self.database.find_distinct_product_types():
-            try:
-                cheapest = self.database.find_cheapest(product_type, today_date)
-                cheapest_products.append(cheapest)
-            except Exception as exception:
-                logger.warning(exception)
-                continue
-        max_lengths = {}
+        cheapest_posts = self._get_cheapest_posts(today_date)
+        cheapest_products = [cheapest_posts[product_type] for product_type in sorted(cheapest_posts)]
+        max_lengths = dict.fromkeys(["product_type", "product_price", "product_name", "source"], 0)
         for product in cheapest_products:
-            for key, value in product.items():
-                max_lengths.setdefault(key, 0)
-                max_lengths[key] = max(max_lengths[key], len(str(value)))
+            for key in max_lengths:
+                max_lengths[key] = max(max_lengths[key], len(str(product[key])))
+        template = 'Cheapest [{product_type:' + str(max_lengths['product_type']) + '}] ' \
+                   '[{product_price:' + str(max_lengths['product_price']) + '}]€' \
+                   '[{product_name:' + str(max_lengths['product_name']) + '}] ' \
+                   '[{source:' + str(max_lengths['source']) + '}]'
         for product in cheapest_products:
-            template = 'Cheapest [{product_type:' + str(max_lengths['product_type']) + '}] ' \
-                       '[{product_price:' + str(max_lengths['product_price']) + '}]€' \
-                       '[{product_name:' + str(max_lengths['product_name']) + '}] ' \
-                       '[{source:' + str(max_lengths['source']) + '}]'
             logger.info(template.format(**product))
 
     @staticmethod
     def find_exactly_one_element(pattern_data: Iterable, raw_data: str) -> Optional[str]:
         """
         Search a pattern_data among raw_data
+        Compiled patterns are cached, prefer a TokenMatcher built once for fixed tables.
         """
-        result = None
-        refined_pattern_tokens = []
-        at_least_one_space = r'\s{1,}'
-        # Build search pattern for " Tixxx" or "2070SUPER " (there must be at least one space)
-        # Avoid to gather "xxxxxTIxxxx"
-        for pattern_token in pattern_data:
-            refined_pattern_tokens.append(f'{at_least_one_space}{pattern_token}')
-            refined_pattern_tokens.append(f'{pattern_token}{at_least_one_space}')
-        pattern = r"{}".format('|'.join(refined_pattern_tokens))
-        parsed = re.findall(pattern, raw_data, re.IGNORECASE)
-        parsed = list(set(map(lambda x: x.strip().upper(), parsed)))
-        if len(parsed) > 1:
-            logger.warning(f'Parsed data is wrong [{parsed}]')
-        elif parsed:
-            result = parsed[0]
-        return result
+        return get_token_matcher(tuple(pattern_data)).find_exactly_one(raw_data)
@@ -8,12 +8,28 @@ from bestdeal.sources.cybertek import Cybertek
 from bestdeal.sources.ldlc import LDLC
 from bestdeal.sources.pcw import PCW
 from bestdeal.core.source import Source
-from bestdeal.core.pricedatabase import PriceDatabase
+from bestdeal.core.storage import PriceStorage, create_price_database
+from bestdeal.core.classifier import TokenMatcher
 
 
 class CpuFetcher(AbstractFetcher):
-    def __init__(self, database: Optional[PriceDatabase]):
+    def __init__(self, database: Optional[PriceStorage]):
         super().__init__(database)
+        self.families = {
+            "AMD": ["Ryzen 5", "Ryzen 7", "Ryzen 9"],
+            "INTEL": ["Core i7", "Core i9"],
+        }
+        self.models = {
+            "RYZEN 5": ["3600X", "3600"],
+            "RYZEN 7": ["3700X", "3800X"],
+            "RYZEN 9": ["3900X", "3950X"],
+            "CORE I7": ["9700K", "10700K"],
+            "CORE I9": ["9900KF", "9900K"],  # Order does matter.
+        }
+        # Patterns are compiled once
+        self.brand_matcher = TokenMatcher(self.families.keys())
+        self.family_matchers = {brand: TokenMatcher(families) for brand, families in self.families.items()}
+        self.model_matchers = {family: TokenMatcher(models) for family, models in self.models.items()}
 
     def _get_tweeted_product_types(self) -> List[str]:
         """
@@ -47,13 +63,16 @@ class CpuFetcher(AbstractFetcher):
             },
         }
 
-    def _get_brand_and_product_type(self, product_description, brand: str, brands: dict, families: dict) -> Tuple[Optional[str], Optional[str]]:
-        family = self.find_exactly_one_element(brands[brand], product_description)
+    def _get_classification_rules(self) -> dict:
+        return {"families": self.families, "models": self.models}
+
+    def _get_brand_and_product_type(self, product_description, brand: str) -> Tuple[Optional[str], Optional[str]]:
+        family = self.family_matchers[brand].find_exactly_one(product_description)
         if not family:
             logger.warning(f"Brand not found in product [{product_description}]")
             return None, None
 
-        sub_product_type = self.find_exactly_one_element(families[family], product_description)
+        sub_product_type = self.model_matchers[family].find_exactly_one(product_description)
         if not sub_product_type:
             logger.warning(f"Product type not found in product [{product_description}]")
             return None, None
@@ -62,41 +81,19 @@ class CpuFetcher(AbstractFetcher):
 
         return brand, product_type
 
-    def _extract_intel_product_data(self, product_description) -> Tuple[Optional[str], Optional[str]]:
-        brand = "INTEL"
-        brands = {"INTEL": ["Core i7", "Core i9"]}
-        families = {
-            "CORE I7": ["9700K", "10700K"],
-            "CORE I9": ["9900KF", "9900K"]  # Order does matter.
-        }
-        return self._get_brand_and_product_type(product_description, brand, brands, families)
-
-    def _extract_amd_product_data(self, product_description) -> Tuple[Optional[str], Optional[str]]:
-        brand = "AMD"
-        brands = {"AMD": ["Ryzen 5", "Ryzen 7", "Ryzen 9"]}
-        families = {
-            "RYZEN 5": ["3600X", "3600"],
-            "RYZEN 7": ["3700X", "3800X"],
-            "RYZEN 9": ["3900X", "3950X"],
-        }
-        return self._get_brand_and_product_type(product_description, brand, brands, families)
-
     def _extract_product_data(self, product_description: str) -> Tuple[Optional[str], Optional[str]]:
-        extract_mapping = {
-            "AMD":  self._extract_amd_product_data,
-            "INTEL": self._extract_intel_product_data
-        }
         # Identify CPU brand
-        brand = self.find_exactly_one_element(extract_mapping.keys(), product_description)
+        brand = self.brand_matcher.find_exactly_one(product_description)
         if not brand:
             logger.warning(f'Brand not found in product [{product_description}]')
             return None, None
 
-        return extract_mapping[brand](product_description)
+        return self._get_brand_and_product_type(product_description, brand)
 
 
 if __name__ == '__main__':
     load_dotenv()
-    db = PriceDatabase(collection_name="CPU")
+    db = create_price_database("CPU")
     fetcher = CpuFetcher(db)
+    fetcher.classification_store = db.get_classification_store()
     fetcher.continuous_watch()
@@ -10,11 +10,25 @@ from bestdeal.sources.cybertek import Cybertek
 from bestdeal.sources.ldlc import LDLC
 from bestdeal.sources.materiel import Materiel
 from bestdeal.core.source import Source
-from bestdeal.core.pricedatabase import PriceDatabase
+from bestdeal.core.storage import PriceStorage, create_price_database
+from bestdeal.core.classifier import TokenMatcher
+
+
+class Lineup:
+    """
+    standard_lineup: product classes (e.g. "3080")
+    higher_lineup: product classes available for each lineup type (e.g. "TI": ["3080"])
+    """
+
+    def __init__(self, standard_lineup: List[str], higher_lineup: Dict[str, List[str]]):
+        self.standard_lineup = standard_lineup
+        self.higher_lineup = higher_lineup
+        self.lineup_type_matcher = TokenMatcher(higher_lineup.keys())
+        self.standard_lineup_matcher = TokenMatcher(standard_lineup)
 
 
 class GpuFetcher(AbstractFetcher):
-    def __init__(self, database: Optional[PriceDatabase]):
+    def __init__(self, database: Optional[PriceStorage]):
         super().__init__(database)
         self.brands = [
             "GAINWARD",
@@ -30,6 +44,20 @@ class GpuFetcher(AbstractFetcher):
             "SAPPHIRE",
             "ASROCK",
         ]
+        self.radeon_lineup = Lineup(
+            standard_lineup=["5500", "5600", "5700", "550", "570", "580"],  # Order does matter.
+            higher_lineup={"XT": ["5500", "5600", "5700"]},
+        )
+        self.nvidia_lineup = Lineup(
+            standard_lineup=["2060", "2070", "2080", "3060", "3070", "3080", "3090"],
+            higher_lineup={
+                "TI": ["2080", "3070", "3080"],
+                "SUPER": ["2060", "2070", "2080"]
+            },
+        )
+        # Patterns are compiled once
+        self.radeon_matcher = TokenMatcher(["RADEON"])
+        self.brand_matcher = TokenMatcher(self.brands)
 
     def _get_tweeted_product_types(self) -> List[str]:
         """
@@ -70,23 +98,26 @@ class GpuFetcher(AbstractFetcher):
             }
         }
 
-    def _get_brand_and_product_type(self,
-                                    product_description: str,
-                                    lineup_type: list,
-                                    standard_lineup: list,
-                                    higher_lineup: dict) -> Tuple[Optional[str], Optional[str]]:
-        brand = self.find_exactly_one_element(self.brands, product_description)
+    def _get_classification_rules(self) -> dict:
+        return {
+            "brands": self.brands,
+            "radeon": [self.radeon_lineup.standard_lineup, self.radeon_lineup.higher_lineup],
+            "nvidia": [self.nvidia_lineup.standard_lineup, self.nvidia_lineup.higher_lineup],
+        }
+
+    def _get_brand_and_product_type(self, product_description: str, lineup: Lineup) -> Tuple[Optional[str], Optional[str]]:
+        brand = self.brand_matcher.find_exactly_one(product_description)
         if not brand:
             logger.warning(f"Brand not found in product [{product_description}]")
             return None, None
 
-        lineup_type_result = self.find_exactly_one_element(lineup_type, product_description)
-        product_class = self.find_exactly_one_element(standard_lineup, product_description)
+        lineup_type_result = lineup.lineup_type_matcher.find_exactly_one(product_description)
+        product_class = lineup.standard_lineup_matcher.find_exactly_one(product_description)
 
         if lineup_type_result is None:
             # Standard lineup
             product_type = product_class
-        elif product_class in higher_lineup[lineup_type_result]:
+        elif product_class in lineup.higher_lineup[lineup_type_result]:
             # Higher lineup
             product_type = f"{product_class} {lineup_type_result}"
         else:
@@ -95,37 +126,16 @@ class GpuFetcher(AbstractFetcher):
 
         return brand, product_type
 
-    def _extract_radeon_product_data(self, product_description: str) -> Tuple[Optional[str], Optional[str]]:
-        lineup_type = ["XT"]
-        standard_lineup = ["5500", "5600", "5700", "550", "570", "580"]  # Order does matter.
-        higher_lineup = {"XT": ["5500", "5600", "5700"]}
-        return self._get_brand_and_product_type(product_description, lineup_type, standard_lineup, higher_lineup)
-
-    def _extract_nvidia_product_data(self, product_description: str) -> Tuple[Optional[str], Optional[str]]:
-        standard_lineup = ["2060", "2070", "2080", "3060", "3070", "3080", "3090"]
-        higher_lineup = {
-            "TI": ["2080", "3070", "3080"],
-            "SUPER": ["2060", "2070", "2080"]
-        }
-        lineup_type = list(higher_lineup.keys())
-        return self._get_brand_and_product_type(product_description, lineup_type, standard_lineup, higher_lineup)
-
     def _extract_product_data(self, product_description: str) -> Tuple[Optional[str], Optional[str]]:
-        # Identify CPU brand
-        brand = self.find_exactly_one_element(["RADEON"], product_description)
-        if brand == "RADEON":
-            return self._extract_radeon_product_data(product_description)
-
-        brand = self.find_exactly_one_element(self.brands, product_description)
-        if not brand:
-            logger.warning(f"Brand not found in product [{product_description}]")
-            return None, None
-
-        return self._extract_nvidia_product_data(product_description)
+        # Identify GPU manufacturer
+        if self.radeon_matcher.find_exactly_one(product_description) == "RADEON":
+            return self._get_brand_and_product_type(product_description, self.radeon_lineup)
+        return self._get_brand_and_product_type(product_description, self.nvidia_lineup)
 
 
 if __name__ == "__main__":
     load_dotenv()
-    db = PriceDatabase(collection_name="GPU")
+    db = create_price_database("GPU")
     fetcher = GpuFetcher(db)
+    fetcher.classification_store = db.get_classification_store()
     fetcher.continuous_watch()
@@ -0,0 +1,154 @@
+import json
+import threading
+import argparse
+from typing import Dict, List, Optional
+from loguru import logger
+from dotenv import load_dotenv
+from pymongo import MongoClient
+from bestdeal.backend.abstract_fetcher import AbstractFetcher
+from bestdeal.backend.gpu_fetcher import GpuFetcher
+from bestdeal.backend.cpu_fetcher import CpuFetcher
+from bestdeal.core.storage import PriceStorage, create_price_database, get_database_uri, is_sqlite_uri
+from bestdeal.core.classifier import ClassificationStore
+from bestdeal.core.fetch_pool import FetchPool
+from bestdeal.core.metrics import MetricsServer, default_metrics_registry
+from bestdeal.core.publish import Publisher, TwitterPublisher
+from bestdeal.core.scheduler import AdaptiveScheduler
+
+# Product category name: fetcher class, collection of the category is named after the category
+FETCHER_CLASSES = {
+    "GPU": GpuFetcher,
+    "CPU": CpuFetcher,
+}
+
+
+class CategoryConfig:
+    """
+    name: key of FETCHER_CLASSES, also the collection name unless collection_name is given
+    options: fetcher attributes overridden for this category (e.g. {"tweet_products": False, "wait_in_seconds": 600})
+    """
+
+    def __init__(self, name: str, collection_name: Optional[str] = None, options: Optional[dict] = None):
+        if name not in FETCHER_CLASSES:
+            raise ValueError(f"Unknown category [{name}], expected one of {sorted(FETCHER_CLASSES)}")
+        self.name = name
+        self.collection_name = collection_name or name
+        self.options = options or {}
+
+
+def load_category_configs(names: List[str], path: Optional[str] = None) -> List[CategoryConfig]:
+    """
+    Per category settings are read from a JSON file: {"GPU": {"collection_name": "GPU", "options": {...}}}
+    """
+    settings = {}
+    if path is not None:
+        with open(path, encoding="utf-8") as config_file:
+            settings = json.load(config_file)
+    return [CategoryConfig(name, **settings.get(name, {})) for name in names]
+
+
+class Runner:
+    """
+    Run several fetcher categories in one process. Fetchers run in their own thread and share
+    the MongoDB client (connection pool), the fetch pool and its per host limits, HTTP sessions
+    (default_session_registry), the scheduler and its request budget, the classification store,
+    the publisher and the metrics registry.
+    With a sqlite:// database uri, categories open the same database file and no MongoDB client is created.
+    Sources are not shared: page validators of a url must not be consumed by another category.
+    """
+
+    def __init__(self,
+                 categories: List[CategoryConfig],
+                 database_uri: Optional[str] = None,
+                 client: Optional[MongoClient] = None,
+                 fetch_pool: Optional[FetchPool] = None,
+                 scheduler: Optional[AdaptiveScheduler] = None,
+                 classification_store: Optional[ClassificationStore] = None,
+                 publisher: Optional[Publisher] = None,
+                 metrics_port: Optional[int] = None):
+        self.database_uri = database_uri if database_uri is not None else get_database_uri()
+        if client is None and not is_sqlite_uri(self.database_uri):
+            client = MongoClient(self.database_uri)
+        self.client = client
+        self.fetch_pool = fetch_pool or FetchPool()
+        self.scheduler = scheduler or AdaptiveScheduler()
+        self.publisher = publisher
+        self.metrics_port = metrics_port
+        self.fetchers: Dict[str, AbstractFetcher] = {}
+        for category in categories:
+            database = create_price_database(category.collection_name, self.database_uri, client=self.client)
+            if classification_store is None:
+                classification_store = database.get_classification_store()
+            self.fetchers[category.name] = self._create_fetcher(category, database, classification_store)
+
+    def _create_fetcher(self,
+                        category: CategoryConfig,
+                        database: PriceStorage,
+                        classification_store: ClassificationStore) -> AbstractFetcher:
+        fetcher = FETCHER_CLASSES[category.name](database)
+        fetcher.name = category.name
+        fetcher.fetch_pool = self.fetch_pool
+        fetcher.scheduler = self.scheduler
+        fetcher.classification_store = classification_store
+        fetcher.metrics_registry = default_metrics_registry
+        if self.publisher is not None:
+            fetcher.publisher = self.publisher
+        for option, value in category.options.items():
+            if not hasattr(fetcher, option):
+                raise ValueError(f"Unknown option [{option}] for category [{category.name}]")
+            setattr(fetcher, option, value)
+        return fetcher
+
+    def run(self) -> None:
+        """
+        Block until interrupted (Ctrl+C) or stop()
+        """
+        if self.publisher is None and any(fetcher.tweet_products for fetcher in self.fetchers.values()):
+            # One Twitter API for every category
+            self.publisher = TwitterPublisher()
+            for fetcher in self.fetchers.values():
+                fetcher.publisher = self.publisher
+        metrics_server = None
+        if self.metrics_port is not None:
+            metrics_server = MetricsServer(default_metrics_registry, port=self.metrics_port).start()
+        threads = [threading.Thread(target=fetcher.continuous_watch, name=f"fetcher-{name}")
+                   for name, fetcher in self.fetchers.items()]
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(timeout=1.)
+        except KeyboardInterrupt:
+            logger.info("Stopping gracefully...")
+            self.stop()
+            for thread in threads:
+                thread.join()
+        finally:
+            self.fetch_pool.shutdown()
+            if metrics_server is not None:
+                metrics_server.stop()
+
+    def stop(self) -> None:
+        for fetcher in self.fetchers.values():
+            fetcher.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fetch deals of several product categories in one process")
+    parser.add_argument("categories", nargs="*", default=list(FETCHER_CLASSES), choices=list(FETCHER_CLASSES))
+    parser.add_argument("--config", help="JSON file of per category settings")
+    parser.add_argument("--database-uri", help="mongodb:// or sqlite:///<path> (PRICE_DATABASE_URI by default)")
+    parser.add_argument("--max-fetch-workers", type=int, default=8)
+    parser.add_argument("--max-requests-per-host", type=int, default=2)
+    parser.add_argument("--max-requests-per-minute", type=float, default=None, help="request budget of every category")
+    parser.add_argument("--metrics-port", type=int, default=None)
+    arguments = parser.parse_args()
+
+    load_dotenv()
+    runner = Runner(load_category_configs(arguments.categories, arguments.config),
+                    database_uri=arguments.database_uri,
+                    fetch_pool=FetchPool(arguments.max_fetch_workers, arguments.max_requests_per_host),
+                    scheduler=AdaptiveScheduler(max_requests_per_minute=arguments.max_requests_per_minute),
+                    metrics_port=arguments.metrics_port)
+    runner.run()
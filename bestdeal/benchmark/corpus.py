@@ -0,0 +1,201 @@
+import os
+import re
+import random
+import argparse
+import requests
+from html import escape
+from typing import Callable, Dict, Iterator, List, Tuple
+from loguru import logger
+
+CORPUS_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "tests", "corpus")
+
+# (product name, price in euros)
+Catalog = List[Tuple[str, float]]
+
+NVIDIA_MODELS = ["3060", "3060 Ti", "3070", "3070 Ti", "3080", "3080 Ti", "3090", "2060 SUPER", "2070 SUPER"]
+RADEON_MODELS = ["5500 XT", "5600 XT", "5700", "5700 XT", "580"]
+NVIDIA_BRANDS = ["MSI", "GIGABYTE", "ASUS", "ZOTAC", "PNY", "PALIT", "GAINWARD", "KFA2", "EVGA", "INNO3D"]
+RADEON_BRANDS = ["SAPPHIRE", "ASROCK", "MSI", "GIGABYTE", "ASUS"]
+SERIES = ["GAMING X TRIO", "VENTUS 3X OC", "EAGLE", "TUF GAMING OC", "TWIN EDGE", "PULSE", "DUAL", "AORUS MASTER"]
+
+
+def generate_catalog(product_count: int, seed: int = 0) -> Catalog:
+    """
+    Deterministic catalog of unique product names recognized by GpuFetcher
+    """
+    generator = random.Random(seed)
+    catalog = []
+    for index in range(product_count):
+        if generator.random() < 0.75:
+            model = generator.choice(NVIDIA_MODELS)
+            name = f"{generator.choice(NVIDIA_BRANDS)} GeForce RTX {model} {generator.choice(SERIES)}"
+        else:
+            model = generator.choice(RADEON_MODELS)
+            name = f"{generator.choice(RADEON_BRANDS)} Radeon RX {model} {generator.choice(SERIES)}"
+        price = round(generator.uniform(250., 2500.), 2)
+        catalog.append((f"{name}, {generator.choice([8, 10, 12, 24])} Go (ref. {10000 + index})", price))
+    return catalog
+
+
+def format_french_price(price: float) -> str:
+    """
+    Example: 1234.5 to 1 234,50
+    """
+    return f"{price:,.2f}".replace(",", " ").replace(".", ",")
+
+
+def _wrap(source_name: str, body: str) -> bytes:
+    """
+    Vendor pages carry far more markup than the product list: head, menus, tracking scripts, footer
+    """
+    menu = "".join(f'<li class="menu-item"><a href="/rayon/{index}">Rayon {index}</a></li>' for index in range(150))
+    tracking = "".join(f"window.tracker.push({{event: 'view', slot: {index}}});" for index in range(100))
+    footer = "".join(f'<p class="legal">Mention {index}</p>' for index in range(40))
+    page = f"""<!DOCTYPE html>
+<html lang="fr"><head><meta charset="utf-8"><title>{source_name} - Cartes graphiques</title>
+<link rel="stylesheet" href="/static/main.css"><script src="/static/vendor.js"></script>
+<script>{tracking}</script></head>
+<body><header><nav><ul>{menu}</ul></nav></header>
+<main>{body}</main>
+<footer>{footer}</footer></body></html>"""
+    return page.encode("utf-8")
+
+
+def _render_topachat(catalog: Catalog) -> str:
+    return "".join(
+        f'<article class="grille-produit"><a href="/p/{index}"><img src="/i/{index}.jpg" alt=""><h3>{escape(name)}</h3></a>'
+        f'<div class="prix"><div itemprop="price">{format_french_price(price)} €</div></div></article>'
+        for index, (name, price) in enumerate(catalog))
+
+
+def _render_ldlc(catalog: Catalog) -> str:
+    impressions = ",".join(
+        "{'name': '" + name.replace("'", "\\'") + f"', 'id': 'AR{index:06d}', 'price': {price:.2f}, 'brand': '{name.split()[0]}'}}"
+        for index, (name, price) in enumerate(catalog))
+    listing = "".join(
+        f'<li class="pdt-item"><h3 class="title-3"><a href="/fiche/{index}">{escape(name)}</a></h3>'
+        f'<div class="price">{format_french_price(price)}€</div></li>'
+        for index, (name, price) in enumerate(catalog))
+    return f"<ul class=\"listing-product\">{listing}</ul><script>var dataLayer = [{{'ecommerce': {{'impressions': [{impressions}]}}}}];</script>"
+
+
+def _render_cybertek(catalog: Catalog) -> str:
+    products = []
+    for index, (name, price) in enumerate(catalog):
+        brand, description = name.split(" ", 1)
+        euros, cents = f"{price:.2f}".split(".")
+        products.append(
+            f'<div class="ppp-grid"><div class="product-item"><a class="prod_txt_left" href="/p/{index}">'
+            f'<span class="marque">{escape(brand)}</span> {escape(description)}\r\n\t</a></div>'
+            f'<div class="price_prod_resp">{euros}€{cents}</div></div>')
+    return "".join(products)
+
+
+def _render_pcw(catalog: Catalog) -> str:
+    return "".join(
+        f'<div class="product-miniature"><div class="price-and-status d-flex flex-wrap align-items-center">'
+        f'<a itemprop="url" href="/p/{index}">{escape(name)}</a>'
+        f'<span class="price product-price">{format_french_price(price)} €</span></div></div>'
+        for index, (name, price) in enumerate(catalog))
+
+
+def _render_grosbill(catalog: Catalog) -> str:
+    rows = "".join(
+        f'<tr><td><div class="product_description"><a href="/p/{index}">{escape(name)}</a></div></td>'
+        f'<td class="btn_price_wrapper"><b>{format_french_price(price)}€</b></td></tr>'
+        for index, (name, price) in enumerate(catalog))
+    return f'<table id="listing_mode_display"><tr><th>Produit</th><th>Prix</th></tr>{rows}</table>'
+
+
+def _render_mindfactory(catalog: Catalog) -> str:
+    # German format: € 1.167,83*
+    return "".join(
+        f'<div class="pcontent"><div class="pname">{escape(name)}</div>'
+        f'<div class="pprice">€ {format_french_price(price).replace(" ", ".")}*</div></div>'
+        for name, price in catalog)
+
+
+def _render_rueducommerce(catalog: Catalog) -> str:
+    return "".join(
+        f'<article itemscope itemtype="http://schema.org/Product"><div class="summary">{escape(name)}</div>'
+        f'<div class="price">{format_french_price(price).replace(",", "€")}</div></article>'
+        for name, price in catalog)
+
+
+PAGE_RENDERERS: Dict[str, Callable[[Catalog], str]] = {
+    "TopAchat": _render_topachat,
+    "LDLC": _render_ldlc,
+    "Cybertek": _render_cybertek,
+    "PCW": _render_pcw,
+    "GrosBill": _render_grosbill,
+    "MindFactory": _render_mindfactory,
+    "RueDuCommerce": _render_rueducommerce,
+}
+
+
+def render_page(source_name: str, catalog: Catalog) -> bytes:
+    """
+    Synthetic listing page laid out like source_name pages
+    """
+    return _wrap(source_name, PAGE_RENDERERS[source_name](catalog))
+
+
+def iterate_corpus(directory: str = CORPUS_DIRECTORY) -> Iterator[Tuple[str, str, str]]:
+    """
+    :return: source name, page name and path of every corpus page (<directory>/<source name>/<page name>.html)
+    """
+    for source_name in sorted(os.listdir(directory)):
+        source_directory = os.path.join(directory, source_name)
+        if not os.path.isdir(source_directory):
+            continue
+        for file_name in sorted(os.listdir(source_directory)):
+            if file_name.endswith(".html"):
+                yield source_name, file_name[:-len(".html")], os.path.join(source_directory, file_name)
+
+
+def _write_page(directory: str, source_name: str, page_name: str, content: bytes) -> None:
+    source_directory = os.path.join(directory, source_name)
+    os.makedirs(source_directory, exist_ok=True)
+    with open(os.path.join(source_directory, f"{page_name}.html"), "wb") as page_file:
+        page_file.write(content)
+    logger.info(f"Saved [{source_name}] [{page_name}] ({len(content)} bytes)")
+
+
+def generate_corpus(directory: str, product_count: int) -> None:
+    for source_name in PAGE_RENDERERS:
+        _write_page(directory, source_name, f"generated_{product_count}", render_page(source_name, generate_catalog(product_count)))
+
+
+def record_corpus(directory: str) -> None:
+    """
+    Save live listing pages of every fetcher url, pages failing to download are skipped
+    """
+    from bestdeal.backend.cpu_fetcher import CpuFetcher
+    from bestdeal.backend.gpu_fetcher import GpuFetcher
+    for fetcher in [CpuFetcher(database=None), GpuFetcher(database=None)]:
+        for source_class, product_urls in fetcher._get_source_product_urls().items():
+            source = source_class()
+            for product, url in product_urls.items():
+                try:
+                    response = source._download(url, source.headers)
+                    response.raise_for_status()
+                except requests.RequestException as exception:
+                    logger.warning(f"Unable to record [{product}] from [{source.source_name}]. Reason [{exception}]")
+                    continue
+                page_name = re.sub(r"\W+", "_", f"{type(fetcher).__name__} {product}").strip("_").lower()
+                _write_page(directory, source.source_name, page_name, response.content)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Vendor pages corpus used by parser and cycle benchmarks")
+    parser.add_argument("--directory", default=CORPUS_DIRECTORY)
+    subparsers = parser.add_subparsers(dest="command")
+    subparsers.required = True
+    subparsers.add_parser("record", help="save live pages of every fetcher url")
+    generate_parser = subparsers.add_parser("generate", help="write synthetic pages, one per source")
+    generate_parser.add_argument("--product-count", type=int, default=48)
+    arguments = parser.parse_args()
+    if arguments.command == "record":
+        record_corpus(arguments.directory)
+    else:
+        generate_corpus(arguments.directory, arguments.product_count)
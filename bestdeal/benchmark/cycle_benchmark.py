@@ -0,0 +1,116 @@
+import os
+import time
+import argparse
+from typing import Dict, List, Optional
+from loguru import logger
+from pymongo import MongoClient
+from bestdeal.core.source import Source
+from bestdeal.core.storage import PriceStorage, create_price_database, is_sqlite_uri
+from bestdeal.backend.gpu_fetcher import GpuFetcher
+from bestdeal.benchmark.corpus import PAGE_RENDERERS
+from bestdeal.benchmark.vendor_server import VendorServer
+
+
+class StandInGpuFetcher(GpuFetcher):
+    """
+    GpuFetcher reading every vendor page from a VendorServer instead of live websites
+    """
+
+    def __init__(self, database: Optional[PriceStorage], vendor_server: VendorServer, pages_per_source: int = 2):
+        super().__init__(database)
+        self.vendor_server = vendor_server
+        self.pages_per_source = pages_per_source
+        self.display_lowest = False
+        self.tweet_products = False
+
+    def _get_source_product_urls(self) -> Dict[type(Source), Dict[str, str]]:
+        product_urls = {}
+        for source_class, live_urls in super()._get_source_product_urls().items():
+            if source_class.__name__ not in PAGE_RENDERERS or not live_urls:
+                continue
+            product_urls[source_class] = {f"Page {index}": self.vendor_server.url(source_class.__name__, f"page_{index}")
+                                          for index in range(self.pages_per_source)}
+        return product_urls
+
+
+class CycleMeasure:
+    def __init__(self, cycle: int, wall_seconds: float, fetcher: GpuFetcher):
+        summary = fetcher.cycle_summary
+        self.cycle = cycle
+        self.wall_seconds = wall_seconds
+        self.fetched_pages = len(summary.fetched_pages)
+        self.unchanged_pages = len(summary.unchanged_pages)
+        self.failed_pages = len(summary.failed_pages)
+        self.deals_count = summary.deals_count
+        self.inserted_posts = summary.inserted_posts
+        self.stage_seconds = dict(summary.stage_timer.seconds)
+
+    @property
+    def products_per_second(self) -> float:
+        return self.deals_count / self.wall_seconds if self.wall_seconds else 0.
+
+    def log(self) -> None:
+        stages = ", ".join(f"{stage} [{seconds:.3f}] s" for stage, seconds in self.stage_seconds.items())
+        logger.info(f"Cycle [{self.cycle}] wall [{self.wall_seconds:.3f}] s, "
+                    f"pages [{self.fetched_pages}] parsed [{self.unchanged_pages}] unchanged [{self.failed_pages}] failed, "
+                    f"[{self.deals_count}] products ([{self.products_per_second:.0f}] per second), "
+                    f"[{self.inserted_posts}] posts inserted")
+        logger.info(f"Cycle [{self.cycle}] stages (cumulative over threads): {stages}")
+
+
+def run_cycles(fetcher: GpuFetcher, vendor_server: VendorServer, cycles: int) -> List[CycleMeasure]:
+    """
+    First cycle is cold (every page is new), the next ones follow vendor price changes
+    """
+    measures = []
+    for cycle in range(cycles):
+        if cycle:
+            vendor_server.advance_cycle()
+        start_time = time.perf_counter()
+        fetcher.main_loop()
+        measure = CycleMeasure(cycle, time.perf_counter() - start_time, fetcher)
+        measure.log()
+        measures.append(measure)
+    return measures
+
+
+def create_client(arguments) -> MongoClient:
+    if arguments.database_uri:
+        return MongoClient(arguments.database_uri)
+    # Development dependency (requirements.dev.txt), downloads and starts a local mongod
+    from pymongo_inmemory import MongoClient as InMemoryMongoClient
+    return InMemoryMongoClient()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure GpuFetcher cycles against local vendor stand-ins")
+    parser.add_argument("--cycles", type=int, default=3)
+    parser.add_argument("--pages-per-source", type=int, default=2)
+    parser.add_argument("--catalog-size", type=int, default=48)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--jitter", type=float, default=0.02)
+    parser.add_argument("--error-rate", type=float, default=0.)
+    parser.add_argument("--price-change-rate", type=float, default=0.1)
+    parser.add_argument("--sequential", action="store_true", help="disable concurrent fetch")
+    parser.add_argument("--database-uri", dest="database_uri", default=os.environ.get("BENCHMARK_DATABASE_URI"),
+                        help="database used for the benchmark, mongodb:// or sqlite://<path> (default: pymongo_inmemory)")
+    parser.add_argument("--collection", default="CycleBenchmark")
+    args = parser.parse_args()
+
+    server = VendorServer(catalog_size=args.catalog_size, latency=args.latency, jitter=args.jitter,
+                          error_rate=args.error_rate, price_change_rate=args.price_change_rate).start()
+    client = None
+    try:
+        if not is_sqlite_uri(args.database_uri):
+            client = create_client(args)
+        database = create_price_database(args.collection, args.database_uri, client=client)
+        database.clear_posts()
+        benchmark_fetcher = StandInGpuFetcher(database, server, args.pages_per_source)
+        benchmark_fetcher.concurrent_fetch = not args.sequential
+        run_cycles(benchmark_fetcher, server, args.cycles)
+        logger.info(f"Vendor stand-in answered [{server.request_count}] requests "
+                    f"([{server.not_modified_count}] not modified, [{server.error_count}] errors)")
+    finally:
+        if client is not None:
+            client.close()
+        server.stop()
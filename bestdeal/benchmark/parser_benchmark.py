@@ -0,0 +1,135 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tracemalloc
+from typing import Dict, List, Optional
+from loguru import logger
+from bestdeal.core.source import Source
+from bestdeal.sources.topachat import TopAchat
+from bestdeal.sources.ldlc import LDLC
+from bestdeal.sources.cybertek import Cybertek
+from bestdeal.sources.pcw import PCW
+from bestdeal.sources.grosbill import GrosBill
+from bestdeal.sources.mindfactory import MindFactory
+from bestdeal.sources.rueducommerce import RueDuCommerce
+from bestdeal.benchmark.corpus import CORPUS_DIRECTORY, iterate_corpus
+
+BASELINES_PATH = os.path.join(CORPUS_DIRECTORY, "baselines.json")
+
+SOURCE_CLASSES = {source_class.__name__: source_class
+                  for source_class in [TopAchat, LDLC, Cybertek, PCW, GrosBill, MindFactory, RueDuCommerce]}
+
+
+class PageMeasure:
+    """
+    parse_seconds: best of several runs
+    peak_bytes: peak memory allocated while extracting deals once
+    """
+
+    def __init__(self, deals_count: int, parse_seconds: float, peak_bytes: int, page_bytes: int):
+        self.deals_count = deals_count
+        self.parse_seconds = parse_seconds
+        self.peak_bytes = peak_bytes
+        self.page_bytes = page_bytes
+
+    def to_dict(self) -> dict:
+        return {"deals_count": self.deals_count, "parse_ms": round(self.parse_seconds * 1000, 3),
+                "peak_kib": round(self.peak_bytes / 1024, 1), "page_kib": round(self.page_bytes / 1024, 1)}
+
+
+def measure_page(source: Source, content: bytes, repeat: int = 5) -> PageMeasure:
+    tracemalloc.start()
+    try:
+        deals = source.extract_deals_from_page(content, "utf-8")
+        _, peak_bytes = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    best_seconds = float("inf")
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        source.extract_deals_from_page(content, "utf-8")
+        best_seconds = min(best_seconds, time.perf_counter() - start_time)
+    return PageMeasure(len(deals), best_seconds, peak_bytes, len(content))
+
+
+def run_benchmark(directory: str = CORPUS_DIRECTORY, repeat: int = 5) -> Dict[str, dict]:
+    """
+    :return: measures of every corpus page keyed by "<source name>/<page name>"
+    """
+    results = {}
+    for source_name, page_name, path in iterate_corpus(directory):
+        if source_name not in SOURCE_CLASSES:
+            logger.warning(f"No source named [{source_name}], [{path}] skipped")
+            continue
+        with open(path, "rb") as page_file:
+            content = page_file.read()
+        results[f"{source_name}/{page_name}"] = measure_page(SOURCE_CLASSES[source_name](), content, repeat).to_dict()
+    return results
+
+
+def load_baselines(path: str = BASELINES_PATH) -> Dict[str, dict]:
+    try:
+        with open(path, encoding="utf-8") as baselines_file:
+            return json.load(baselines_file)
+    except FileNotFoundError:
+        return {}
+
+
+def save_baselines(results: Dict[str, dict], path: str = BASELINES_PATH) -> None:
+    with open(path, "w", encoding="utf-8") as baselines_file:
+        json.dump(results, baselines_file, indent=2, sort_keys=True)
+        baselines_file.write("\n")
+
+
+def find_regressions(results: Dict[str, dict],
+                     baselines: Dict[str, dict],
+                     slowdown_threshold: float = 3.0,
+                     noise_ms: float = 5.0) -> List[str]:
+    """
+    A page regresses when its deals count changes or when parsing takes more than
+    slowdown_threshold times its baseline (plus noise_ms, timings of small pages are noisy).
+    """
+    regressions = []
+    for page, baseline in sorted(baselines.items()):
+        result = results.get(page)
+        if result is None:
+            regressions.append(f"[{page}] missing from corpus")
+            continue
+        if result["deals_count"] != baseline["deals_count"]:
+            regressions.append(f"[{page}] [{result['deals_count']}] deals instead of [{baseline['deals_count']}]")
+        limit_ms = baseline["parse_ms"] * slowdown_threshold + noise_ms
+        if result["parse_ms"] > limit_ms:
+            regressions.append(f"[{page}] parsed in [{result['parse_ms']}] ms, more than [{limit_ms:.1f}] ms")
+    return regressions
+
+
+def log_results(results: Dict[str, dict], baselines: Optional[Dict[str, dict]] = None) -> None:
+    baselines = baselines or {}
+    for page, result in sorted(results.items()):
+        baseline_ms = baselines.get(page, {}).get("parse_ms")
+        logger.info(f"[{page:40}] [{result['deals_count']:4}] deals [{result['parse_ms']:8.2f}] ms "
+                    f"(baseline [{baseline_ms}] ms) peak [{result['peak_kib']:8.1f}] KiB for [{result['page_kib']}] KiB page")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure vendor parsers on the recorded corpus")
+    parser.add_argument("--directory", default=CORPUS_DIRECTORY)
+    parser.add_argument("--baselines", default=BASELINES_PATH)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--slowdown-threshold", type=float, default=3.0)
+    parser.add_argument("--update-baselines", action="store_true", help="store current measures as baselines")
+    arguments = parser.parse_args()
+
+    measures = run_benchmark(arguments.directory, arguments.repeat)
+    stored_baselines = load_baselines(arguments.baselines)
+    log_results(measures, stored_baselines)
+    if arguments.update_baselines:
+        save_baselines(measures, arguments.baselines)
+        logger.info(f"Baselines saved in [{arguments.baselines}]")
+    else:
+        found_regressions = find_regressions(measures, stored_baselines, arguments.slowdown_threshold)
+        for regression in found_regressions:
+            logger.error(regression)
+        sys.exit(1 if found_regressions else 0)
@@ -0,0 +1,160 @@
+import time
+import zlib
+import random
+import hashlib
+import argparse
+import threading
+import socketserver
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from typing import Dict, Tuple
+from loguru import logger
+from bestdeal.benchmark.corpus import Catalog, PAGE_RENDERERS, generate_catalog, render_page
+
+
+class ThreadingHTTPServer(socketserver.ThreadingMixIn, HTTPServer):
+    """
+    http.server.ThreadingHTTPServer is only available from Python 3.7
+    """
+    daemon_threads = True
+
+
+class VendorServer:
+    """
+    Local stand-in for vendor websites: http://host:port/<source name>/<page name>
+    serves a listing page laid out like source name pages.
+    catalog_size: products per page
+    latency, jitter: seconds waited before answering (latency +/- jitter)
+    error_rate: probability of answering 503
+    price_change_rate: share of prices changed by each advance_cycle()
+    Pages carry an ETag and unchanged pages are answered 304.
+    """
+
+    def __init__(self,
+                 catalog_size: int = 48,
+                 latency: float = 0.05,
+                 jitter: float = 0.02,
+                 error_rate: float = 0.,
+                 price_change_rate: float = 0.1,
+                 seed: int = 0,
+                 host: str = "127.0.0.1",
+                 port: int = 0):
+        self.catalog_size = catalog_size
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.price_change_rate = price_change_rate
+        self.seed = seed
+        self.cycle = 0
+        self.request_count = 0
+        self.error_count = 0
+        self.not_modified_count = 0
+        self._catalogs: Dict[Tuple[str, str], Catalog] = {}
+        self._pages: Dict[Tuple[str, str], Tuple[bytes, str]] = {}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._create_handler_class())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="vendor-server", daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def url(self, source_name: str, page_name: str) -> str:
+        return f"{self.base_url}/{source_name}/{page_name}"
+
+    def start(self) -> "VendorServer":
+        self._thread.start()
+        logger.info(f"Vendor stand-in listening on [{self.base_url}]")
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def advance_cycle(self) -> None:
+        """
+        Change price_change_rate of every page prices, as vendors do between two fetch cycles
+        """
+        with self._lock:
+            self.cycle += 1
+            for key, catalog in self._catalogs.items():
+                generator = random.Random(f"{self.seed}|{key}|{self.cycle}")
+                self._catalogs[key] = [
+                    (name, round(price * generator.uniform(0.9, 1.1), 2) if generator.random() < self.price_change_rate else price)
+                    for name, price in catalog
+                ]
+            self._pages.clear()
+
+    def get_page(self, source_name: str, page_name: str) -> Tuple[bytes, str]:
+        """
+        :return: page content and its ETag
+        """
+        key = (source_name, page_name)
+        with self._lock:
+            if key not in self._pages:
+                if key not in self._catalogs:
+                    self._catalogs[key] = generate_catalog(self.catalog_size, seed=zlib.crc32(f"{self.seed}|{key}".encode("utf-8")))
+                content = render_page(source_name, self._catalogs[key])
+                self._pages[key] = (content, f'"{hashlib.sha1(content).hexdigest()}"')
+            return self._pages[key]
+
+    def _wait_and_draw_error(self) -> bool:
+        with self._lock:
+            self.request_count += 1
+            delay = max(0., self.latency + self._random.uniform(-self.jitter, self.jitter))
+            failed = self._random.random() < self.error_rate
+            if failed:
+                self.error_count += 1
+        time.sleep(delay)
+        return failed
+
+    def _create_handler_class(self):
+        server = self
+
+        class VendorRequestHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                parts = self.path.strip("/").split("/")
+                if len(parts) != 2 or parts[0] not in PAGE_RENDERERS:
+                    self.send_error(404)
+                    return
+                if server._wait_and_draw_error():
+                    self.send_error(503)
+                    return
+                content, etag = server.get_page(parts[0], parts[1])
+                if self.headers.get("If-None-Match") == etag:
+                    with server._lock:
+                        server.not_modified_count += 1
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(content)))
+                self.send_header("ETag", etag)
+                self.end_headers()
+                self.wfile.write(content)
+
+            def log_message(self, format, *args):
+                pass
+
+        return VendorRequestHandler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve vendor listing pages locally")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--catalog-size", type=int, default=48)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--jitter", type=float, default=0.02)
+    parser.add_argument("--error-rate", type=float, default=0.)
+    arguments = parser.parse_args()
+    vendor_server = VendorServer(catalog_size=arguments.catalog_size, latency=arguments.latency, jitter=arguments.jitter,
+                                 error_rate=arguments.error_rate, port=arguments.port).start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        vendor_server.stop()
@@ -0,0 +1,221 @@
+import os
+import re
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Iterable, Optional, Tuple, Callable, Dict, Any
+from loguru import logger
+
+Classification = Tuple[Optional[str], Optional[str]]
+
+
+class TokenMatcher:
+    """
+    Search exactly one token of a list among raw data, pattern is compiled once.
+    """
+
+    def __init__(self, tokens: Iterable[str]):
+        self.tokens = tuple(tokens)
+        refined_pattern_tokens = []
+        at_least_one_space = r'\s{1,}'
+        # Build search pattern for " Tixxx" or "2070SUPER " (there must be at least one space)
+        # Avoid to gather "xxxxxTIxxxx"
+        for pattern_token in self.tokens:
+            refined_pattern_tokens.append(f'{at_least_one_space}{pattern_token}')
+            refined_pattern_tokens.append(f'{pattern_token}{at_least_one_space}')
+        self.pattern = re.compile('|'.join(refined_pattern_tokens), re.IGNORECASE)
+
+    def find_exactly_one(self, raw_data: str) -> Optional[str]:
+        parsed = list(set(map(lambda x: x.strip().upper(), self.pattern.findall(raw_data))))
+        if len(parsed) > 1:
+            logger.warning(f'Parsed data is wrong [{parsed}]')
+        elif parsed:
+            return parsed[0]
+        return None
+
+
+@lru_cache(maxsize=256)
+def get_token_matcher(tokens: Tuple[str, ...]) -> TokenMatcher:
+    return TokenMatcher(tokens)
+
+
+def normalize_product_name(product_description: str) -> str:
+    """
+    Matching is case insensitive and tolerates any whitespace,
+    so names only differing by case or whitespace runs share one classification.
+    """
+    return re.sub(r'\s+', ' ', product_description).upper()
+
+
+def compute_rules_version(rules: Any) -> str:
+    """
+    Fingerprint of classification tables, cached classifications are dropped when it changes
+    """
+    return hashlib.sha1(json.dumps(rules, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+class ClassificationStore:
+    """
+    Persist classifications between restarts.
+    namespace: fetcher name, version: rules version
+    """
+
+    def load(self, namespace: str, version: str) -> Dict[str, Classification]:
+        raise NotImplementedError()
+
+    def save(self, namespace: str, version: str, entries: Dict[str, Classification]) -> None:
+        """
+        entries: classifications computed since previous save
+        """
+        raise NotImplementedError()
+
+
+class JsonFileClassificationStore(ClassificationStore):
+    """
+    Local file: {namespace: {"version": version, "entries": {name: [brand, product_type]}}}
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _read(self) -> dict:
+        try:
+            with open(self.path, encoding="utf-8") as cache_file:
+                return json.load(cache_file)
+        except FileNotFoundError:
+            return {}
+        except ValueError as exception:
+            logger.warning(f"Ignoring corrupted classification cache [{self.path}]. Reason [{exception}]")
+            return {}
+
+    def load(self, namespace: str, version: str) -> Dict[str, Classification]:
+        with self._lock:
+            content = self._read().get(namespace, {})
+        if content.get("version") != version:
+            return {}
+        return {name: tuple(classification) for name, classification in content.get("entries", {}).items()}
+
+    def save(self, namespace: str, version: str, entries: Dict[str, Classification]) -> None:
+        with self._lock:
+            content = self._read()
+            if content.get(namespace, {}).get("version") != version:
+                content[namespace] = {"version": version, "entries": {}}
+            content[namespace]["entries"].update({name: list(classification) for name, classification in entries.items()})
+            # Write then rename, a crash never leaves a truncated file
+            temporary_path = f"{self.path}.tmp"
+            with open(temporary_path, "w", encoding="utf-8") as cache_file:
+                json.dump(content, cache_file)
+            os.replace(temporary_path, self.path)
+
+
+class MongoClassificationStore(ClassificationStore):
+    """
+    One document per classification: {namespace, version, name, product_brand, product_type}
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def load(self, namespace: str, version: str) -> Dict[str, Classification]:
+        # Entries of previous rules versions are useless
+        self.collection.delete_many({"namespace": namespace, "version": {"$ne": version}})
+        cursor = self.collection.find({"namespace": namespace, "version": version})
+        return {entry["name"]: (entry["product_brand"], entry["product_type"]) for entry in cursor}
+
+    def save(self, namespace: str, version: str, entries: Dict[str, Classification]) -> None:
+        if not entries:
+            return
+        from pymongo import UpdateOne
+        operations = [
+            UpdateOne({"_id": f"{namespace}|{version}|{name}"},
+                      {"$set": {"namespace": namespace, "version": version, "name": name,
+                                "product_brand": brand, "product_type": product_type}},
+                      upsert=True)
+            for name, (brand, product_type) in entries.items()
+        ]
+        self.collection.bulk_write(operations, ordered=False)
+
+
+class ProductClassifier:
+    """
+    Bounded LRU cache in front of a fetcher _extract_product_data,
+    the same listing names come back every cycle.
+    Keyed by normalized name, classify_function still reads the vendor name.
+    Optionally persisted in a ClassificationStore for a given rules version.
+    """
+
+    def __init__(self,
+                 classify_function: Callable[[str], Classification],
+                 max_size: int = 4096,
+                 namespace: str = "",
+                 version: str = "",
+                 store: Optional[ClassificationStore] = None):
+        self.classify_function = classify_function
+        self.max_size = max_size
+        self.namespace = namespace
+        self.version = version
+        self.store = store
+        self.hits = 0
+        self.misses = 0
+        self._cache: OrderedDict = OrderedDict()
+        self._unsaved: Dict[str, Classification] = {}
+        self._lock = threading.Lock()
+        if store is not None:
+            self._load()
+
+    def _load(self) -> None:
+        try:
+            entries = self.store.load(self.namespace, self.version)
+        except Exception as exception:
+            logger.warning(f"Unable to load classification cache [{self.namespace}]. Reason [{exception}]")
+            return
+        for name, classification in list(entries.items())[-self.max_size:]:
+            self._cache[name] = classification
+        logger.info(f"[{len(self._cache)}] classifications loaded for [{self.namespace}] rules version [{self.version}]")
+
+    def classify(self, product_description: str) -> Classification:
+        """
+        :return: brand and product type
+        """
+        name = normalize_product_name(product_description)
+        with self._lock:
+            if name in self._cache:
+                self._cache.move_to_end(name)
+                self.hits += 1
+                return self._cache[name]
+
+        result = self.classify_function(product_description)
+
+        with self._lock:
+            self.misses += 1
+            self._cache[name] = result
+            if len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+            if self.store is not None:
+                self._unsaved[name] = result
+        return result
+
+    def save(self) -> None:
+        """
+        Persist classifications computed since previous save
+        """
+        with self._lock:
+            unsaved, self._unsaved = self._unsaved, {}
+        if self.store is None or not unsaved:
+            return
+        try:
+            self.store.save(self.namespace, self.version, unsaved)
+        except Exception as exception:
+            logger.warning(f"Unable to save classification cache [{self.namespace}]. Reason [{exception}]")
+            with self._lock:
+                unsaved.update(self._unsaved)
+                self._unsaved = unsaved
+
+    def log_statistics(self) -> None:
+        total = self.hits + self.misses
+        hit_rate = (100. * self.hits / total) if total else 0.
+        logger.info(f"Classification cache [{self.namespace}]: [{self.hits}] hits, [{self.misses}] misses "
+                    f"({hit_rate:.1f}% hit rate), [{len(self._cache)}] entries")
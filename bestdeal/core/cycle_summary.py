@@ -0,0 +1,185 @@
+import time
+import threading
+from datetime import datetime, timezone
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+from loguru import logger
+
+
+class StageTimer:
+    """
+    Cumulative seconds spent in each stage of a cycle (download, parse, classify, database...).
+    Stages run from several threads, their sum can exceed the cycle wall time.
+    """
+
+    def __init__(self):
+        self.seconds: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, seconds: float, count: int = 1) -> None:
+        with self._lock:
+            self.seconds[stage] = self.seconds.get(stage, 0.) + seconds
+            self.counts[stage] = self.counts.get(stage, 0) + count
+
+    @contextmanager
+    def measure(self, stage: str):
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - start_time)
+
+    def __str__(self) -> str:
+        with self._lock:
+            return ", ".join(f"{stage} [{seconds:.3f}] s ({self.counts[stage]})" for stage, seconds in self.seconds.items())
+
+
+class PageMetrics:
+    """
+    Fetch of one (source, url) during a cycle, filled by Source.fetch_deals and the fetcher
+    """
+
+    FETCHED = "fetched"
+    UNCHANGED = "unchanged"
+    FAILED = "failed"
+
+    def __init__(self, source_name: str, product: str, url: str):
+        self.source_name = source_name
+        self.product = product
+        self.url = url
+        self.status: Optional[str] = None
+        self.bytes_downloaded = 0
+        self.download_seconds = 0.
+        self.parse_seconds = 0.
+        self.deals_count = 0
+        # Deals of every page of a paginated listing, before deduplication
+        self.page_deals_counts: List[int] = []
+        self.classification_misses = 0
+        self.unclassified_count = 0
+        self.new_posts = 0
+
+    def to_dict(self) -> dict:
+        return {"source": self.source_name, "product": self.product, "url": self.url, "status": self.status,
+                "bytes_downloaded": self.bytes_downloaded,
+                "download_ms": round(self.download_seconds * 1000, 3), "parse_ms": round(self.parse_seconds * 1000, 3),
+                "deals_count": self.deals_count, "page_deals_counts": self.page_deals_counts,
+                "classification_misses": self.classification_misses,
+                "unclassified_count": self.unclassified_count, "new_posts": self.new_posts}
+
+
+class CycleSummary:
+    """
+    What happened during one fetcher cycle.
+    Pages are recorded from fetch threads, hence the lock.
+    """
+
+    def __init__(self):
+        self.start_time = time.monotonic()
+        self.start_date = datetime.now(timezone.utc)
+        self.pages: List[PageMetrics] = []
+        self.inserted_posts = 0
+        # Posts written with an unacknowledged write concern, not counted in inserted_posts
+        self.unacknowledged_posts = 0
+        self.write_batches = []
+        self.stage_timer = StageTimer()
+        # {(collection, command): {"count", "seconds", "failures"}} sent during the cycle
+        self.database_commands: Dict[Tuple[str, str], Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def add_page(self, page_metrics: PageMetrics) -> None:
+        with self._lock:
+            self.pages.append(page_metrics)
+        self.stage_timer.add("download", page_metrics.download_seconds)
+        if page_metrics.status == PageMetrics.FETCHED:
+            self.stage_timer.add("parse", page_metrics.parse_seconds)
+
+    def _get_pages(self, status: str) -> List[Tuple[str, str]]:
+        with self._lock:
+            return [(page.source_name, page.product) for page in self.pages if page.status == status]
+
+    @property
+    def fetched_pages(self) -> List[Tuple[str, str]]:
+        return self._get_pages(PageMetrics.FETCHED)
+
+    @property
+    def unchanged_pages(self) -> List[Tuple[str, str]]:
+        return self._get_pages(PageMetrics.UNCHANGED)
+
+    @property
+    def failed_pages(self) -> List[Tuple[str, str]]:
+        return self._get_pages(PageMetrics.FAILED)
+
+    @property
+    def deals_count(self) -> int:
+        with self._lock:
+            return sum(page.deals_count for page in self.pages)
+
+    @property
+    def elapsed_seconds(self) -> float:
+        return time.monotonic() - self.start_time
+
+    def get_source_totals(self) -> Dict[str, dict]:
+        """
+        Page metrics summed per source
+        """
+        totals = {}
+        with self._lock:
+            for page in self.pages:
+                total = totals.setdefault(page.source_name, {"pages": 0, "failed_pages": 0, "bytes_downloaded": 0,
+                                                             "download_ms": 0., "parse_ms": 0., "deals_count": 0,
+                                                             "classification_misses": 0})
+                total["pages"] += 1
+                total["failed_pages"] += page.status == PageMetrics.FAILED
+                total["bytes_downloaded"] += page.bytes_downloaded
+                total["download_ms"] += page.download_seconds * 1000
+                total["parse_ms"] += page.parse_seconds * 1000
+                total["deals_count"] += page.deals_count
+                total["classification_misses"] += page.classification_misses
+        for total in totals.values():
+            total["download_ms"] = round(total["download_ms"], 3)
+            total["parse_ms"] = round(total["parse_ms"], 3)
+        return totals
+
+    def to_report(self, fetcher_name: str) -> dict:
+        """
+        Cycle record stored alongside prices and exported as metrics
+        """
+        with self._lock:
+            pages = [page.to_dict() for page in self.pages]
+        return {
+            "fetcher": fetcher_name,
+            "date": self.start_date,
+            "wall_seconds": round(self.elapsed_seconds, 3),
+            "inserted_posts": self.inserted_posts,
+            "unacknowledged_posts": self.unacknowledged_posts,
+            "deals_count": self.deals_count,
+            "stages": {stage: round(seconds, 6) for stage, seconds in self.stage_timer.seconds.items()},
+            "sources": self.get_source_totals(),
+            "pages": pages,
+            "database": [{"collection": collection, "command": command, **values}
+                         for (collection, command), values in sorted(self.database_commands.items())],
+        }
+
+    def log(self) -> None:
+        elapsed = self.elapsed_seconds
+        logger.info(
+            f"Cycle summary: [{len(self.fetched_pages)}] pages parsed ([{self.deals_count}] deals), "
+            f"[{len(self.unchanged_pages)}] unchanged pages skipped, "
+            f"[{len(self.failed_pages)}] failed, "
+            f"[{self.inserted_posts}] posts inserted in [{elapsed:.1f}] seconds"
+        )
+        if self.unacknowledged_posts:
+            logger.info(f"Cycle writes: [{self.unacknowledged_posts}] posts sent unacknowledged")
+        logger.info(f"Cycle stages: {self.stage_timer}")
+        round_trips = sum(values["count"] for values in self.database_commands.values())
+        database_seconds = sum(values["seconds"] for values in self.database_commands.values())
+        logger.info(f"Cycle database: [{round_trips}] round trips in [{database_seconds:.3f}] seconds")
+        for source_name, total in sorted(self.get_source_totals().items()):
+            logger.debug(f"Source [{source_name}]: {total}")
+        for batch in self.write_batches:
+            logger.debug(f"Write batch {batch}")
+        for source_name, product in self.unchanged_pages:
+            logger.debug(f"Unchanged [{product}] page from [{source_name}] skipped")
+        for source_name, product in self.failed_pages:
+            logger.debug(f"Failed [{product}] page from [{source_name}]")
@@ -0,0 +1,50 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future
+from contextlib import contextmanager
+from typing import Dict, Callable
+from urllib.parse import urlparse
+
+
+class HostLimiter:
+    """
+    Cap the number of simultaneous HTTP requests sent to the same host.
+    """
+
+    def __init__(self, max_requests_per_host: int):
+        self.max_requests_per_host = max_requests_per_host
+        self._semaphores: Dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    def _get_semaphore(self, host: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            if host not in self._semaphores:
+                self._semaphores[host] = threading.BoundedSemaphore(self.max_requests_per_host)
+            return self._semaphores[host]
+
+    @contextmanager
+    def slot(self, url: str):
+        """
+        Block until a request slot is available for url host
+        """
+        semaphore = self._get_semaphore(urlparse(url).netloc)
+        with semaphore:
+            yield
+
+
+class FetchPool:
+    """
+    Thread pool running vendor fetches concurrently.
+    max_workers: global cap on fetches in flight
+    max_requests_per_host: cap on HTTP requests in flight for a single vendor host
+    """
+
+    def __init__(self, max_workers: int = 8, max_requests_per_host: int = 2):
+        self.max_workers = max_workers
+        self.host_limiter = HostLimiter(max_requests_per_host)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="fetch")
+
+    def submit(self, function: Callable, *args, **kwargs) -> Future:
+        return self._executor.submit(function, *args, **kwargs)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True)
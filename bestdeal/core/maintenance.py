@@ -0,0 +1,69 @@
+import argparse
+from dotenv import load_dotenv
+from loguru import logger
+from bestdeal.core.pricedatabase import PriceDatabase
+
+
+def migrate_dates(database: PriceDatabase, arguments) -> None:
+    migrated_count = database.migrate_date_fields(batch_size=arguments.batch_size)
+    logger.info(f"[{migrated_count}] posts migrated in [{database.collection.name}]")
+
+
+def migrate_orderable(database: PriceDatabase, arguments) -> None:
+    database.migrate_orderable_field()
+
+
+def rebuild_daily_minimums(database: PriceDatabase, arguments) -> None:
+    rebuilt_count = database.rebuild_daily_minimums(batch_size=arguments.batch_size)
+    logger.info(f"[{rebuilt_count}] daily minimums rebuilt in [{database.daily_minimum_collection.name}]")
+
+
+def rebuild_all_time_lows(database: PriceDatabase, arguments) -> None:
+    rebuilt_count = database.rebuild_all_time_lows(batch_size=arguments.batch_size)
+    logger.info(f"[{rebuilt_count}] all time lows rebuilt in [{database.all_time_low_collection.name}]")
+
+
+def create_indexes(database: PriceDatabase, arguments) -> None:
+    database.ensure_indexes()
+
+
+def check_indexes(database: PriceDatabase, arguments) -> None:
+    database.check_query_plans()
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="BestDeal database maintenance")
+    parser.add_argument("--collection", action="append", dest="collections",
+                        help="collection to process, repeat for several (default: CPU and GPU)")
+    subparsers = parser.add_subparsers(dest="command")
+    subparsers.required = True
+
+    migrate_dates_parser = subparsers.add_parser("migrate-dates", help="add native date and day fields to old posts")
+    migrate_dates_parser.add_argument("--batch-size", type=int, default=1000)
+    migrate_dates_parser.set_defaults(function=migrate_dates)
+
+    migrate_orderable_parser = subparsers.add_parser("migrate-orderable", help="add orderable flag to old posts")
+    migrate_orderable_parser.set_defaults(function=migrate_orderable)
+
+    rebuild_parser = subparsers.add_parser("rebuild-daily-minimums", help="recompute daily minimums from every post")
+    rebuild_parser.add_argument("--batch-size", type=int, default=1000)
+    rebuild_parser.set_defaults(function=rebuild_daily_minimums)
+
+    rebuild_lows_parser = subparsers.add_parser("rebuild-all-time-lows", help="recompute all time lows from every post")
+    rebuild_lows_parser.add_argument("--batch-size", type=int, default=1000)
+    rebuild_lows_parser.set_defaults(function=rebuild_all_time_lows)
+
+    create_indexes_parser = subparsers.add_parser("create-indexes", help="create missing indexes")
+    create_indexes_parser.set_defaults(function=create_indexes)
+
+    check_indexes_parser = subparsers.add_parser("check-indexes", help="fail if a query falls back to a collection scan")
+    check_indexes_parser.set_defaults(function=check_indexes)
+
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    args = parse_arguments()
+    for collection_name in args.collections or ["CPU", "GPU"]:
+        args.function(PriceDatabase(collection_name=collection_name, create_indexes=False), args)
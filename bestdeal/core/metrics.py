@@ -0,0 +1,236 @@
+import json
+import threading
+import contextlib
+import socketserver
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from typing import Callable, Dict, List, Optional, Tuple, Iterable
+from loguru import logger
+from pymongo import monitoring
+
+CommandKey = Tuple[str, str]
+
+
+class ThreadingHTTPServer(socketserver.ThreadingMixIn, HTTPServer):
+    """
+    http.server.ThreadingHTTPServer is only available from Python 3.7
+    """
+    daemon_threads = True
+
+
+class CommandMetrics(monitoring.CommandListener):
+    """
+    Round trips and latency of database commands per (collection, command), fed by pymongo command monitoring.
+    Only clients created after registration are monitored. SqlitePriceDatabase statements are recorded by record().
+    Commands are counted in the scope of the thread sending them (e.g. the fetcher name, see scoped and bind),
+    so fetchers of one process (Runner) only read their own commands.
+    """
+
+    def __init__(self):
+        self._started: Dict[int, Tuple[Optional[str], CommandKey]] = {}
+        self._values: Dict[Tuple[Optional[str], CommandKey], Dict[str, float]] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def get_scope(self) -> Optional[str]:
+        return getattr(self._local, "scope", None)
+
+    @contextlib.contextmanager
+    def scoped(self, scope: Optional[str]):
+        """
+        Count commands sent by the current thread in scope
+        """
+        previous_scope = self.get_scope()
+        self._local.scope = scope
+        try:
+            yield
+        finally:
+            self._local.scope = previous_scope
+
+    def bind(self, function: Callable) -> Callable:
+        """
+        Wrap a thread target: commands it sends are counted in the scope of the thread creating it
+        """
+        scope = self.get_scope()
+
+        def run_in_scope(*arguments, **keywords):
+            with self.scoped(scope):
+                return function(*arguments, **keywords)
+
+        return run_in_scope
+
+    @staticmethod
+    def _get_key(event) -> CommandKey:
+        collection = event.command.get(event.command_name)
+        return collection if isinstance(collection, str) else "", event.command_name
+
+    def _add(self, key: Tuple[Optional[str], CommandKey], seconds: float, failed: bool) -> None:
+        values = self._values.setdefault(key, {"count": 0, "seconds": 0., "failures": 0})
+        values["count"] += 1
+        values["seconds"] += seconds
+        values["failures"] += failed
+
+    def _record(self, event, failed: bool) -> None:
+        with self._lock:
+            key = self._started.pop(event.request_id, None)
+            if key is None:
+                return
+            self._add(key, event.duration_micros / 1e6, failed)
+
+    def record(self, collection: str, command_name: str, seconds: float, failed: bool = False) -> None:
+        """
+        Count a command not sent by pymongo (SQLite statements), in the scope of the current thread
+        """
+        with self._lock:
+            self._add((self.get_scope(), (collection, command_name)), seconds, failed)
+
+    def started(self, event) -> None:
+        with self._lock:
+            self._started[event.request_id] = (self.get_scope(), self._get_key(event))
+
+    def succeeded(self, event) -> None:
+        self._record(event, failed=False)
+
+    def failed(self, event) -> None:
+        self._record(event, failed=True)
+
+    def snapshot(self, scope: Optional[str] = None) -> Dict[CommandKey, Dict[str, float]]:
+        """
+        Counters of commands sent in scope
+        """
+        with self._lock:
+            return {key: dict(values) for (key_scope, key), values in self._values.items() if key_scope == scope}
+
+    @staticmethod
+    def difference(after: Dict[CommandKey, Dict[str, float]],
+                   before: Dict[CommandKey, Dict[str, float]],
+                   collections: Iterable[str]) -> Dict[CommandKey, Dict[str, float]]:
+        """
+        Commands sent between two snapshots on collections
+        """
+        collections = set(collections)
+        result = {}
+        for key, values in after.items():
+            if key[0] not in collections:
+                continue
+            previous = before.get(key, {})
+            delta = {name: value - previous.get(name, 0) for name, value in values.items()}
+            if delta["count"]:
+                result[key] = delta
+        return result
+
+
+# Monitors every MongoClient created by the process
+default_command_metrics = CommandMetrics()
+monitoring.register(default_command_metrics)
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for value in labels.values())
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(labels, escaped)) + "}"
+
+
+class MetricsRegistry:
+    """
+    Latest cycle report of every fetcher, rendered as JSON or Prometheus text format
+    """
+
+    def __init__(self):
+        self._reports: Dict[str, dict] = {}
+        self._cycle_counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def update(self, report: dict) -> None:
+        with self._lock:
+            self._reports[report["fetcher"]] = report
+            self._cycle_counts[report["fetcher"]] = self._cycle_counts.get(report["fetcher"], 0) + 1
+
+    def render_json(self) -> str:
+        with self._lock:
+            return json.dumps({"cycles": dict(self._cycle_counts), "reports": dict(self._reports)}, default=str)
+
+    def render_prometheus(self) -> str:
+        samples: Dict[str, List[str]] = {}
+
+        def add(metric: str, labels: Dict[str, str], value) -> None:
+            samples.setdefault(metric, []).append(f"{metric}{_format_labels(labels)} {value}")
+
+        with self._lock:
+            for fetcher, cycle_count in self._cycle_counts.items():
+                add("bestdeal_cycles_total", {"fetcher": fetcher}, cycle_count)
+            for fetcher, report in self._reports.items():
+                add("bestdeal_cycle_wall_seconds", {"fetcher": fetcher}, report["wall_seconds"])
+                add("bestdeal_cycle_inserted_posts", {"fetcher": fetcher}, report["inserted_posts"])
+                add("bestdeal_cycle_deals", {"fetcher": fetcher}, report["deals_count"])
+                for stage, seconds in report["stages"].items():
+                    add("bestdeal_cycle_stage_seconds", {"fetcher": fetcher, "stage": stage}, seconds)
+                for page in report["pages"]:
+                    labels = {"fetcher": fetcher, "source": page["source"], "product": page["product"]}
+                    add("bestdeal_page_bytes", labels, page["bytes_downloaded"])
+                    add("bestdeal_page_download_seconds", labels, page["download_ms"] / 1000)
+                    add("bestdeal_page_parse_seconds", labels, page["parse_ms"] / 1000)
+                    add("bestdeal_page_deals", labels, page["deals_count"])
+                    add("bestdeal_page_classification_misses", labels, page["classification_misses"])
+                    add("bestdeal_page_failed", labels, int(page["status"] == "failed"))
+                for command in report["database"]:
+                    labels = {"fetcher": fetcher, "collection": command["collection"], "command": command["command"]}
+                    add("bestdeal_database_round_trips", labels, command["count"])
+                    add("bestdeal_database_seconds", labels, command["seconds"])
+                    add("bestdeal_database_failures", labels, command["failures"])
+        lines = []
+        for metric, metric_samples in samples.items():
+            lines.append(f"# TYPE {metric} {'counter' if metric.endswith('_total') else 'gauge'}")
+            lines.extend(metric_samples)
+        return "\n".join(lines) + "\n"
+
+
+# Updated by every fetcher of the process
+default_metrics_registry = MetricsRegistry()
+
+
+class MetricsServer:
+    """
+    Serve /metrics (Prometheus text format) and /metrics.json from a background thread
+    """
+
+    def __init__(self, registry: MetricsRegistry = default_metrics_registry, host: str = "0.0.0.0", port: int = 9108):
+        self.registry = registry
+        self._server = ThreadingHTTPServer((host, port), self._create_handler_class())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="metrics-server", daemon=True)
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def start(self) -> "MetricsServer":
+        self._thread.start()
+        logger.info(f"Metrics available on port [{self.port}]")
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _create_handler_class(self):
+        registry = self.registry
+
+        class MetricsRequestHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/metrics":
+                    body, content_type = registry.render_prometheus(), "text/plain; version=0.0.4"
+                elif self.path == "/metrics.json":
+                    body, content_type = registry.render_json(), "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                content = body.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def log_message(self, format, *args):
+                pass
+
+        return MetricsRequestHandler
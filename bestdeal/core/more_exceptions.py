@@ -1,2 +1,26 @@
 class SkipTweet(Exception):
     pass
+
+
+class PageNotModified(Exception):
+    """
+    Vendor page did not change since previous fetch (HTTP 304 or same content)
+    """
+    pass
+
+
+class CollectionScanError(Exception):
+    """
+    A database query is not covered by any index
+    """
+    pass
+
+
+class PublishRateLimited(Exception):
+    """
+    Publishing API refused a post until retry_after seconds have elapsed
+    """
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Rate limited, retry after [{retry_after}] seconds")
+        self.retry_after = retry_after
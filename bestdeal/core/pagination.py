@@ -0,0 +1,29 @@
+import re
+from typing import List
+from urllib.parse import urlsplit, urlunsplit, unquote_plus, quote_plus
+
+
+def set_query_parameter(url: str, name: str, value) -> str:
+    """
+    Replace (or add) one query parameter, other parameters and fragment are kept as written by the vendor
+    (e.g. Cybertek and GrosBill criteria keep their %3a)
+    """
+    parts = urlsplit(url)
+    query = [pair for pair in parts.query.split("&") if pair and unquote_plus(pair.split("=", 1)[0]) != name]
+    query.append(f"{quote_plus(name)}={quote_plus(str(value))}")
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, "&".join(query), parts.fragment))
+
+
+def find_last_page_number(content: bytes, parameter: str = "page") -> int:
+    """
+    Highest page number linked from a listing page (e.g. href="...?page=4"), 1 without pagination links
+    """
+    pattern = re.compile(rb'href="[^"]*[?&](?:amp;)?' + re.escape(parameter.encode("ascii")) + rb'=(\d+)')
+    return max((int(number) for number in pattern.findall(content)), default=1)
+
+
+def build_page_urls(url: str, last_page: int, parameter: str = "page") -> List[str]:
+    """
+    Urls of pages 2 to last_page of the listing whose first page is url
+    """
+    return [set_query_parameter(url, parameter, number) for number in range(2, last_page + 1)]
@@ -1,17 +1,34 @@
 import os
-from pymongo import MongoClient, ASCENDING
-from typing import Optional
+from datetime import datetime
+from pymongo import MongoClient, ASCENDING, DESCENDING, UpdateOne, InsertOne, IndexModel
+from pymongo.write_concern import WriteConcern
+from typing import Optional, Dict, List, Iterator, Iterable, Tuple
 from loguru import logger
-from bestdeal.core.toolbox import get_today_date
+from bestdeal.core.more_exceptions import CollectionScanError
+from bestdeal.core.classifier import ClassificationStore, MongoClassificationStore
+from bestdeal.core.storage import PriceStorage
+from bestdeal.core.toolbox import get_today_date, convert_day_to_datetime
 
 
-class PriceDatabase:
+class PriceDatabase(PriceStorage):
     """
     Powered by MongoDB <3
     https://www.mongodb.com
+
+    Every post carries its "timestamp" (20200515_130607 string), a native "date" (BSON datetime, UTC)
+    and a "day" key (20200515). Daily lookups are equality matches on "day",
+    "since" lookups are range scans on "date".
+    Posts from sources that cannot be ordered from France are flagged "orderable": False,
+    price comparisons only read orderable posts through partial indexes.
+    "{collection}DailyMinimum" holds the cheapest orderable post per day and product type,
+    for every source ("scope": "*") and per source ("scope": source name).
+    It is updated on each insert batch and rebuilt by rebuild_daily_minimums.
+    "{collection}AllTimeLow" holds the cheapest orderable post ever per product type ("scope": "*")
+    and per product name ("scope": product name), updated the same way and rebuilt by rebuild_all_time_lows.
+    "{collection}Cycle" remembers when a fetcher cycle last inserted posts, readers invalidate their caches with it.
     """
 
-    def __init__(self, collection_name: str, client: Optional[MongoClient] = None):
+    def __init__(self, collection_name: str, client: Optional[MongoClient] = None, create_indexes: bool = True):
         self.database_name = "PriceHistorization"
         logger.info('Connecting to database [{}]'.format(self.database_name))
         if client is not None:
@@ -21,98 +38,429 @@ class PriceDatabase:
         self.database = self.client[self.database_name]
         self.collection = self.database[collection_name]
         self.tweet_collection = self.database["Tweet"]
+        self.daily_minimum_collection = self.database[f"{collection_name}DailyMinimum"]
+        self.all_time_low_collection = self.database[f"{collection_name}AllTimeLow"]
+        self.cycle_collection = self.database[f"{collection_name}Cycle"]
+        self.cycle_report_collection = self.database[f"{collection_name}CycleReport"]
+        if create_indexes:
+            self.ensure_indexes()
+
+    @staticmethod
+    def _get_post_indexes() -> List[IndexModel]:
+        """
+        One index per query shape, see check_query_plans
+        """
+        orderable_only = {"orderable": True}
+        return [
+            IndexModel([("product_type", ASCENDING), ("day", ASCENDING), ("product_price", ASCENDING)],
+                       name="orderable_product_type_day_price", partialFilterExpression=orderable_only),
+            IndexModel([("product_type", ASCENDING), ("product_price", ASCENDING)],
+                       name="orderable_product_type_price", partialFilterExpression=orderable_only),
+            IndexModel([("product_name", ASCENDING), ("day", ASCENDING), ("timestamp", ASCENDING)],
+                       name="product_name_day_timestamp"),
+            IndexModel([("day", ASCENDING), ("timestamp", ASCENDING)],
+                       name="day_timestamp"),
+            IndexModel([("date", ASCENDING)],
+                       name="date"),
+        ]
+
+    @staticmethod
+    def _get_tweet_indexes() -> List[IndexModel]:
+        return [
+            IndexModel([("product_type", ASCENDING), ("date", ASCENDING)], name="product_type_date"),
+            IndexModel([("date", ASCENDING), ("product_type", ASCENDING)], name="date_product_type"),
+        ]
+
+    @staticmethod
+    def _get_daily_minimum_indexes() -> List[IndexModel]:
+        return [
+            IndexModel([("day", ASCENDING), ("scope", ASCENDING), ("product_price", ASCENDING)], name="day_scope_price"),
+        ]
+
+    @staticmethod
+    def _get_cycle_report_indexes() -> List[IndexModel]:
+        return [
+            IndexModel([("fetcher", ASCENDING), ("date", DESCENDING)], name="fetcher_date"),
+        ]
+
+    def ensure_indexes(self) -> None:
+        """
+        Idempotent: existing indexes with the same definition are left untouched
+        """
+        self.collection.create_indexes(self._get_post_indexes())
+        self.tweet_collection.create_indexes(self._get_tweet_indexes())
+        self.daily_minimum_collection.create_indexes(self._get_daily_minimum_indexes())
+        self.cycle_report_collection.create_indexes(self._get_cycle_report_indexes())
+        # All time lows are only read by _id
+
+    @staticmethod
+    def build_date_filter(day: Optional[str] = None, since: Optional[datetime] = None) -> dict:
+        """
+        Example: build_date_filter(day=get_today_date()) or build_date_filter(since=convert_day_to_datetime("20211101"))
+        """
+        date_filter = {}
+        if day is not None:
+            date_filter["day"] = day
+        if since is not None:
+            date_filter["date"] = {"$gte": since}
+        return date_filter
+
+    def tweet_exists(self, product_type: str, day: Optional[str] = None) -> bool:
+        day = get_today_date() if day is None else day
+        return self.tweet_collection.find_one({"product_type": product_type, "date": day}, {"_id": 1}) is not None
 
-    def tweet_exists(self, product_type: str):
-        today_date = get_today_date()
-        cursor = self.tweet_collection.find({"product_type": product_type, "date": today_date})
-        return cursor.count() == 1
+    def find_tweeted_product_types(self, day: str) -> List[str]:
+        """
+        Product types already tweeted on day, in one query
+        """
+        return self.tweet_collection.distinct("product_type", {"date": day})
 
-    def insert_tweet_status(self, product_type: str):
-        today_date = get_today_date()
+    def insert_tweet_status(self, product_type: str, day: Optional[str] = None):
         post = {"product_type":  product_type,
-                "date":          today_date}
-        self.tweet_collection.insert(post)
+                "date":          get_today_date() if day is None else day}
+        self.tweet_collection.insert_one(post)
 
     def bulk_insert(self, posts):
         logger.debug(f"Inserting [{len(posts)}] posts")
+        for post in posts:
+            self._complete_post(post)
         result = self.collection.insert_many(posts)
         logger.debug(result)
+        self.update_minimums(posts)
+
+    def bulk_write_posts(self, posts: List[dict], write_concern: Optional[WriteConcern] = None) -> Optional[int]:
+        """
+        Unordered bulk insert: the server applies inserts in parallel and one failure does not stop the others.
+        :return: inserted posts count, None with unacknowledged write concern (unknown)
+        """
+        collection = self.collection if write_concern is None else self.collection.with_options(write_concern=write_concern)
+        result = collection.bulk_write([InsertOne(self._complete_post(post)) for post in posts], ordered=False)
+        self.update_minimums(posts)
+        return result.inserted_count if result.acknowledged else None
+
+    @staticmethod
+    def build_minimum_operations(minimums: Iterable[dict]) -> List[UpdateOne]:
+        """
+        Keep the cheapest document per _id: insert when missing, replace fields only when cheaper.
+        The price condition is evaluated by the server, concurrent writers cannot raise a minimum.
+        """
+        operations = []
+        for minimum in minimums:
+            fields = {key: value for key, value in minimum.items() if key != "_id"}
+            operations.append(UpdateOne({"_id": minimum["_id"]}, {"$setOnInsert": fields}, upsert=True))
+            operations.append(UpdateOne({"_id": minimum["_id"], "product_price": {"$gt": minimum["product_price"]}},
+                                        {"$set": fields}))
+        return operations
+
+    def update_minimums(self, posts: List[dict]) -> None:
+        """
+        Ordered writes: each conditional update must run after the upsert of the same _id
+        """
+        for collection, minimums in [(self.daily_minimum_collection, self.select_daily_minimums(posts)),
+                                     (self.all_time_low_collection, self.select_all_time_lows(posts))]:
+            if minimums:
+                collection.bulk_write(self.build_minimum_operations(minimums.values()), ordered=True)
+
+    def _write_minimums(self, collection, minimums: List[dict], batch_size: int) -> None:
+        for start in range(0, len(minimums), batch_size):
+            collection.bulk_write(self.build_minimum_operations(minimums[start:start + batch_size]), ordered=True)
+
+    def _aggregate_cheapest_posts(self, post_filter: dict, group_key: dict) -> Iterator[dict]:
+        cursor = self.collection.aggregate([
+            {"$match": post_filter},
+            {"$sort": {"product_price": ASCENDING}},
+            {"$group": {"_id": group_key, "post": {"$first": "$$ROOT"}}},
+        ], allowDiskUse=True)
+        for entry in cursor:
+            yield entry["post"]
+
+    def rebuild_daily_minimums(self, batch_size: int = 1000) -> int:
+        """
+        Recompute daily minimums from every orderable post, one day at a time
+        """
+        rebuilt_count = 0
+        self.daily_minimum_collection.delete_many({})
+        for day in sorted(day for day in self.collection.distinct("day", {"orderable": True}) if day is not None):
+            cheapest_posts = self._aggregate_cheapest_posts({"orderable": True, "day": day},
+                                                            {"product_type": "$product_type", "source": "$source"})
+            minimums = list(self.select_daily_minimums(cheapest_posts).values())
+            self._write_minimums(self.daily_minimum_collection, minimums, batch_size)
+            rebuilt_count += len(minimums)
+            logger.info(f"Rebuilt [{rebuilt_count}] daily minimums of [{self.collection.name}] up to [{day}]")
+        return rebuilt_count
+
+    def rebuild_all_time_lows(self, batch_size: int = 1000) -> int:
+        """
+        Recompute all time lows from every orderable post, one product type at a time
+        """
+        rebuilt_count = 0
+        self.all_time_low_collection.delete_many({})
+        for product_type in self.find_distinct_product_types():
+            cheapest_posts = self._aggregate_cheapest_posts({"orderable": True, "product_type": product_type},
+                                                            {"product_name": "$product_name"})
+            minimums = list(self.select_all_time_lows(cheapest_posts).values())
+            self._write_minimums(self.all_time_low_collection, minimums, batch_size)
+            rebuilt_count += len(minimums)
+        logger.info(f"Rebuilt [{rebuilt_count}] all time lows of [{self.collection.name}]")
+        return rebuilt_count
+
+    def find_daily_minimum(self, day: str, product_type: Optional[str] = None, source: Optional[str] = None) -> Optional[dict]:
+        """
+        Cheapest orderable post of day from daily minimums, None when there is none.
+        Example: find_daily_minimum(get_today_date(), "3090") or find_daily_minimum(get_today_date(), source="LDLC")
+        """
+        scope = self.all_sources_scope if source is None else source
+        if product_type is not None:
+            return self.daily_minimum_collection.find_one({"_id": f"{day}|{product_type}|{scope}"})
+        cursor = self.daily_minimum_collection.find({"day": day, "scope": scope}).sort("product_price", ASCENDING)
+        for minimum in cursor.limit(1):
+            return minimum
+        return None
+
+    def record_cycle(self, timestamp: str, inserted_posts: int) -> None:
+        """
+        Called by fetchers after a cycle that inserted posts
+        """
+        self.cycle_collection.update_one({"_id": "last_cycle"},
+                                         {"$set": {"timestamp": timestamp, "inserted_posts": inserted_posts}},
+                                         upsert=True)
+
+    def find_last_cycle_timestamp(self) -> Optional[str]:
+        last_cycle = self.cycle_collection.find_one({"_id": "last_cycle"})
+        return last_cycle["timestamp"] if last_cycle else None
+
+    def get_collection_names(self) -> List[str]:
+        return [collection.name for collection in [self.collection, self.tweet_collection, self.daily_minimum_collection,
+                                                   self.all_time_low_collection, self.cycle_collection,
+                                                   self.cycle_report_collection]]
+
+    def get_classification_store(self) -> ClassificationStore:
+        return MongoClassificationStore(self.database["ClassificationCache"])
+
+    def insert_cycle_report(self, report: dict) -> None:
+        """
+        Per stage, per page and database timings of a fetcher cycle (see CycleSummary.to_report)
+        """
+        self.cycle_report_collection.insert_one(dict(report))
+
+    def find_cycle_reports(self, fetcher: str, limit: int = 10) -> List[dict]:
+        """
+        Most recent reports first
+        """
+        return list(self.cycle_report_collection.find({"fetcher": fetcher}, {"_id": False})
+                    .sort("date", DESCENDING).limit(limit))
+
+    def find_filter_facets(self, day: str, criteria: Iterable[str] = ("product_type", "source", "product_brand")) -> Dict[str, list]:
+        """
+        Distinct values of several criteria for orderable posts of day, in one aggregation.
+        Example: find_filter_facets(get_today_date())["source"]
+        """
+        criteria = list(criteria)
+        cursor = self.collection.aggregate([
+            {"$match": {"orderable": True, "day": day}},
+            {"$facet": {criterion: [{"$group": {"_id": f"${criterion}"}}, {"$sort": {"_id": ASCENDING}}]
+                        for criterion in criteria}},
+        ])
+        facets = next(cursor, {})
+        return {criterion: [value["_id"] for value in facets.get(criterion, [])] for criterion in criteria}
 
     def find_distinct_product_types(self) -> list:
-        return self.collection.distinct("product_type")
+        """
+        Only product types that can be ordered (partial index)
+        """
+        return self.collection.distinct("product_type", {"orderable": True})
 
-    def find_distinct_criteria_by_date(self, criteria: str, datetime_regex: str) -> list:
+    def find_distinct_criteria_by_date(self, criteria: str, day: str) -> list:
         """
         Generic
         """
-        return self.collection.distinct(
-            criteria,
-            {
-                "source": {"$ne": "MindFactory"},
-                "timestamp": {'$regex': datetime_regex},
-            },
-        )
+        post_filter = {"orderable": True}
+        post_filter.update(self.build_date_filter(day=day))
+        return self.collection.distinct(criteria, post_filter)
 
     def find_all_posts_by_filters(
             self,
-            datetime_regex: str,
+            day: str,
             product_type: Optional[str] = None,
             product_brand: Optional[str] = None,
             source: Optional[str] = None,
     ):
-        post_filter = {"timestamp": {'$regex': datetime_regex}}
+        mongo_cursor = self.collection.find(self._build_posts_filter(day, product_type, product_brand, source))
+        return mongo_cursor
+
+    def find_cheapest_by_filters(self,
+                                 day: str,
+                                 product_type: Optional[str] = None,
+                                 product_brand: Optional[str] = None,
+                                 source: Optional[str] = None) -> Optional[dict]:
+        """
+        Cheapest orderable post matching filters, like daily minimums
+        """
+        post_filter = self._build_posts_filter(day, product_type, product_brand, source)
+        post_filter["orderable"] = True
+        return self.find_cheapest_from_cursor(self.collection.find(post_filter))
+
+    def _build_posts_filter(self,
+                            day: str,
+                            product_type: Optional[str] = None,
+                            product_brand: Optional[str] = None,
+                            source: Optional[str] = None) -> dict:
+        post_filter = self.build_date_filter(day=day)
         if product_type is not None:
             post_filter["product_type"] = product_type
         if source is not None:
             post_filter["source"] = source
         if product_brand is not None:
             post_filter["product_brand"] = product_brand
+        return post_filter
 
-        mongo_cursor = self.collection.find(post_filter)
-        return mongo_cursor
+    def find_posts_page(self,
+                        day: str,
+                        product_type: Optional[str] = None,
+                        product_brand: Optional[str] = None,
+                        source: Optional[str] = None,
+                        page: int = 0,
+                        page_size: int = 100,
+                        columns: Iterable[str] = ("product_type", "product_price", "product_name", "product_brand",
+                                                  "source", "url", "timestamp")) -> Tuple[int, List[dict]]:
+        """
+        One page of posts sorted by price, only columns are transferred.
+        :return: total count of matching posts and rows of page, from a single aggregation
+        """
+        projection = {"_id": 0}
+        projection.update({column: 1 for column in columns})
+        cursor = self.collection.aggregate([
+            {"$match": self._build_posts_filter(day, product_type, product_brand, source)},
+            {"$facet": {
+                "total": [{"$count": "count"}],
+                "rows": [{"$sort": {"product_price": ASCENDING, "_id": ASCENDING}},
+                         {"$skip": page * page_size},
+                         {"$limit": page_size},
+                         {"$project": projection}],
+            }},
+        ])
+        result = next(cursor, {})
+        total = result["total"][0]["count"] if result.get("total") else 0
+        return total, result.get("rows", [])
 
     def find_cheapest_from_cursor(self, mongo_cursor):
         sorted_cursor = mongo_cursor.sort("product_price", ASCENDING)
         for post in sorted_cursor.limit(1):
             return post
 
-    def find_available_product_types_by_date(self, datetime_regex: str):
-        return self.find_distinct_criteria_by_date("product_type", datetime_regex)
-
-    def find_all_posts_by_product_type(self, product_type: str, datetime_regex: str):
+    def find_all_posts_by_product_type(self, product_type: str, day: str):
         """
         Example: find_all_posts_by_product_type("3090", get_today_date())
         Do not fetch MindFactory (cannot be ordered from France!)
         """
-        cursor = self.collection.find(
-            {"product_type": product_type,
-             "source": {"$ne": "MindFactory"},
-             "timestamp": {'$regex': datetime_regex}}
-        )
-        return cursor
+        post_filter = {"product_type": product_type, "orderable": True}
+        post_filter.update(self.build_date_filter(day=day))
+        return self.collection.find(post_filter)
 
-    def find_last_price(self, product_name: str, datetime_regex: str):
+    def find_last_price(self, product_name: str, day: str):
         """
         Example find_last_price("KFA2 GeForce RTX 2080 Ti EX (1-Click OC), 11 Go", get_today_date())
         Do not fetch MindFactory (cannot be ordered from France!)
         """
-        cursor = self.collection.find({"product_name": product_name,
-                                       "source": {"$ne": "MindFactory"},
-                                       "timestamp": {'$regex': datetime_regex}})
-        cursor = cursor.sort("timestamp", ASCENDING)
+        post_filter = {"product_name": product_name, "orderable": True}
+        post_filter.update(self.build_date_filter(day=day))
+        cursor = self.collection.find(post_filter)
+        cursor = cursor.sort("timestamp", DESCENDING)
         for post in cursor.limit(1):
             return post
         # TODO: implement specific exception
         raise Exception("Missing last price")
 
-    def find_cheapest(self, product_type: str, timestamp_regex: Optional[str]):
+    def find_last_prices(self, day: str) -> Dict[str, float]:
+        """
+        Latest price of every product posted on day, in one aggregation.
+        Example find_last_prices(get_today_date())["KFA2 GeForce RTX 2080 Ti EX (1-Click OC), 11 Go"]
+        Do not fetch MindFactory (cannot be ordered from France!)
+        """
+        post_filter = {"orderable": True}
+        post_filter.update(self.build_date_filter(day=day))
+        cursor = self.collection.aggregate([
+            {"$match": post_filter},
+            {"$sort": {"timestamp": ASCENDING}},
+            {"$group": {"_id": "$product_name", "product_price": {"$last": "$product_price"}}},
+        ])
+        return {post["_id"]: post["product_price"] for post in cursor}
+
+    def find_all_time_low(self, product_type: str, product_name: Optional[str] = None) -> Optional[dict]:
+        """
+        Cheapest orderable post ever of a product type, or of one product of this type.
+        Example: find_all_time_low("3090") or find_all_time_low("3090", "KFA2 GeForce RTX 3090 SG (1-Click OC), 24 Go")
+        """
+        scope = self.all_sources_scope if product_name is None else product_name
+        return self.all_time_low_collection.find_one({"_id": f"{product_type}|{scope}"})
+
+    def find_cheapest_per_product_type(self, day: str) -> Dict[str, dict]:
+        """
+        Cheapest orderable post of every product type posted on day, in one query.
+        Example: find_cheapest_per_product_type(get_today_date())["3090"]
+        Read from daily minimums, product types missing from the rollup (day not or partly rolled up)
+        are aggregated from posts.
+        """
+        cursor = self.daily_minimum_collection.find({"day": day, "scope": self.all_sources_scope})
+        cheapest_posts = {minimum["product_type"]: minimum for minimum in cursor}
+        missing_product_types = [product_type for product_type in self.find_distinct_criteria_by_date("product_type", day)
+                                 if product_type is not None and product_type not in cheapest_posts]
+        if missing_product_types:
+            post_filter = {"orderable": True, "day": day, "product_type": {"$in": missing_product_types}}
+            for post in self._aggregate_cheapest_posts(post_filter, "$product_type"):
+                cheapest_posts[post["product_type"]] = post
+        return cheapest_posts
+
+    def find_daily_minimums(self,
+                            start_day: str,
+                            end_day: str,
+                            product_types: Optional[List[str]] = None,
+                            per_source: bool = False,
+                            bucket_days: int = 1) -> List[dict]:
+        """
+        Price history from daily minimums in one aggregation: [{"day", "product_type", "source", "product_price"}]
+        "source" is "*" unless per_source.
+        bucket_days > 1 downsamples long ranges server side, each row is then the minimum of bucket_days days
+        dated by its first day.
+        Example: find_daily_minimums("20210101", "20211231", ["3080", "3090"], bucket_days=7)
+        """
+        minimum_filter = {"day": {"$gte": start_day, "$lte": end_day},
+                          "scope": {"$ne": self.all_sources_scope} if per_source else self.all_sources_scope}
+        if product_types is not None:
+            minimum_filter["product_type"] = {"$in": product_types}
+        pipeline = [{"$match": minimum_filter}]
+        if bucket_days > 1:
+            bucket_milliseconds = bucket_days * 24 * 60 * 60 * 1000
+            start_date = convert_day_to_datetime(start_day)
+            pipeline += [
+                {"$group": {"_id": {"product_type": "$product_type", "scope": "$scope",
+                                    "bucket": {"$floor": {"$divide": [{"$subtract": ["$date", start_date]}, bucket_milliseconds]}}},
+                            "day": {"$min": "$day"},
+                            "product_price": {"$min": "$product_price"}}},
+                {"$project": {"_id": 0, "day": 1, "product_type": "$_id.product_type", "source": "$_id.scope", "product_price": 1}},
+            ]
+        else:
+            pipeline += [{"$project": {"_id": 0, "day": 1, "product_type": 1, "source": "$scope", "product_price": 1}}]
+        pipeline.append({"$sort": {"day": ASCENDING}})
+        return list(self.daily_minimum_collection.aggregate(pipeline))
+
+    def find_cheapest(self, product_type: str, day: Optional[str], since: Optional[datetime] = None):
         """
         Example: find_cheapest("3090", get_today_date())
+        Cheapest ever when day and since are None.
+        Daily and cheapest ever lookups read daily minimums and all time lows,
+        posts are only scanned when those have not been built yet.
         Do not fetch MindFactory (cannot be ordered from France!)
         """
-        post_filter = {"product_type": product_type, "source": {"$ne": "MindFactory"}}
-        if timestamp_regex is not None:
-            post_filter["timestamp"] = {'$regex': timestamp_regex}
+        minimum = None
+        if day is not None and since is None:
+            minimum = self.find_daily_minimum(day, product_type)
+        elif day is None and since is None:
+            minimum = self.find_all_time_low(product_type)
+        if minimum is not None:
+            return minimum
+        post_filter = {"product_type": product_type, "orderable": True}
+        post_filter.update(self.build_date_filter(day=day, since=since))
         first_cursor = self.collection.find(post_filter)
         second_cursor = first_cursor.sort("product_price", ASCENDING)
         for post in second_cursor.limit(1):
@@ -128,3 +476,115 @@ class PriceDatabase:
         anomaly_filter = {"product_price": {"$lt": throttle}}
         cursor = self.collection.delete_many(anomaly_filter)
         logger.info(f"Deleted [{cursor.deleted_count}] under [{throttle}]€")
+
+    def clear_posts(self) -> None:
+        for collection in [self.collection, self.daily_minimum_collection, self.all_time_low_collection]:
+            collection.delete_many({})
+
+    def migrate_date_fields(self, batch_size: int = 1000) -> int:
+        """
+        Add "date" and "day" to posts stored before these fields existed.
+        Only posts missing "date" are selected, so an interrupted migration resumes where it stopped.
+        """
+        migrated_count = 0
+        while True:
+            cursor = self.collection.find({"date": {"$exists": False}}, {"timestamp": 1}).limit(batch_size)
+            operations = []
+            for post in cursor:
+                try:
+                    date_fields = self.add_date_fields({"timestamp": post["timestamp"]})
+                    del date_fields["timestamp"]
+                except (KeyError, TypeError, ValueError):
+                    logger.warning(f"Cannot convert timestamp of post [{post['_id']}]")
+                    date_fields = {"date": None, "day": None}
+                operations.append(UpdateOne({"_id": post["_id"]}, {"$set": date_fields}))
+            if not operations:
+                break
+            result = self.collection.bulk_write(operations, ordered=False)
+            migrated_count += result.modified_count
+            logger.info(f"Migrated [{migrated_count}] posts of [{self.collection.name}]")
+        return migrated_count
+
+    def migrate_orderable_field(self) -> int:
+        """
+        Flag posts stored before "orderable" existed
+        """
+        migrated_count = 0
+        for orderable, source_filter in [(False, {"$in": self.non_orderable_sources}),
+                                         (True, {"$nin": self.non_orderable_sources})]:
+            result = self.collection.update_many({"orderable": {"$exists": False}, "source": source_filter},
+                                                 {"$set": {"orderable": orderable}})
+            migrated_count += result.modified_count
+        logger.info(f"Flagged [{migrated_count}] posts of [{self.collection.name}]")
+        return migrated_count
+
+    def _explain(self, command: dict) -> dict:
+        return self.database.command("explain", command, verbosity="queryPlanner")
+
+    @classmethod
+    def _iterate_plan_stages(cls, explanation) -> Iterator[str]:
+        """
+        Every stage of winning plans, rejected plans are ignored
+        """
+        if isinstance(explanation, list):
+            for item in explanation:
+                yield from cls._iterate_plan_stages(item)
+        elif isinstance(explanation, dict):
+            for key, value in explanation.items():
+                if key == "rejectedPlans":
+                    continue
+                if key == "stage":
+                    yield value
+                yield from cls._iterate_plan_stages(value)
+
+    def _get_query_shapes(self) -> Dict[str, dict]:
+        """
+        Explain commands matching the queries sent by this class
+        """
+        today = get_today_date()
+        collection_name = self.collection.name
+        return {
+            "find_cheapest (day)": {"find": collection_name,
+                                    "filter": {"product_type": "3080", "orderable": True, "day": today},
+                                    "sort": {"product_price": ASCENDING}, "limit": 1},
+            "find_cheapest (ever)": {"find": collection_name,
+                                     "filter": {"product_type": "3080", "orderable": True},
+                                     "sort": {"product_price": ASCENDING}, "limit": 1},
+            "find_last_price": {"find": collection_name,
+                                "filter": {"product_name": "MSI RTX 3080", "orderable": True, "day": today},
+                                "sort": {"timestamp": DESCENDING}, "limit": 1},
+            "find_last_prices": {"aggregate": collection_name,
+                                 "pipeline": [{"$match": {"orderable": True, "day": today}}, {"$sort": {"timestamp": ASCENDING}}],
+                                 "cursor": {}},
+            "find_distinct_product_types": {"distinct": collection_name, "key": "product_type",
+                                            "query": {"orderable": True}},
+            "find_distinct_criteria_by_date": {"distinct": collection_name, "key": "source",
+                                               "query": {"orderable": True, "day": today}},
+            "find_daily_minimum (all types)": {"find": self.daily_minimum_collection.name,
+                                               "filter": {"day": today, "scope": self.all_sources_scope},
+                                               "sort": {"product_price": ASCENDING}, "limit": 1},
+            "find_filter_facets": {"aggregate": collection_name,
+                                   "pipeline": [{"$match": {"orderable": True, "day": today}},
+                                                {"$facet": {"source": [{"$group": {"_id": "$source"}}]}}],
+                                   "cursor": {}},
+            "find_cheapest_per_product_type": {"find": self.daily_minimum_collection.name,
+                                              "filter": {"day": today, "scope": self.all_sources_scope}},
+            "find_daily_minimums": {"aggregate": self.daily_minimum_collection.name,
+                                    "pipeline": [{"$match": {"day": {"$gte": today, "$lte": today},
+                                                             "scope": self.all_sources_scope}}],
+                                    "cursor": {}},
+            "tweet_exists": {"find": self.tweet_collection.name,
+                             "filter": {"product_type": "3080", "date": today}, "limit": 1},
+            "find_tweeted_product_types": {"distinct": self.tweet_collection.name, "key": "product_type",
+                                           "query": {"date": today}},
+        }
+
+    def check_query_plans(self) -> None:
+        """
+        Raise CollectionScanError if a query shape is not served by an index
+        """
+        for query_name, command in self._get_query_shapes().items():
+            stages = list(self._iterate_plan_stages(self._explain(command)))
+            if "COLLSCAN" in stages:
+                raise CollectionScanError(f"[{query_name}] scans the whole collection. Plan stages [{stages}]")
+            logger.info(f"[{query_name}] plan stages [{stages}]")
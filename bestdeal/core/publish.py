@@ -1,7 +1,12 @@
 import os
+import time
+import queue
+import threading
 import tweepy
-from typing import Optional
+from typing import Optional, Callable, List, Set, Hashable
 from loguru import logger
+from bestdeal.core.more_exceptions import PublishRateLimited
+from bestdeal.core.metrics import default_command_metrics
 
 
 def get_twitter_api():
@@ -20,6 +25,171 @@ def tweet(text_to_publish: Optional[str]):
         logger.warning("Nothing to publish...")
 
 
+class Publisher:
+    def publish(self, text_to_publish: str) -> None:
+        """
+        Raise PublishRateLimited when the API asks to slow down
+        """
+        raise NotImplementedError()
+
+
+class TwitterPublisher(Publisher):
+    """
+    One authenticated client for the whole process
+    """
+
+    default_rate_limit_wait = 15 * 60
+
+    def __init__(self):
+        self._api = None
+
+    def _get_api(self):
+        if self._api is None:
+            self._api = get_twitter_api()
+        return self._api
+
+    def publish(self, text_to_publish: str) -> None:
+        try:
+            self._get_api().update_status(status=text_to_publish)
+        except tweepy.RateLimitError as exception:
+            raise PublishRateLimited(self._get_retry_after(exception)) from exception
+
+    def _get_retry_after(self, exception) -> float:
+        response = getattr(exception, "response", None)
+        reset = response.headers.get("x-rate-limit-reset") if response is not None else None
+        if reset is None:
+            return self.default_rate_limit_wait
+        return max(float(reset) - time.time(), 1.)
+
+
+class StubPublisher(Publisher):
+    """
+    Keep publications in memory, for tests and benchmarks.
+    delay: seconds spent in each publication
+    """
+
+    def __init__(self, delay: float = 0.):
+        self.delay = delay
+        self.published: List[str] = []
+        self._lock = threading.Lock()
+
+    def publish(self, text_to_publish: str) -> None:
+        if self.delay:
+            time.sleep(self.delay)
+        with self._lock:
+            self.published.append(text_to_publish)
+
+
+class PublishQueue:
+    """
+    Publish from a background thread, so a slow API never delays scraping.
+    key identifies a publication, a key is never queued twice.
+    on_published(key) is called after each successful publication (from the publishing thread).
+    Failed publications are retried max_attempts times then abandoned, an abandoned key is never queued again.
+    Rate limits are waited for (at most max_rate_limit_wait seconds) and do not count as attempts.
+    """
+
+    def __init__(self,
+                 publisher: Publisher,
+                 on_published: Optional[Callable[[Hashable], None]] = None,
+                 max_attempts: int = 3,
+                 retry_delay: float = 30.,
+                 max_rate_limit_wait: float = 15 * 60.):
+        self.publisher = publisher
+        self.on_published = on_published
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.max_rate_limit_wait = max_rate_limit_wait
+        self._queue = queue.Queue()
+        self._pending: Set[Hashable] = set()
+        self._abandoned: Set[Hashable] = set()
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        # on_published database writes are counted in the scope of the fetcher creating the queue
+        self._thread = threading.Thread(target=default_command_metrics.bind(self._run), name="publisher", daemon=True)
+        self._thread.start()
+
+    def submit(self, key: Hashable, text_to_publish: str) -> bool:
+        """
+        :return: False when a publication with the same key is still pending or has been abandoned
+        """
+        with self._lock:
+            if key in self._pending or key in self._abandoned:
+                return False
+            self._pending.add(key)
+        self._queue.put((key, text_to_publish))
+        return True
+
+    def is_pending(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._pending
+
+    def is_abandoned(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._abandoned
+
+    def join(self) -> None:
+        """
+        Wait until every submitted publication is done or abandoned
+        """
+        self._queue.join()
+
+    def close(self) -> None:
+        """
+        Stop publishing, publications still pending are dropped
+        """
+        self._stopping.set()
+        self._queue.put(None)
+        self._thread.join()
+        with self._lock:
+            if self._pending:
+                logger.warning(f"Dropping [{len(self._pending)}] pending publications [{list(self._pending)}]")
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                self._queue.task_done()
+                break
+            key, text_to_publish = item
+            if self._publish(key, text_to_publish):
+                with self._lock:
+                    self._pending.discard(key)
+            self._queue.task_done()
+
+    def _publish(self, key: Hashable, text_to_publish: str) -> bool:
+        """
+        :return: True when done or abandoned, False when interrupted by close()
+        """
+        attempt = 1
+        while not self._stopping.is_set():
+            try:
+                self.publisher.publish(text_to_publish)
+            except PublishRateLimited as exception:
+                retry_after = min(exception.retry_after, self.max_rate_limit_wait)
+                logger.warning(f"Publication [{key}] rate limited, waiting [{retry_after:.0f}] seconds")
+                self._stopping.wait(retry_after)
+                continue
+            except Exception as exception:
+                if attempt >= self.max_attempts:
+                    logger.error(f"Abandoning publication [{key}] after [{attempt}] attempts. Reason [{exception}]")
+                    with self._lock:
+                        self._abandoned.add(key)
+                    return True
+                logger.warning(f"Publication [{key}] failed (attempt [{attempt}]). Reason [{exception}]")
+                self._stopping.wait(self.retry_delay * attempt)
+                attempt += 1
+                continue
+            logger.info(f"Published [{key}]")
+            if self.on_published is not None:
+                try:
+                    self.on_published(key)
+                except Exception as exception:
+                    logger.warning(f"Unable to record publication [{key}]. Reason [{exception}]")
+            return True
+        return False
+
+
 if __name__ == "__main__":
     try:
         api = get_twitter_api()
@@ -0,0 +1,168 @@
+import time
+import heapq
+import threading
+from typing import Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+from loguru import logger
+
+
+class PageSchedule:
+    def __init__(self, interval: float, next_due: float):
+        self.interval = interval
+        self.next_due = next_due
+        self.in_flight = False
+        self.fetches = 0
+        self.changes = 0
+        self.failures = 0
+
+
+class AdaptiveScheduler:
+    """
+    Next due time of every page in a priority queue, pages of a group (one fetcher) are popped as they come due.
+    Interval of a page shrinks by speedup when its fetch finds new prices, grows by slowdown when it is unchanged
+    and by failure_slowdown when it fails, always within [min_interval, max_interval].
+    max_requests_per_minute: budget shared by every group (unlimited when None)
+    Thread safe, several fetchers can share one scheduler.
+    """
+
+    def __init__(self,
+                 min_interval: float = 120.,
+                 max_interval: float = 3600.,
+                 initial_interval: float = 900.,
+                 speedup: float = 0.5,
+                 slowdown: float = 1.5,
+                 failure_slowdown: float = 2.,
+                 max_requests_per_minute: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.initial_interval = min(max(initial_interval, min_interval), max_interval)
+        self.speedup = speedup
+        self.slowdown = slowdown
+        self.failure_slowdown = failure_slowdown
+        self.max_requests_per_minute = max_requests_per_minute
+        self.clock = clock
+        self._schedules: Dict[str, Dict[Hashable, PageSchedule]] = {}
+        self._queues: Dict[str, List[Tuple[float, int, Hashable]]] = {}
+        self._sequence = 0
+        self._tokens = max_requests_per_minute or 0.
+        self._tokens_time = clock()
+        self._lock = threading.Lock()
+
+    def _push(self, group: str, key: Hashable, schedule: PageSchedule) -> None:
+        self._sequence += 1
+        heapq.heappush(self._queues[group], (schedule.next_due, self._sequence, key))
+
+    def _is_current(self, group: str, entry: Tuple[float, int, Hashable]) -> bool:
+        """
+        Entries of removed, in flight or rescheduled pages are left in the queue and skipped
+        """
+        schedule = self._schedules[group].get(entry[2])
+        return schedule is not None and not schedule.in_flight and schedule.next_due == entry[0]
+
+    def _refill_tokens(self, now: float) -> None:
+        if self.max_requests_per_minute is None:
+            return
+        elapsed = max(0., now - self._tokens_time)
+        self._tokens = min(self.max_requests_per_minute, self._tokens + elapsed * self.max_requests_per_minute / 60.)
+        self._tokens_time = now
+
+    def sync(self, group: str, keys: Iterable[Hashable]) -> None:
+        """
+        New pages are due immediately, pages missing from keys are forgotten
+        """
+        with self._lock:
+            schedules = self._schedules.setdefault(group, {})
+            self._queues.setdefault(group, [])
+            keys = set(keys)
+            for key in set(schedules) - keys:
+                del schedules[key]
+            now = self.clock()
+            for key in keys - set(schedules):
+                schedules[key] = PageSchedule(self.initial_interval, now)
+                self._push(group, key, schedules[key])
+
+    def pop_due(self, group: str) -> List[Hashable]:
+        """
+        Pages of group due now, within the request budget. They stay in flight until report or release.
+        """
+        due_keys = []
+        with self._lock:
+            now = self.clock()
+            self._refill_tokens(now)
+            queue = self._queues.get(group, [])
+            while queue and queue[0][0] <= now:
+                if not self._is_current(group, queue[0]):
+                    heapq.heappop(queue)
+                    continue
+                if self.max_requests_per_minute is not None:
+                    if self._tokens < 1.:
+                        break
+                    self._tokens -= 1.
+                _, _, key = heapq.heappop(queue)
+                self._schedules[group][key].in_flight = True
+                due_keys.append(key)
+        return due_keys
+
+    def get_delay(self, group: str) -> Optional[float]:
+        """
+        Seconds until next page of group is due, None when every page is in flight
+        """
+        with self._lock:
+            queue = self._queues.get(group, [])
+            while queue and not self._is_current(group, queue[0]):
+                heapq.heappop(queue)
+            if not queue:
+                return None
+            now = self.clock()
+            delay = max(0., queue[0][0] - now)
+            if self.max_requests_per_minute is not None:
+                self._refill_tokens(now)
+                if self._tokens < 1.:
+                    delay = max(delay, (1. - self._tokens) * 60. / self.max_requests_per_minute)
+            return delay
+
+    def report(self, group: str, key: Hashable, changed: bool, failed: bool = False) -> None:
+        """
+        Adapt interval of a fetched page and queue it again
+        changed: fetch found new prices
+        """
+        with self._lock:
+            schedule = self._schedules.get(group, {}).get(key)
+            if schedule is None:
+                return
+            schedule.fetches += 1
+            if failed:
+                schedule.failures += 1
+                factor = self.failure_slowdown
+            elif changed:
+                schedule.changes += 1
+                factor = self.speedup
+            else:
+                factor = self.slowdown
+            schedule.interval = min(max(schedule.interval * factor, self.min_interval), self.max_interval)
+            self._queue_again(group, key, schedule)
+
+    def release(self, group: str, key: Hashable) -> None:
+        """
+        Queue again a page whose fetch result was not processed, interval is unchanged
+        """
+        with self._lock:
+            schedule = self._schedules.get(group, {}).get(key)
+            if schedule is not None and schedule.in_flight:
+                self._queue_again(group, key, schedule)
+
+    def _queue_again(self, group: str, key: Hashable, schedule: PageSchedule) -> None:
+        schedule.in_flight = False
+        schedule.next_due = self.clock() + schedule.interval
+        self._push(group, key, schedule)
+
+    def get_intervals(self, group: str) -> Dict[Hashable, float]:
+        with self._lock:
+            return {key: schedule.interval for key, schedule in self._schedules.get(group, {}).items()}
+
+    def log_statistics(self, group: str) -> None:
+        intervals = sorted(self.get_intervals(group).values())
+        if not intervals:
+            return
+        logger.info(f"Schedule [{group}]: [{len(intervals)}] pages polled every [{intervals[0]:.0f}] "
+                    f"to [{intervals[-1]:.0f}] seconds (median [{intervals[len(intervals) // 2]:.0f}])")
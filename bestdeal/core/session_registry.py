@@ -0,0 +1,56 @@
+import threading
+import requests
+from typing import Dict
+from loguru import logger
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry, make_headers
+
+
+def get_accept_encoding() -> str:
+    """
+    Every encoding urllib3 is able to decode (brotli only when the brotli package is installed)
+    """
+    return make_headers(accept_encoding=True)["accept-encoding"]
+
+
+class SessionRegistry:
+    """
+    One pooled requests.Session per vendor, shared by every Source instance of this vendor.
+    TCP/TLS connections are kept alive between two urls and between two fetch cycles.
+    """
+
+    def __init__(self):
+        self._sessions: Dict[str, requests.Session] = {}
+        self._lock = threading.Lock()
+
+    def get_session(self, source) -> requests.Session:
+        with self._lock:
+            if source.source_name not in self._sessions:
+                self._sessions[source.source_name] = self._create_session(source)
+            return self._sessions[source.source_name]
+
+    @staticmethod
+    def _create_session(source) -> requests.Session:
+        logger.debug(f"Creating HTTP session for [{source.source_name}]")
+        retry = Retry(
+            total=source.retry_total,
+            backoff_factor=source.retry_backoff_factor,
+            status_forcelist=source.retry_status_forcelist,
+            allowed_methods=frozenset(["GET"]),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=source.pool_connections, pool_maxsize=source.pool_maxsize, max_retries=retry)
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def close(self) -> None:
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+
+# Shared by every Source of the process
+default_session_registry = SessionRegistry()
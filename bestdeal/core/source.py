@@ -1,24 +1,93 @@
 # coding: utf-8
 
 import bs4
+import time
+import hashlib
+import importlib.util
 import requests
 from loguru import logger
 from abc import ABCMeta, abstractmethod
-from typing import Dict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+from bestdeal.core.fetch_pool import HostLimiter
+from bestdeal.core.cycle_summary import PageMetrics
+from bestdeal.core.session_registry import SessionRegistry, default_session_registry, get_accept_encoding
+from bestdeal.core.more_exceptions import PageNotModified
+from bestdeal.core.toolbox import get_today_date
+from bestdeal.core.structured_data import extract_js_objects, iterate_products, format_price
+
+
+def get_fastest_parser() -> str:
+    """
+    lxml is several times faster than Python built-in html.parser
+    """
+    if importlib.util.find_spec('lxml') is not None:
+        return 'lxml'
+    return 'html.parser'
+
+
+class PageState:
+    """
+    Validators of the last parsed version of a page.
+    day: a page is never skipped on a new day, every product needs its first price of the day
+    deals, next_urls: kept for paginated listings, an unchanged page still contributes its deals
+    """
+
+    def __init__(self,
+                 etag: Optional[str],
+                 last_modified: Optional[str],
+                 content_hash: str,
+                 day: str,
+                 deals: Optional[Dict[str, str]] = None,
+                 next_urls: Optional[List[str]] = None):
+        self.etag = etag
+        self.last_modified = last_modified
+        self.content_hash = content_hash
+        self.day = day
+        self.deals = deals
+        self.next_urls = next_urls or []
 
 
 class Source:
     __metaclass__ = ABCMeta
 
+    # HTTP connection pool and retry policy, override in vendor class if needed
+    pool_connections: int = 2
+    pool_maxsize: int = 4
+    retry_total: int = 3
+    retry_backoff_factor: float = 0.5
+    retry_status_forcelist: Tuple[int, ...] = (429, 500, 502, 503, 504)
+
+    # HTML parser backend, and tags needed by _enrich_deals_from_soup (None to build the whole tree)
+    parser_features: str = get_fastest_parser()
+    parse_only: Optional[bs4.SoupStrainer] = None
+
+    # Opt-in structured extraction: text marker preceding a catalog embedded as JSON/JS literal
+    structured_data_marker: Optional[str] = None
+
+    # Opt-in pagination: pages of a listing fetched by fetch_deals (see _get_next_page_urls)
+    max_pages: int = 1
+    max_page_workers: int = 4
+    # Requests in flight to the vendor host when the fetcher does not share its limiter (sequential fetch)
+    max_requests_per_host: int = 2
+
     def __init__(self, source_name: str) -> None:
         self.source_name = source_name
         self.headers = {'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.11 '
                                       '(KHTML, like Gecko) Chrome/23.0.1271.64 Safari/537.11',
                         'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
                         'Accept-Charset': 'ISO-8859-1,utf-8;q=0.7,*;q=0.3',
-                        'Accept-Encoding': 'none',
+                        'Accept-Encoding': get_accept_encoding(),
                         'Accept-Language': 'en-US,en;q=0.8',
                         'Connection': 'keep-alive'}
+        # Shared limiter set by the fetcher when requests run concurrently, own limiter otherwise
+        self.host_limiter: Optional[HostLimiter] = None
+        self._own_host_limiter: Optional[HostLimiter] = None
+        self.session_registry: SessionRegistry = default_session_registry
+        # Per url validators to skip unchanged pages
+        self.page_states: Dict[str, PageState] = {}
+        # Fetch next pages of a listing, created on first paginated fetch
+        self._page_executor: Optional[ThreadPoolExecutor] = None
 
     @abstractmethod
     def _enrich_deals_from_soup(self, soup: bs4.BeautifulSoup, deals: Dict[str, str]) -> None:
@@ -27,19 +96,214 @@ class Source:
         """
         pass
 
-    def fetch_deals(self, product, url):
+    def _get_next_page_urls(self, url: str, content: bytes) -> List[str]:
         """
-        Beautiful Soup is used to process html.
-        Specific parsing is done in _enrich_deals_from_soup method.
+        Urls of the other pages of the listing whose first page is url, override when max_pages > 1
+        (see bestdeal.core.pagination helpers). At most max_pages - 1 of them are fetched.
+        """
+        return []
+
+    def _extract_structured_data(self, text: str):
+        """
+        Decoded catalogs embedded in page, override to use another locator (e.g. extract_json_ld)
+        """
+        return extract_js_objects(text, self.structured_data_marker)
+
+    def _enrich_deals_from_structured_data(self, data: Any, deals: Dict[str, str]) -> None:
+        """
+        Default handles records carrying both name and price, override for other layouts
+        """
+        for product_name, product_price in iterate_products(data):
+            deals[product_name] = format_price(product_price)
+
+    def _get_host_limiter(self) -> HostLimiter:
+        """
+        Next pages of a listing are fetched concurrently, requests are bounded per host even without shared limiter
+        """
+        if self.host_limiter is not None:
+            return self.host_limiter
+        if self._own_host_limiter is None:
+            self._own_host_limiter = HostLimiter(self.max_requests_per_host)
+        return self._own_host_limiter
+
+    def _download(self, url: str, headers: Dict[str, str]) -> requests.Response:
+        session = self.session_registry.get_session(self)
+        with self._get_host_limiter().slot(url):
+            return session.get(url=url, headers=headers, timeout=30.0)
+
+    @staticmethod
+    def _get_transferred_size(response: requests.Response) -> int:
+        """
+        Bytes received on the wire, before gzip/brotli decoding
+        """
+        content = response.content
+        if response.raw is not None and hasattr(response.raw, "tell"):
+            return response.raw.tell()
+        content_length = response.headers.get("Content-Length")
+        if content_length is not None and content_length.isdigit():
+            return int(content_length)
+        return len(content)
+
+    def _get_today_page_state(self, url: str) -> Optional[PageState]:
+        page_state = self.page_states.get(url)
+        if page_state is not None and page_state.day == get_today_date():
+            return page_state
+        return None
+
+    def _download_if_modified(self, url: str, page_metrics: Optional[PageMetrics] = None) -> Tuple[requests.Response, str]:
+        """
+        Send a conditional GET based on previous validators.
+        Raise PageNotModified if server answers 304 or if content is the same as previous one.
+        Raise requests.HTTPError on error status (429, 5xx, 404...) once retries are exhausted.
+        """
+        headers = dict(self.headers)
+        page_state = self._get_today_page_state(url)
+        if page_state is not None:
+            if page_state.etag:
+                headers['If-None-Match'] = page_state.etag
+            if page_state.last_modified:
+                headers['If-Modified-Since'] = page_state.last_modified
+
+        start_time = time.perf_counter()
+        response = self._download(url, headers)
+        if page_metrics is not None:
+            page_metrics.download_seconds += time.perf_counter() - start_time
+            page_metrics.bytes_downloaded += self._get_transferred_size(response)
+        if page_state is not None and response.status_code == 304:
+            raise PageNotModified(f'[{url}] not modified (HTTP 304)')
+        # Session retries do not raise on status, an error page must not be parsed as an empty listing
+        response.raise_for_status()
+
+        content_hash = hashlib.sha1(response.content).hexdigest()
+        if page_state is not None and page_state.content_hash == content_hash:
+            raise PageNotModified(f'[{url}] not modified (same content)')
+        return response, content_hash
+
+    def _remember_page(self,
+                       url: str,
+                       response: requests.Response,
+                       content_hash: str,
+                       deals: Optional[Dict[str, str]] = None,
+                       next_urls: Optional[List[str]] = None) -> None:
+        if response.ok:
+            self.page_states[url] = PageState(etag=response.headers.get('ETag'),
+                                              last_modified=response.headers.get('Last-Modified'),
+                                              content_hash=content_hash,
+                                              day=get_today_date(),
+                                              deals=deals,
+                                              next_urls=next_urls)
+
+    def _parse(self, content: bytes, encoding: Optional[str] = None) -> bs4.BeautifulSoup:
+        """
+        Raw bytes are given to the parser: decoding is done once, by the parser itself.
+        """
+        return bs4.BeautifulSoup(content,
+                                 self.parser_features,
+                                 parse_only=self.parse_only,
+                                 from_encoding=encoding)
+
+    def extract_deals_from_page(self, content: bytes, encoding: Optional[str] = None) -> Dict[str, str]:
+        """
+        Structured data is decoded straight from page text when vendor declares it,
+        the DOM is only built as a fallback.
+        Works on any page content, live or recorded (see bestdeal.benchmark.parser_benchmark).
         """
         deals = {}
-        html = requests.get(url=url, headers=self.headers, timeout=30.0)
-        soup = bs4.BeautifulSoup(html.text, 'html.parser')
-        current_deal_count = len(deals)
-        self._enrich_deals_from_soup(soup, deals)
-        fetched_deals_count = len(deals) - current_deal_count
+        if self.structured_data_marker is not None:
+            text = content.decode(encoding or 'utf-8', errors='replace')
+            for data in self._extract_structured_data(text):
+                self._enrich_deals_from_structured_data(data, deals)
+                if deals:
+                    return deals
+            logger.warning(f'Structured data not found on [{self.source_name}], fallback to HTML parsing')
+        self._enrich_deals_from_soup(self._parse(content, encoding), deals)
+        return deals
+
+    def _extract_deals(self, response: requests.Response) -> Dict[str, str]:
+        return self.extract_deals_from_page(response.content, response.encoding)
+
+    def _fetch_page(self, url: str, page_metrics: PageMetrics, first_page: bool) -> Tuple[Dict[str, str], List[str], bool]:
+        """
+        :return: deals of one listing page, urls of next pages (first page only) and whether page changed
+        Deals of an unchanged page of a paginated listing are those of its previous fetch of the day.
+        """
+        paginated = self.max_pages > 1
+        page_state = self._get_today_page_state(url)
+        try:
+            response, content_hash = self._download_if_modified(url, page_metrics)
+        except PageNotModified:
+            if not paginated or page_state is None or page_state.deals is None:
+                raise
+            return page_state.deals, page_state.next_urls, False
+        start_time = time.perf_counter()
+        deals = self._extract_deals(response)
+        next_urls = []
+        if paginated and first_page:
+            next_urls = self._get_next_page_urls(url, response.content)[:self.max_pages - 1]
+        page_metrics.parse_seconds += time.perf_counter() - start_time
+        # Remember page once parsed, a parsing failure will be retried next cycle
+        self._remember_page(url, response, content_hash, deals if paginated else None, next_urls)
+        return deals, next_urls, True
+
+    def _get_page_executor(self) -> ThreadPoolExecutor:
+        if self._page_executor is None:
+            self._page_executor = ThreadPoolExecutor(max_workers=self.max_page_workers,
+                                                     thread_name_prefix=f"pages-{self.source_name}")
+        return self._page_executor
+
+    def close(self) -> None:
+        """
+        Stop the next pages executor, a later paginated fetch creates a new one
+        """
+        if self._page_executor is not None:
+            self._page_executor.shutdown(wait=True)
+            self._page_executor = None
+
+    @staticmethod
+    def _merge_deals(pages_deals: List[Dict[str, str]]) -> Dict[str, str]:
+        """
+        A product listed on several pages (listing shifted between two requests) keeps its lowest price
+        """
+        deals = {}
+        for page_deals in pages_deals:
+            for product_name, product_price in page_deals.items():
+                if product_name not in deals or float(product_price) < float(deals[product_name]):
+                    deals[product_name] = product_price
+        return deals
+
+    def fetch_deals(self, product, url, page_metrics: Optional[PageMetrics] = None):
+        """
+        Beautiful Soup is used to process html.
+        Specific parsing is done in _enrich_deals_from_soup method
+        (or _enrich_deals_from_structured_data when vendor declares structured_data_marker).
+        Next pages of paginated listings (max_pages > 1) are fetched concurrently, within host limits.
+        Raise PageNotModified when page (every page of a listing) did not change since previous fetch of the day.
+        page_metrics: filled with downloaded bytes, download and parse times, per page deal counts when given
+        """
+        if page_metrics is None:
+            page_metrics = PageMetrics(self.source_name, product, url)
+        first_deals, next_urls, changed = self._fetch_page(url, page_metrics, first_page=True)
+        pages_deals = [first_deals]
+        if next_urls:
+            next_pages_metrics = [PageMetrics(self.source_name, product, next_url) for next_url in next_urls]
+            futures = [self._get_page_executor().submit(self._fetch_page, next_url, next_page_metrics, False)
+                       for next_url, next_page_metrics in zip(next_urls, next_pages_metrics)]
+            for future, next_page_metrics in zip(futures, next_pages_metrics):
+                page_deals, _, page_changed = future.result()
+                pages_deals.append(page_deals)
+                changed = changed or page_changed
+                page_metrics.bytes_downloaded += next_page_metrics.bytes_downloaded
+                page_metrics.download_seconds += next_page_metrics.download_seconds
+                page_metrics.parse_seconds += next_page_metrics.parse_seconds
+        if not changed:
+            raise PageNotModified(f'[{len(pages_deals)}] pages of [{url}] not modified')
+        deals = self._merge_deals(pages_deals) if len(pages_deals) > 1 else first_deals
+        page_metrics.page_deals_counts = [len(page_deals) for page_deals in pages_deals]
+        page_metrics.deals_count = len(deals)
+        fetched_deals_count = len(deals)
         if not fetched_deals_count:
             logger.warning('Product [{}] has not been found on [{}]'.format(product, self.source_name))
         else:
-            logger.info(f'[{fetched_deals_count}] [{product}] from [{self.source_name}] found.')
+            pages = f' in pages {page_metrics.page_deals_counts}' if len(pages_deals) > 1 else ''
+            logger.info(f'[{fetched_deals_count}] [{product}] from [{self.source_name}] found{pages}.')
         return deals
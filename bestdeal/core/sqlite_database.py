@@ -0,0 +1,534 @@
+import re
+import json
+import time
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from typing import Optional, Dict, List, Iterable, Iterator, Tuple
+from loguru import logger
+from bestdeal.core.classifier import ClassificationStore, Classification
+from bestdeal.core.metrics import default_command_metrics
+from bestdeal.core.more_exceptions import CollectionScanError
+from bestdeal.core.storage import PriceStorage
+from bestdeal.core.toolbox import get_today_date, convert_day_to_datetime
+
+# UTC dates, sortable and understood by SQLite date functions (julianday)
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+POST_COLUMNS = ["product_name", "product_brand", "product_type", "product_price", "source", "url", "timestamp",
+                "date", "day", "orderable"]
+
+
+def _format_date(value: datetime) -> str:
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return value.strftime(DATE_FORMAT)
+
+
+def _parse_date(text: str) -> datetime:
+    return datetime.strptime(text, DATE_FORMAT).replace(tzinfo=timezone.utc)
+
+
+def _to_sql_value(column: str, value):
+    if column == "date" and isinstance(value, datetime):
+        return _format_date(value)
+    if column == "orderable" and value is not None:
+        return int(value)
+    return value
+
+
+def _from_row(row: sqlite3.Row) -> dict:
+    """
+    Rows are returned as documents, like PriceDatabase: "id" becomes "_id", "date" a datetime
+    """
+    document = dict(row)
+    if "id" in document:
+        document["_id"] = document.pop("id")
+    if document.get("date") is not None:
+        document["date"] = _parse_date(document["date"])
+    if document.get("orderable") is not None:
+        document["orderable"] = bool(document["orderable"])
+    return document
+
+
+class MonitoredConnection(sqlite3.Connection):
+    """
+    Statements are counted in default_command_metrics like pymongo commands: (table, lowercase SQL verb).
+    Statements without table (BEGIN, COMMIT, PRAGMA) are counted with an empty collection.
+    Rows are fetched lazily, only the execution is timed.
+    """
+
+    table_pattern = re.compile(r'\b(?:FROM|INTO|UPDATE|ON)\s+"(\w+)"', re.IGNORECASE)
+
+    def _measure(self, statement: str, function, *arguments):
+        start_time = time.perf_counter()
+        failed = True
+        try:
+            result = function(statement, *arguments)
+            failed = False
+            return result
+        finally:
+            table = self.table_pattern.search(statement)
+            default_command_metrics.record(table.group(1) if table else "", statement.split(None, 1)[0].lower(),
+                                           time.perf_counter() - start_time, failed)
+
+    def execute(self, statement: str, *arguments):
+        return self._measure(statement, super().execute, *arguments)
+
+    def executemany(self, statement: str, *arguments):
+        return self._measure(statement, super().executemany, *arguments)
+
+
+class SqliteClassificationStore(ClassificationStore):
+    """
+    Same layout as MongoClassificationStore, in the "ClassificationCache" table of a SqlitePriceDatabase
+    """
+
+    def __init__(self, database: "SqlitePriceDatabase"):
+        self.database = database
+
+    def load(self, namespace: str, version: str) -> Dict[str, Classification]:
+        with self.database.transaction() as connection:
+            # Entries of previous rules versions are useless
+            connection.execute('DELETE FROM "ClassificationCache" WHERE namespace = ? AND version != ?', (namespace, version))
+            rows = connection.execute('SELECT name, product_brand, product_type FROM "ClassificationCache" '
+                                      'WHERE namespace = ? AND version = ?', (namespace, version)).fetchall()
+        return {row["name"]: (row["product_brand"], row["product_type"]) for row in rows}
+
+    def save(self, namespace: str, version: str, entries: Dict[str, Classification]) -> None:
+        if not entries:
+            return
+        with self.database.transaction() as connection:
+            connection.executemany('INSERT OR REPLACE INTO "ClassificationCache" '
+                                   '(id, namespace, version, name, product_brand, product_type) VALUES (?, ?, ?, ?, ?, ?)',
+                                   [(f"{namespace}|{version}|{name}", namespace, version, name, brand, product_type)
+                                    for name, (brand, product_type) in entries.items()])
+
+
+class SqlitePriceDatabase(PriceStorage):
+    """
+    Embedded backend for single node deployments, tests and benchmarks: no database service to run.
+    Tables mirror PriceDatabase collections: "{name}" posts, "{name}DailyMinimum", "{name}AllTimeLow",
+    "{name}Cycle", "{name}CycleReport", and the shared "Tweet" and "ClassificationCache".
+    Every query shape is served by an index, see check_query_plans.
+    The connection is shared by fetcher threads (scraping, writer, publish queue) behind a lock.
+    WAL journal lets another process (e.g. the frontend) read while a fetcher writes.
+    Statements are counted in cycle reports database section, like MongoDB commands (see MonitoredConnection).
+    """
+
+    def __init__(self, collection_name: str, path: str = ":memory:", create_indexes: bool = True):
+        if not re.fullmatch(r"\w+", collection_name):
+            raise ValueError(f"Invalid collection name [{collection_name}]")
+        self.path = path
+        logger.info(f"Opening database [{path}]")
+        self.connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None, factory=MonitoredConnection)
+        self.connection.row_factory = sqlite3.Row
+        self._lock = threading.RLock()
+        self.table = f'"{collection_name}"'
+        self.daily_minimum_table = f'"{collection_name}DailyMinimum"'
+        self.all_time_low_table = f'"{collection_name}AllTimeLow"'
+        self.cycle_table = f'"{collection_name}Cycle"'
+        self.cycle_report_table = f'"{collection_name}CycleReport"'
+        self.tweet_table = '"Tweet"'
+        if path != ":memory:":
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+        self._create_tables()
+        if create_indexes:
+            self.ensure_indexes()
+
+    def close(self) -> None:
+        with self._lock:
+            self.connection.close()
+
+    def transaction(self):
+        """
+        with database.transaction() as connection: statements committed together, under the connection lock
+        """
+        database = self
+
+        class Transaction:
+            def __enter__(self):
+                database._lock.acquire()
+                database.connection.execute("BEGIN")
+                return database.connection
+
+            def __exit__(self, exception_type, exception, traceback):
+                try:
+                    database.connection.execute("COMMIT" if exception_type is None else "ROLLBACK")
+                finally:
+                    database._lock.release()
+
+        return Transaction()
+
+    def _query(self, statement: str, parameters: Iterable = ()) -> List[sqlite3.Row]:
+        with self._lock:
+            return self.connection.execute(statement, tuple(parameters)).fetchall()
+
+    def _create_tables(self) -> None:
+        minimum_columns = ("id TEXT PRIMARY KEY, product_name TEXT, product_brand TEXT, product_type TEXT, "
+                           "product_price REAL, source TEXT, url TEXT, timestamp TEXT, date TEXT, day TEXT, scope TEXT")
+        with self.transaction() as connection:
+            connection.execute(f"CREATE TABLE IF NOT EXISTS {self.table} (id INTEGER PRIMARY KEY, product_name TEXT, "
+                               f"product_brand TEXT, product_type TEXT, product_price REAL, source TEXT, url TEXT, "
+                               f"timestamp TEXT, date TEXT, day TEXT, orderable INTEGER)")
+            connection.execute(f"CREATE TABLE IF NOT EXISTS {self.daily_minimum_table} ({minimum_columns})")
+            connection.execute(f"CREATE TABLE IF NOT EXISTS {self.all_time_low_table} ({minimum_columns})")
+            connection.execute(f"CREATE TABLE IF NOT EXISTS {self.cycle_table} (id TEXT PRIMARY KEY, timestamp TEXT, "
+                               f"inserted_posts INTEGER)")
+            connection.execute(f"CREATE TABLE IF NOT EXISTS {self.cycle_report_table} (id INTEGER PRIMARY KEY, "
+                               f"fetcher TEXT, date TEXT, report TEXT)")
+            connection.execute(f"CREATE TABLE IF NOT EXISTS {self.tweet_table} (id INTEGER PRIMARY KEY, "
+                               f"product_type TEXT, date TEXT)")
+            connection.execute('CREATE TABLE IF NOT EXISTS "ClassificationCache" (id TEXT PRIMARY KEY, namespace TEXT, '
+                               'version TEXT, name TEXT, product_brand TEXT, product_type TEXT)')
+
+    def _get_indexes(self) -> List[Tuple[str, str, str, str]]:
+        """
+        (index name, table, columns, partial index condition), same query shapes as PriceDatabase indexes
+        """
+        name = self.table.strip('"')
+        return [
+            (f"{name}_orderable_product_type_day_price", self.table, "product_type, day, product_price", "orderable = 1"),
+            (f"{name}_orderable_product_type_price", self.table, "product_type, product_price", "orderable = 1"),
+            (f"{name}_product_name_day_timestamp", self.table, "product_name, day, timestamp", ""),
+            (f"{name}_day_timestamp", self.table, "day, timestamp", ""),
+            (f"{name}_date", self.table, "date", ""),
+            (f"{name}_daily_minimum_day_scope_price", self.daily_minimum_table, "day, scope, product_price", ""),
+            (f"{name}_cycle_report_fetcher_date", self.cycle_report_table, "fetcher, date", ""),
+            ("Tweet_date_product_type", self.tweet_table, "date, product_type", ""),
+            ("ClassificationCache_namespace_version", '"ClassificationCache"', "namespace, version", ""),
+        ]
+
+    def ensure_indexes(self) -> None:
+        with self.transaction() as connection:
+            for index_name, table, columns, condition in self._get_indexes():
+                where = f" WHERE {condition}" if condition else ""
+                connection.execute(f'CREATE INDEX IF NOT EXISTS "{index_name}" ON {table} ({columns}){where}')
+
+    def get_collection_names(self) -> List[str]:
+        return [table.strip('"') for table in [self.table, self.tweet_table, self.daily_minimum_table,
+                                               self.all_time_low_table, self.cycle_table, self.cycle_report_table]]
+
+    def get_classification_store(self) -> ClassificationStore:
+        return SqliteClassificationStore(self)
+
+    def tweet_exists(self, product_type: str, day: Optional[str] = None) -> bool:
+        day = get_today_date() if day is None else day
+        return bool(self._query(f"SELECT 1 FROM {self.tweet_table} WHERE date = ? AND product_type = ? LIMIT 1",
+                                (day, product_type)))
+
+    def find_tweeted_product_types(self, day: str) -> List[str]:
+        return [row[0] for row in self._query(f"SELECT DISTINCT product_type FROM {self.tweet_table} WHERE date = ?", (day,))]
+
+    def insert_tweet_status(self, product_type: str, day: Optional[str] = None):
+        with self.transaction() as connection:
+            connection.execute(f"INSERT INTO {self.tweet_table} (product_type, date) VALUES (?, ?)",
+                               (product_type, get_today_date() if day is None else day))
+
+    def _insert_posts(self, posts: List[dict]) -> int:
+        for post in posts:
+            self._complete_post(post)
+        statement = f"INSERT INTO {self.table} ({', '.join(POST_COLUMNS)}) VALUES ({', '.join('?' * len(POST_COLUMNS))})"
+        with self.transaction() as connection:
+            connection.executemany(statement, [[_to_sql_value(column, post.get(column)) for column in POST_COLUMNS]
+                                               for post in posts])
+            self._update_minimums(connection, posts)
+        return len(posts)
+
+    def bulk_insert(self, posts):
+        logger.debug(f"Inserting [{len(posts)}] posts")
+        self._insert_posts(posts)
+
+    def bulk_write_posts(self, posts: List[dict], write_concern=None) -> Optional[int]:
+        """
+        Posts and minimums are written in one transaction, write_concern only applies to MongoDB
+        """
+        return self._insert_posts(posts)
+
+    def _write_minimums(self, connection: sqlite3.Connection, table: str, minimums: Iterable[dict]) -> None:
+        """
+        Keep the cheapest row per id: insert when missing, replace fields only when cheaper
+        """
+        columns = self.minimum_fields + ["scope"]
+        rows = [[minimum["_id"]] + [_to_sql_value(column, minimum.get(column)) for column in columns] for minimum in minimums]
+        connection.executemany(f"INSERT OR IGNORE INTO {table} (id, {', '.join(columns)}) "
+                               f"VALUES ({', '.join('?' * (len(columns) + 1))})", rows)
+        assignments = ", ".join(f"{column} = ?" for column in columns)
+        connection.executemany(f"UPDATE {table} SET {assignments} WHERE id = ? AND product_price > ?",
+                               [row[1:] + [row[0], row[1 + columns.index("product_price")]] for row in rows])
+
+    def _update_minimums(self, connection: sqlite3.Connection, posts: List[dict]) -> None:
+        self._write_minimums(connection, self.daily_minimum_table, self.select_daily_minimums(posts).values())
+        self._write_minimums(connection, self.all_time_low_table, self.select_all_time_lows(posts).values())
+
+    def update_minimums(self, posts: List[dict]) -> None:
+        with self.transaction() as connection:
+            self._update_minimums(connection, posts)
+
+    def _aggregate_cheapest_posts(self, where: str, parameters: Iterable, group_columns: str) -> Iterator[dict]:
+        """
+        SQLite takes bare columns from the row holding the MIN() of an aggregate query
+        """
+        rows = self._query(f"SELECT *, MIN(product_price) FROM {self.table} WHERE {where} GROUP BY {group_columns}",
+                           parameters)
+        for row in rows:
+            post = _from_row(row)
+            del post["MIN(product_price)"]
+            yield post
+
+    def rebuild_daily_minimums(self, batch_size: int = 1000) -> int:
+        with self.transaction() as connection:
+            connection.execute(f"DELETE FROM {self.daily_minimum_table}")
+        cheapest_posts = self._aggregate_cheapest_posts("orderable = 1 AND day IS NOT NULL", (), "day, product_type, source")
+        minimums = list(self.select_daily_minimums(cheapest_posts).values())
+        for start in range(0, len(minimums), batch_size):
+            with self.transaction() as connection:
+                self._write_minimums(connection, self.daily_minimum_table, minimums[start:start + batch_size])
+        logger.info(f"Rebuilt [{len(minimums)}] daily minimums of [{self.table}]")
+        return len(minimums)
+
+    def rebuild_all_time_lows(self, batch_size: int = 1000) -> int:
+        with self.transaction() as connection:
+            connection.execute(f"DELETE FROM {self.all_time_low_table}")
+        cheapest_posts = self._aggregate_cheapest_posts("orderable = 1 AND product_type IS NOT NULL", (),
+                                                        "product_type, product_name")
+        minimums = list(self.select_all_time_lows(cheapest_posts).values())
+        for start in range(0, len(minimums), batch_size):
+            with self.transaction() as connection:
+                self._write_minimums(connection, self.all_time_low_table, minimums[start:start + batch_size])
+        logger.info(f"Rebuilt [{len(minimums)}] all time lows of [{self.table}]")
+        return len(minimums)
+
+    def _find_one(self, statement: str, parameters: Iterable = ()) -> Optional[dict]:
+        rows = self._query(statement, parameters)
+        return _from_row(rows[0]) if rows else None
+
+    def find_daily_minimum(self, day: str, product_type: Optional[str] = None, source: Optional[str] = None) -> Optional[dict]:
+        scope = self.all_sources_scope if source is None else source
+        if product_type is not None:
+            return self._find_one(f"SELECT * FROM {self.daily_minimum_table} WHERE id = ?", (f"{day}|{product_type}|{scope}",))
+        return self._find_one(f"SELECT * FROM {self.daily_minimum_table} WHERE day = ? AND scope = ? "
+                              f"ORDER BY product_price LIMIT 1", (day, scope))
+
+    def record_cycle(self, timestamp: str, inserted_posts: int) -> None:
+        with self.transaction() as connection:
+            connection.execute(f"INSERT OR REPLACE INTO {self.cycle_table} (id, timestamp, inserted_posts) VALUES (?, ?, ?)",
+                               ("last_cycle", timestamp, inserted_posts))
+
+    def find_last_cycle_timestamp(self) -> Optional[str]:
+        last_cycle = self._find_one(f"SELECT timestamp FROM {self.cycle_table} WHERE id = ?", ("last_cycle",))
+        return last_cycle["timestamp"] if last_cycle else None
+
+    def insert_cycle_report(self, report: dict) -> None:
+        with self.transaction() as connection:
+            connection.execute(f"INSERT INTO {self.cycle_report_table} (fetcher, date, report) VALUES (?, ?, ?)",
+                               (report["fetcher"], _to_sql_value("date", report["date"]), json.dumps(report, default=str)))
+
+    def find_cycle_reports(self, fetcher: str, limit: int = 10) -> List[dict]:
+        rows = self._query(f"SELECT date, report FROM {self.cycle_report_table} WHERE fetcher = ? "
+                           f"ORDER BY date DESC LIMIT ?", (fetcher, limit))
+        reports = []
+        for row in rows:
+            report = json.loads(row["report"])
+            report["date"] = _parse_date(row["date"])
+            reports.append(report)
+        return reports
+
+    @staticmethod
+    def _check_column(column: str) -> str:
+        if column not in POST_COLUMNS:
+            raise ValueError(f"Unknown column [{column}]")
+        return column
+
+    def find_filter_facets(self, day: str, criteria: Iterable[str] = ("product_type", "source", "product_brand")) -> Dict[str, list]:
+        return {criterion: self.find_distinct_criteria_by_date(criterion, day) for criterion in criteria}
+
+    def find_distinct_product_types(self) -> list:
+        return [row[0] for row in self._query(f"SELECT DISTINCT product_type FROM {self.table} "
+                                              f"WHERE orderable = 1 AND product_type IS NOT NULL")]
+
+    def find_distinct_criteria_by_date(self, criteria: str, day: str) -> list:
+        column = self._check_column(criteria)
+        return [row[0] for row in self._query(f"SELECT DISTINCT {column} FROM {self.table} "
+                                              f"WHERE orderable = 1 AND day = ? ORDER BY {column}", (day,))]
+
+    @staticmethod
+    def _build_posts_where(day: str,
+                           product_type: Optional[str] = None,
+                           product_brand: Optional[str] = None,
+                           source: Optional[str] = None) -> Tuple[str, List]:
+        conditions, parameters = ["day = ?"], [day]
+        for column, value in [("product_type", product_type), ("product_brand", product_brand), ("source", source)]:
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                parameters.append(value)
+        return " AND ".join(conditions), parameters
+
+    def find_all_posts_by_filters(self,
+                                  day: str,
+                                  product_type: Optional[str] = None,
+                                  product_brand: Optional[str] = None,
+                                  source: Optional[str] = None) -> List[dict]:
+        where, parameters = self._build_posts_where(day, product_type, product_brand, source)
+        return [_from_row(row) for row in self._query(f"SELECT * FROM {self.table} WHERE {where}", parameters)]
+
+    def find_cheapest_by_filters(self,
+                                 day: str,
+                                 product_type: Optional[str] = None,
+                                 product_brand: Optional[str] = None,
+                                 source: Optional[str] = None) -> Optional[dict]:
+        where, parameters = self._build_posts_where(day, product_type, product_brand, source)
+        return self._find_one(f"SELECT * FROM {self.table} WHERE {where} AND orderable = 1 "
+                              f"ORDER BY product_price LIMIT 1", parameters)
+
+    def find_posts_page(self,
+                        day: str,
+                        product_type: Optional[str] = None,
+                        product_brand: Optional[str] = None,
+                        source: Optional[str] = None,
+                        page: int = 0,
+                        page_size: int = 100,
+                        columns: Iterable[str] = ("product_type", "product_price", "product_name", "product_brand",
+                                                  "source", "url", "timestamp")) -> Tuple[int, List[dict]]:
+        where, parameters = self._build_posts_where(day, product_type, product_brand, source)
+        selected_columns = ", ".join(self._check_column(column) for column in columns)
+        with self._lock:
+            total = self.connection.execute(f"SELECT COUNT(*) FROM {self.table} WHERE {where}", parameters).fetchone()[0]
+            rows = self.connection.execute(f"SELECT {selected_columns} FROM {self.table} WHERE {where} "
+                                           f"ORDER BY product_price, id LIMIT ? OFFSET ?",
+                                           parameters + [page_size, page * page_size]).fetchall()
+        return total, [_from_row(row) for row in rows]
+
+    def find_all_posts_by_product_type(self, product_type: str, day: str) -> List[dict]:
+        return [_from_row(row) for row in self._query(f"SELECT * FROM {self.table} "
+                                                      f"WHERE product_type = ? AND orderable = 1 AND day = ?",
+                                                      (product_type, day))]
+
+    def find_last_price(self, product_name: str, day: str):
+        post = self._find_one(f"SELECT * FROM {self.table} WHERE product_name = ? AND day = ? AND orderable = 1 "
+                              f"ORDER BY timestamp DESC LIMIT 1", (product_name, day))
+        if post is None:
+            # TODO: implement specific exception
+            raise Exception("Missing last price")
+        return post
+
+    def find_last_prices(self, day: str) -> Dict[str, float]:
+        rows = self._query(f"SELECT product_name, product_price, MAX(timestamp) FROM {self.table} "
+                           f"WHERE day = ? AND orderable = 1 GROUP BY product_name", (day,))
+        return {row["product_name"]: row["product_price"] for row in rows}
+
+    def find_all_time_low(self, product_type: str, product_name: Optional[str] = None) -> Optional[dict]:
+        scope = self.all_sources_scope if product_name is None else product_name
+        return self._find_one(f"SELECT * FROM {self.all_time_low_table} WHERE id = ?", (f"{product_type}|{scope}",))
+
+    def find_cheapest_per_product_type(self, day: str) -> Dict[str, dict]:
+        """
+        Read from daily minimums, product types missing from the rollup are aggregated from posts
+        """
+        rows = self._query(f"SELECT * FROM {self.daily_minimum_table} WHERE day = ? AND scope = ?",
+                           (day, self.all_sources_scope))
+        cheapest_posts = {row["product_type"]: _from_row(row) for row in rows}
+        missing_product_types = [product_type for product_type in self.find_distinct_criteria_by_date("product_type", day)
+                                 if product_type is not None and product_type not in cheapest_posts]
+        if missing_product_types:
+            where = f"orderable = 1 AND day = ? AND product_type IN ({', '.join('?' * len(missing_product_types))})"
+            for post in self._aggregate_cheapest_posts(where, [day] + missing_product_types, "product_type"):
+                cheapest_posts[post["product_type"]] = post
+        return cheapest_posts
+
+    def find_daily_minimums(self,
+                            start_day: str,
+                            end_day: str,
+                            product_types: Optional[List[str]] = None,
+                            per_source: bool = False,
+                            bucket_days: int = 1) -> List[dict]:
+        """
+        Same rows as PriceDatabase.find_daily_minimums, buckets are computed from julianday of "date"
+        """
+        conditions = ["day BETWEEN ? AND ?", "scope != ?" if per_source else "scope = ?"]
+        parameters = [start_day, end_day, self.all_sources_scope]
+        if product_types is not None:
+            conditions.append(f"product_type IN ({', '.join('?' * len(product_types))})")
+            parameters += product_types
+        where = " AND ".join(conditions)
+        if bucket_days > 1:
+            bucket = "CAST((julianday(date) - julianday(?)) / ? AS INTEGER)"
+            statement = (f"SELECT MIN(day) AS day, product_type, scope AS source, MIN(product_price) AS product_price "
+                         f"FROM {self.daily_minimum_table} WHERE {where} GROUP BY product_type, scope, {bucket} ORDER BY day")
+            parameters += [_format_date(convert_day_to_datetime(start_day)), bucket_days]
+        else:
+            statement = (f"SELECT day, product_type, scope AS source, product_price "
+                         f"FROM {self.daily_minimum_table} WHERE {where} ORDER BY day")
+        return [dict(row) for row in self._query(statement, parameters)]
+
+    def find_cheapest(self, product_type: str, day: Optional[str], since: Optional[datetime] = None):
+        """
+        Daily and cheapest ever lookups read daily minimums and all time lows first, like PriceDatabase.find_cheapest
+        """
+        minimum = None
+        if day is not None and since is None:
+            minimum = self.find_daily_minimum(day, product_type)
+        elif day is None and since is None:
+            minimum = self.find_all_time_low(product_type)
+        if minimum is not None:
+            return minimum
+        conditions, parameters = ["product_type = ?", "orderable = 1"], [product_type]
+        if day is not None:
+            conditions.append("day = ?")
+            parameters.append(day)
+        if since is not None:
+            conditions.append("date >= ?")
+            parameters.append(_to_sql_value("date", since))
+        post = self._find_one(f"SELECT * FROM {self.table} WHERE {' AND '.join(conditions)} "
+                              f"ORDER BY product_price LIMIT 1", parameters)
+        if post is None:
+            # TODO: implement specific exception
+            raise Exception(f"Missing cheapest [{product_type}]")
+        return post
+
+    def delete_price_anomalies(self) -> None:
+        throttle = 50
+        with self.transaction() as connection:
+            deleted_count = connection.execute(f"DELETE FROM {self.table} WHERE product_price < ?", (throttle,)).rowcount
+        logger.info(f"Deleted [{deleted_count}] under [{throttle}]€")
+
+    def clear_posts(self) -> None:
+        with self.transaction() as connection:
+            for table in [self.table, self.daily_minimum_table, self.all_time_low_table]:
+                connection.execute(f"DELETE FROM {table}")
+
+    def _get_query_shapes(self) -> Dict[str, Tuple[str, tuple]]:
+        """
+        Statements matching the queries sent by this class
+        """
+        today = get_today_date()
+        return {
+            "find_cheapest (day)": (f"SELECT * FROM {self.table} WHERE product_type = ? AND orderable = 1 AND day = ? "
+                                    f"ORDER BY product_price LIMIT 1", ("3080", today)),
+            "find_cheapest (ever)": (f"SELECT * FROM {self.table} WHERE product_type = ? AND orderable = 1 "
+                                     f"ORDER BY product_price LIMIT 1", ("3080",)),
+            "find_last_price": (f"SELECT * FROM {self.table} WHERE product_name = ? AND day = ? AND orderable = 1 "
+                                f"ORDER BY timestamp DESC LIMIT 1", ("MSI RTX 3080", today)),
+            "find_last_prices": (f"SELECT product_name, product_price, MAX(timestamp) FROM {self.table} "
+                                 f"WHERE day = ? AND orderable = 1 GROUP BY product_name", (today,)),
+            "find_distinct_criteria_by_date": (f"SELECT DISTINCT source FROM {self.table} WHERE orderable = 1 AND day = ?",
+                                               (today,)),
+            "find_daily_minimum (all types)": (f"SELECT * FROM {self.daily_minimum_table} WHERE day = ? AND scope = ? "
+                                               f"ORDER BY product_price LIMIT 1", (today, self.all_sources_scope)),
+            "find_daily_minimums": (f"SELECT * FROM {self.daily_minimum_table} WHERE day BETWEEN ? AND ? AND scope = ?",
+                                    (today, today, self.all_sources_scope)),
+            "tweet_exists": (f"SELECT 1 FROM {self.tweet_table} WHERE date = ? AND product_type = ? LIMIT 1",
+                             (today, "3080")),
+            "find_cycle_reports": (f"SELECT date, report FROM {self.cycle_report_table} WHERE fetcher = ? "
+                                   f"ORDER BY date DESC LIMIT 10", ("GpuFetcher",)),
+        }
+
+    def check_query_plans(self) -> None:
+        """
+        Raise CollectionScanError if a query shape reads a whole table or index ("SCAN" steps, "SEARCH" is expected)
+        """
+        for query_name, (statement, parameters) in self._get_query_shapes().items():
+            details = [row[3] for row in self._query(f"EXPLAIN QUERY PLAN {statement}", parameters)]
+            if any(detail.startswith("SCAN") for detail in details):
+                raise CollectionScanError(f"[{query_name}] scans the whole table. Plan [{details}]")
+            logger.info(f"[{query_name}] plan [{details}]")
@@ -0,0 +1,267 @@
+import os
+from abc import ABCMeta, abstractmethod
+from datetime import datetime
+from typing import Optional, Dict, List, Iterable, Tuple
+from bestdeal.core.classifier import ClassificationStore
+from bestdeal.core.toolbox import convert_timestamp_to_datetime
+
+SQLITE_URI_PREFIX = "sqlite://"
+
+
+class PriceStorage:
+    """
+    Query surface shared by storage backends: PriceDatabase (MongoDB) and SqlitePriceDatabase (embedded).
+
+    Every post carries its "timestamp" (20200515_130607 string), a "date" (datetime, UTC)
+    and a "day" key (20200515).
+    Posts from sources that cannot be ordered from France are flagged "orderable": False,
+    price comparisons only read orderable posts.
+    Daily minimums hold the cheapest orderable post per day and product type, for every source ("scope": "*")
+    and per source ("scope": source name). All time lows hold the cheapest orderable post ever per product type
+    ("scope": "*") and per product name ("scope": product name). Both are updated on each insert batch.
+    """
+    __metaclass__ = ABCMeta
+
+    non_orderable_sources = ["MindFactory"]
+    all_sources_scope = "*"
+    minimum_fields = ["product_name", "product_brand", "product_type", "product_price", "source", "url", "timestamp", "date", "day"]
+
+    @staticmethod
+    def add_date_fields(post: dict) -> dict:
+        """
+        Derive "date" and "day" from "timestamp"
+        """
+        post_date = convert_timestamp_to_datetime(post["timestamp"])
+        post["date"] = post_date
+        post["day"] = post_date.strftime("%Y%m%d")
+        return post
+
+    def is_orderable(self, source: str) -> bool:
+        return source not in self.non_orderable_sources
+
+    def _complete_post(self, post: dict) -> dict:
+        if "date" not in post:
+            self.add_date_fields(post)
+        if "orderable" not in post:
+            post["orderable"] = self.is_orderable(post["source"])
+        return post
+
+    @classmethod
+    def _select_minimums(cls, posts: Iterable[dict], key_function) -> Dict[str, dict]:
+        """
+        Cheapest orderable post per key, as minimum documents.
+        key_function(post) returns (key prefix, scopes), the document _id is "{key prefix}|{scope}".
+        """
+        minimums = {}
+        for post in posts:
+            if not post.get("orderable") or post.get("product_type") is None:
+                continue
+            key_prefix, scopes = key_function(post)
+            if key_prefix is None:
+                continue
+            for scope in scopes:
+                minimum_id = f"{key_prefix}|{scope}"
+                if minimum_id in minimums and minimums[minimum_id]["product_price"] <= post["product_price"]:
+                    continue
+                minimum = {field: post.get(field) for field in cls.minimum_fields}
+                minimum.update({"_id": minimum_id, "scope": scope})
+                minimums[minimum_id] = minimum
+        return minimums
+
+    @classmethod
+    def select_daily_minimums(cls, posts: Iterable[dict]) -> Dict[str, dict]:
+        """
+        Cheapest orderable post per (day, product_type) for every source and per source
+        """
+        def get_key(post):
+            if post.get("day") is None:
+                return None, ()
+            return f"{post['day']}|{post['product_type']}", (cls.all_sources_scope, post["source"])
+
+        return cls._select_minimums(posts, get_key)
+
+    @classmethod
+    def select_all_time_lows(cls, posts: Iterable[dict]) -> Dict[str, dict]:
+        """
+        Cheapest orderable post per product_type and per (product_type, product_name)
+        """
+        return cls._select_minimums(posts, lambda post: (post["product_type"], (cls.all_sources_scope, post["product_name"])))
+
+    @abstractmethod
+    def get_collection_names(self) -> List[str]:
+        pass
+
+    @abstractmethod
+    def get_classification_store(self) -> ClassificationStore:
+        pass
+
+    @abstractmethod
+    def tweet_exists(self, product_type: str, day: Optional[str] = None) -> bool:
+        pass
+
+    @abstractmethod
+    def find_tweeted_product_types(self, day: str) -> List[str]:
+        pass
+
+    @abstractmethod
+    def insert_tweet_status(self, product_type: str, day: Optional[str] = None):
+        pass
+
+    @abstractmethod
+    def bulk_insert(self, posts):
+        pass
+
+    @abstractmethod
+    def bulk_write_posts(self, posts: List[dict], write_concern=None) -> Optional[int]:
+        pass
+
+    @abstractmethod
+    def rebuild_daily_minimums(self, batch_size: int = 1000) -> int:
+        pass
+
+    @abstractmethod
+    def rebuild_all_time_lows(self, batch_size: int = 1000) -> int:
+        pass
+
+    @abstractmethod
+    def find_daily_minimum(self, day: str, product_type: Optional[str] = None, source: Optional[str] = None) -> Optional[dict]:
+        pass
+
+    @abstractmethod
+    def record_cycle(self, timestamp: str, inserted_posts: int) -> None:
+        pass
+
+    @abstractmethod
+    def find_last_cycle_timestamp(self) -> Optional[str]:
+        pass
+
+    @abstractmethod
+    def insert_cycle_report(self, report: dict) -> None:
+        pass
+
+    @abstractmethod
+    def find_cycle_reports(self, fetcher: str, limit: int = 10) -> List[dict]:
+        pass
+
+    @abstractmethod
+    def find_filter_facets(self, day: str, criteria: Iterable[str] = ("product_type", "source", "product_brand")) -> Dict[str, list]:
+        pass
+
+    @abstractmethod
+    def find_distinct_product_types(self) -> list:
+        pass
+
+    @abstractmethod
+    def find_distinct_criteria_by_date(self, criteria: str, day: str) -> list:
+        pass
+
+    def find_available_product_types_by_date(self, day: str):
+        return self.find_distinct_criteria_by_date("product_type", day)
+
+    @abstractmethod
+    def find_cheapest_by_filters(self,
+                                 day: str,
+                                 product_type: Optional[str] = None,
+                                 product_brand: Optional[str] = None,
+                                 source: Optional[str] = None) -> Optional[dict]:
+        pass
+
+    def find_daily_cheapest(self,
+                            day: str,
+                            product_type: Optional[str] = None,
+                            product_brand: Optional[str] = None,
+                            source: Optional[str] = None) -> Optional[dict]:
+        """
+        Read from daily minimums unless a brand is selected (minimums are not kept per brand),
+        posts are searched when the day has not been rolled up
+        """
+        if product_brand is None:
+            minimum = self.find_daily_minimum(day, product_type, source)
+            if minimum is not None:
+                return minimum
+        return self.find_cheapest_by_filters(day, product_type, product_brand, source)
+
+    @abstractmethod
+    def find_posts_page(self,
+                        day: str,
+                        product_type: Optional[str] = None,
+                        product_brand: Optional[str] = None,
+                        source: Optional[str] = None,
+                        page: int = 0,
+                        page_size: int = 100,
+                        columns: Iterable[str] = ("product_type", "product_price", "product_name", "product_brand",
+                                                  "source", "url", "timestamp")) -> Tuple[int, List[dict]]:
+        pass
+
+    @abstractmethod
+    def find_last_price(self, product_name: str, day: str):
+        pass
+
+    @abstractmethod
+    def find_last_prices(self, day: str) -> Dict[str, float]:
+        pass
+
+    @abstractmethod
+    def find_all_time_low(self, product_type: str, product_name: Optional[str] = None) -> Optional[dict]:
+        pass
+
+    @abstractmethod
+    def find_cheapest_per_product_type(self, day: str) -> Dict[str, dict]:
+        pass
+
+    @abstractmethod
+    def find_daily_minimums(self,
+                            start_day: str,
+                            end_day: str,
+                            product_types: Optional[List[str]] = None,
+                            per_source: bool = False,
+                            bucket_days: int = 1) -> List[dict]:
+        pass
+
+    @abstractmethod
+    def find_cheapest(self, product_type: str, day: Optional[str], since: Optional[datetime] = None):
+        pass
+
+    @abstractmethod
+    def delete_price_anomalies(self) -> None:
+        pass
+
+    @abstractmethod
+    def clear_posts(self) -> None:
+        """
+        Delete posts, daily minimums and all time lows of the collection (benchmarks)
+        """
+        pass
+
+    @abstractmethod
+    def check_query_plans(self) -> None:
+        pass
+
+
+def get_database_uri() -> Optional[str]:
+    """
+    PRICE_DATABASE_URI selects the backend (e.g. sqlite:///var/lib/bestdeal/prices.db),
+    MONGODB_CONNECTION_STRING is read when it is not set
+    """
+    return os.environ.get("PRICE_DATABASE_URI") or os.environ.get("MONGODB_CONNECTION_STRING")
+
+
+def is_sqlite_uri(uri: Optional[str]) -> bool:
+    return uri is not None and uri.startswith(SQLITE_URI_PREFIX)
+
+
+def create_price_database(collection_name: str, uri: Optional[str] = None, client=None, create_indexes: bool = True) -> PriceStorage:
+    """
+    SqlitePriceDatabase for sqlite://<path> uris (sqlite://:memory: for a transient database),
+    PriceDatabase otherwise (client is shared when given).
+    Example: create_price_database("GPU", "sqlite:///var/lib/bestdeal/prices.db")
+    """
+    uri = uri if uri is not None else get_database_uri()
+    if is_sqlite_uri(uri):
+        from bestdeal.core.sqlite_database import SqlitePriceDatabase
+        return SqlitePriceDatabase(collection_name, uri[len(SQLITE_URI_PREFIX):], create_indexes=create_indexes)
+    from pymongo import MongoClient
+    from bestdeal.core.pricedatabase import PriceDatabase
+    if client is None:
+        client = MongoClient(uri)
+    return PriceDatabase(collection_name, client=client, create_indexes=create_indexes)
@@ -0,0 +1,115 @@
+import time
+import queue
+import threading
+from typing import Dict, List, Optional
+from loguru import logger
+from pymongo.write_concern import WriteConcern
+from bestdeal.core.metrics import default_command_metrics
+
+
+class BatchResult:
+    """
+    One bulk write of post_count posts in latency seconds.
+    document_count is the inserted count reported by the database, None when unknown (unacknowledged write concern)
+    """
+
+    def __init__(self, source_name: str, post_count: int, document_count: Optional[int], latency: float):
+        self.source_name = source_name
+        self.post_count = post_count
+        self.document_count = document_count
+        self.latency = latency
+
+    def __repr__(self) -> str:
+        inserted = "unknown" if self.document_count is None else self.document_count
+        return f"BatchResult({self.source_name}, {inserted}/{self.post_count} posts, {self.latency * 1000:.1f} ms)"
+
+
+class StreamingWriter:
+    """
+    Write posts in bounded batches from a background thread, scraping goes on meanwhile.
+    Posts are buffered per source, so interleaved pages of several vendors still fill whole batches.
+    Callers flush a source after each page, so its posts are written while next pages are scraped.
+    batch_size: maximum number of posts per bulk write
+    write_concern: write concern of bulk writes (collection default when None)
+    max_pending_batches: add() blocks when this many batches are waiting (back-pressure)
+    """
+
+    def __init__(self, database, batch_size: int = 500, write_concern: Optional[WriteConcern] = None, max_pending_batches: int = 4):
+        self.database = database
+        self.batch_size = batch_size
+        self.write_concern = write_concern
+        self.results: List[BatchResult] = []
+        self.errors: List[Exception] = []
+        self._buffers: Dict[str, List[dict]] = {}
+        self._queue = queue.Queue(maxsize=max_pending_batches)
+        # Writes are counted in the scope of the cycle creating the writer
+        self._thread = threading.Thread(target=default_command_metrics.bind(self._run), name="writer", daemon=True)
+        self._thread.start()
+
+    def add(self, post: dict) -> None:
+        buffer = self._buffers.setdefault(post["source"], [])
+        buffer.append(post)
+        if len(buffer) >= self.batch_size:
+            self._flush_source(post["source"])
+
+    def _flush_source(self, source_name: str) -> None:
+        """
+        Queue buffered posts of source_name, block if too many batches are pending
+        """
+        posts = self._buffers.pop(source_name, None)
+        if posts:
+            self._queue.put((source_name, posts))
+
+    def flush(self, source_name: Optional[str] = None) -> None:
+        """
+        Queue buffered posts of source_name (every source when None)
+        """
+        for buffered_source_name in ([source_name] if source_name is not None else list(self._buffers)):
+            self._flush_source(buffered_source_name)
+
+    def close(self) -> List[BatchResult]:
+        """
+        Write remaining posts and wait for writer thread.
+        Raise first write error, successful batches are kept in database.
+        """
+        self.flush()
+        self._queue.put(None)
+        self._thread.join()
+        if self.errors:
+            raise self.errors[0]
+        return self.results
+
+    @property
+    def written_count(self) -> int:
+        """
+        Posts the database reported as inserted
+        """
+        return sum(result.document_count for result in self.results if result.document_count is not None)
+
+    @property
+    def unacknowledged_count(self) -> int:
+        """
+        Posts sent with an unacknowledged write concern, their insertion is unknown
+        """
+        return sum(result.post_count for result in self.results if result.document_count is None)
+
+    def _run(self) -> None:
+        while True:
+            batch = self._queue.get()
+            if batch is None:
+                break
+            source_name, posts = batch
+            start_time = time.monotonic()
+            try:
+                document_count = self.database.bulk_write_posts(posts, write_concern=self.write_concern)
+            except Exception as exception:
+                logger.warning(f"Failed to write [{len(posts)}] posts from [{source_name}]. Reason [{exception}]")
+                self.errors.append(exception)
+                # Unordered bulk writes (BulkWriteError) insert the other posts of the batch
+                details = getattr(exception, "details", None)
+                if isinstance(details, dict) and "nInserted" in details:
+                    self.results.append(BatchResult(source_name, len(posts), details["nInserted"], time.monotonic() - start_time))
+                continue
+            result = BatchResult(source_name, len(posts), document_count, time.monotonic() - start_time)
+            logger.debug(f"Written {result}")
+            self.results.append(result)
@@ -0,0 +1,131 @@
+import re
+import json
+from typing import Any, Iterator, Optional, Tuple, Union
+from bestdeal.core.toolbox import clean_price
+
+
+# Tokens of a JavaScript object literal that are not valid JSON
+JS_LITERAL_TOKENS = re.compile(r"""
+    (?P<double_quoted>"(?:[^"\\]|\\.)*")
+    |(?P<single_quoted>'(?:[^'\\]|\\.)*')
+    |(?P<bare_key>[A-Za-z_$][\w$]*)(?=\s*:)
+    |(?P<trailing_comma>,)(?=\s*[}\]])
+""", re.VERBOSE | re.DOTALL)
+
+# Inside a single quoted string: \' is not a valid JSON escape and " must be escaped
+SINGLE_QUOTED_ESCAPES = re.compile(r'\\(.)|"', re.DOTALL)
+
+OPENING_BRACKET = re.compile(r"[{\[]")
+
+JSON_LD_SCRIPT = re.compile(r'<script[^>]*type=["\']application/ld\+json["\'][^>]*>(.*?)</script>', re.IGNORECASE | re.DOTALL)
+
+
+def _convert_single_quoted_escape(match) -> str:
+    if match.group(0) == '"':
+        return '\\"'
+    if match.group(1) == "'":
+        return "'"
+    return match.group(0)
+
+
+def _convert_js_token(match) -> str:
+    if match.group("double_quoted"):
+        return match.group("double_quoted")
+    if match.group("single_quoted"):
+        content = SINGLE_QUOTED_ESCAPES.sub(_convert_single_quoted_escape, match.group("single_quoted")[1:-1])
+        return f'"{content}"'
+    if match.group("bare_key"):
+        return f'"{match.group("bare_key")}"'
+    return ""
+
+
+def js_literal_to_json(literal: str) -> str:
+    """
+    Example: {name: 'MSI, 10 Go', 'price': 42.5,} to {"name": "MSI, 10 Go", "price": 42.5}
+    """
+    return JS_LITERAL_TOKENS.sub(_convert_js_token, literal)
+
+
+def find_balanced_literal(text: str, start: int) -> Optional[str]:
+    """
+    Return the object or array literal opened at text[start], brackets inside strings are ignored.
+    """
+    closing = {"{": "}", "[": "]"}
+    stack = []
+    quote = None
+    index = start
+    while index < len(text):
+        character = text[index]
+        if quote:
+            if character == "\\":
+                index += 1
+            elif character == quote:
+                quote = None
+        elif character in "'\"":
+            quote = character
+        elif character in closing:
+            stack.append(closing[character])
+        elif stack and character == stack[-1]:
+            stack.pop()
+            if not stack:
+                return text[start:index + 1]
+        index += 1
+    return None
+
+
+def extract_js_objects(text: str, marker: str) -> Iterator[Any]:
+    """
+    Decode the first object or array literal following each occurrence of marker.
+    Occurrences that cannot be decoded are skipped.
+    """
+    position = text.find(marker)
+    while position != -1:
+        opening = OPENING_BRACKET.search(text, position + len(marker))
+        if opening is None:
+            return
+        literal = find_balanced_literal(text, opening.start())
+        if literal is not None:
+            try:
+                yield json.loads(js_literal_to_json(literal))
+            except ValueError:
+                pass
+        position = text.find(marker, position + len(marker))
+
+
+def extract_json_ld(text: str) -> Iterator[Any]:
+    """
+    Decode every <script type="application/ld+json"> block
+    """
+    for match in JSON_LD_SCRIPT.finditer(text):
+        try:
+            yield json.loads(match.group(1))
+        except ValueError:
+            continue
+
+
+def format_price(price: Union[str, int, float]) -> str:
+    if isinstance(price, (int, float)):
+        return f"{price:.2f}"
+    return clean_price(price)
+
+
+def iterate_products(data: Any) -> Iterator[Tuple[str, Any]]:
+    """
+    Walk decoded data and yield (name, price) of every record carrying both keys.
+    Handle datalayer impressions ({"name": ..., "price": ...})
+    and schema.org offers ({"name": ..., "offers": {"price": ...}}).
+    """
+    if isinstance(data, list):
+        for item in data:
+            yield from iterate_products(item)
+    elif isinstance(data, dict):
+        name = data.get("name")
+        price = data.get("price")
+        offers = data.get("offers")
+        if price is None and isinstance(offers, dict):
+            price = offers.get("price", offers.get("lowPrice"))
+        if isinstance(name, str) and price is not None:
+            yield name, price
+            return
+        for value in data.values():
+            yield from iterate_products(value)
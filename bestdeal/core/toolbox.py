@@ -54,6 +54,16 @@ def convert_datetime_to_date(date_time: str) -> str:
     return datetime.strptime(date_time, '%Y%m%d_%H%M%S').strftime('%Y/%m/%d')
 
 
+def convert_timestamp_to_datetime(timestamp: str) -> datetime:
+    """ Example: 20200515_130607 to datetime(2020, 5, 15, 13, 6, 7, tzinfo=timezone.utc) """
+    return datetime.strptime(timestamp, '%Y%m%d_%H%M%S').replace(tzinfo=timezone.utc)
+
+
+def convert_day_to_datetime(day: str) -> datetime:
+    """ Example: 20200515 to datetime(2020, 5, 15, tzinfo=timezone.utc) """
+    return datetime.strptime(day, '%Y%m%d').replace(tzinfo=timezone.utc)
+
+
 def get_today_date() -> str:
     return datetime.now(timezone.utc).strftime('%Y%m%d')
 
@@ -1,5 +1,6 @@
 # coding: utf-8
 
+import bs4
 import re
 from bestdeal.core.source import Source
 from bestdeal.core.toolbox import clean_price
@@ -7,6 +8,8 @@ from loguru import logger
 
 
 class Cybertek(Source):
+    parse_only = bs4.SoupStrainer('div', attrs={'class': re.compile('ppp-*')})
+
     def __init__(self):
         super().__init__(source_name=__class__.__name__)
 
@@ -1,13 +1,22 @@
 # coding: utf-8
 
+import bs4
 from bestdeal.core.source import Source
+from bestdeal.core.pagination import find_last_page_number, build_page_urls
 from bestdeal.core.toolbox import clean_price
 
 
 class GrosBill(Source):
+    parse_only = bs4.SoupStrainer('table', attrs={'id': 'listing_mode_display'})
+    max_pages = 5
+
     def __init__(self):
         super().__init__(source_name=__class__.__name__)
 
+    def _get_next_page_urls(self, url, content):
+        # Listing pages are numbered by "page" query parameter
+        return build_page_urls(url, find_last_page_number(content, 'page'), 'page')
+
     def _enrich_deals_from_soup(self, soup, deals):
         for product in soup.find('table', attrs={'id': 'listing_mode_display'}).findAll('tr'):
             try:
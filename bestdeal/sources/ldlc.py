@@ -1,15 +1,23 @@
 # coding: utf-8
 
 import bs4
+from loguru import logger
 from bestdeal.core.source import Source
 from bestdeal.core.toolbox import clean_price
 
 
 class LDLC(Source):
+    parse_only = bs4.SoupStrainer("script")
+    # Products are listed in the datalayer: 'ecommerce': {'impressions': [{'name': ..., 'price': ...}, ...]}
+    structured_data_marker = "ecommerce"
+
     def __init__(self):
         super().__init__(source_name=__class__.__name__)
 
     def _enrich_deals_from_soup(self, soup: bs4.BeautifulSoup, deals):
+        """
+        Fallback when datalayer cannot be decoded
+        """
         for item in soup.find_all("script"):
             if "ecommerce" in item.text:
                 for gpu in [x for x in item.text.split("{") if "name" in x]:
@@ -28,7 +36,6 @@ class LDLC(Source):
 
 
 if __name__ == '__main__':
-    from loguru import logger
     vendor = LDLC()
     fetched_deals = vendor.fetch_deals('1660', 'https://bit.ly/2OmH9PP')
     for deal in fetched_deals:
@@ -1,11 +1,14 @@
 # coding: utf-8
 
+import bs4
 from bestdeal.core.source import Source
 from bestdeal.core.toolbox import clean_price
 from loguru import logger
 
 
 class MindFactory(Source):
+    parse_only = bs4.SoupStrainer('div', attrs={'class': 'pcontent'})
+
     def __init__(self):
         super().__init__(source_name=__class__.__name__)
 
@@ -1,12 +1,21 @@
+import bs4
 from loguru import logger
 from bestdeal.core.source import Source
+from bestdeal.core.pagination import find_last_page_number, build_page_urls
 from bestdeal.core.toolbox import clean_price
 
 
 class PCW(Source):
+    parse_only = bs4.SoupStrainer("div", attrs={"class": "price-and-status d-flex flex-wrap align-items-center"})
+    max_pages = 5
+
     def __init__(self):
         super().__init__(source_name=__class__.__name__)
 
+    def _get_next_page_urls(self, url, content):
+        # PrestaShop pagination links: ?page=2, ?page=3...
+        return build_page_urls(url, find_last_page_number(content, "page"))
+
     def _enrich_deals_from_soup(self, soup, deals):
         for product in soup.findAll("div", attrs={"class": "price-and-status d-flex flex-wrap align-items-center"}):
             product_name = product.find("a", attrs={"itemprop": "url"}).text
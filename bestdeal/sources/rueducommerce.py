@@ -1,5 +1,6 @@
 # coding: utf-8
 
+import bs4
 from loguru import logger
 from bestdeal.core.source import Source
 from bestdeal.core.toolbox import clean_price
@@ -11,6 +12,8 @@ class RueDuCommerce(Source):
     TLDR: it doesn't work
     Blocked by: https://datadome.co/fr/
     """
+    parse_only = bs4.SoupStrainer('article', attrs={'itemtype': 'http://schema.org/Product'})
+
     def __init__(self):
         super().__init__(source_name=__class__.__name__)
 
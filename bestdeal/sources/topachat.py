@@ -1,10 +1,13 @@
 # coding: utf-8
 
+import bs4
 from bestdeal.core.source import Source
 from bestdeal.core.toolbox import clean_price
 
 
 class TopAchat(Source):
+    parse_only = bs4.SoupStrainer('article', attrs={'class': 'grille-produit'})
+
     def __init__(self):
         super().__init__(source_name=__class__.__name__)
 
@@ -1,15 +1,61 @@
-from typing import List
+from typing import List, Dict, Optional, Tuple
+import pandas as pd
 import streamlit as st
 from loguru import logger
-from pymongo import MongoClient, ASCENDING
-from datetime import datetime, timezone, date
-from bestdeal.core.pricedatabase import PriceDatabase
+from datetime import datetime, timezone, timedelta
+from bestdeal.core.storage import PriceStorage, create_price_database
+from bestdeal.core.toolbox import get_today_date
+
+# Past days never change, today changes with each fetcher cycle (see get_cache_version)
+CACHE_TTL_SECONDS = 3600
+MAX_CHART_POINTS = 120
+PAGE_SIZE = 100
+
+
+@st.cache_resource
+def get_database(collection_name: str) -> PriceStorage:
+    """
+    One database client (MongoClient connection pool or SQLite connection) per process, shared by every session.
+    PRICE_DATABASE_URI secret selects the backend (e.g. sqlite:///var/lib/bestdeal/prices.db)
+    """
+    uri = st.secrets.get("PRICE_DATABASE_URI") or st.secrets["MONGODB_CONNECTION_STRING"]
+    return create_price_database(collection_name, uri, create_indexes=False)
+
+
+@st.cache_data(ttl=CACHE_TTL_SECONDS)
+def get_filter_facets(_database: PriceStorage, collection_name: str, day: str, cache_version: Optional[str]) -> Dict[str, List[str]]:
+    return _database.find_filter_facets(day)
+
+
+@st.cache_data(ttl=CACHE_TTL_SECONDS)
+def get_cheapest_per_product_type(_database: PriceStorage, collection_name: str, day: str, cache_version: Optional[str]) -> Dict[str, dict]:
+    return _database.find_cheapest_per_product_type(day)
+
+
+@st.cache_data(ttl=CACHE_TTL_SECONDS)
+def get_daily_minimums(_database: PriceStorage,
+                       collection_name: str,
+                       start_day: str,
+                       end_day: str,
+                       product_types: Tuple[str, ...],
+                       per_source: bool,
+                       bucket_days: int,
+                       cache_version: Optional[str]) -> List[dict]:
+    return _database.find_daily_minimums(start_day, end_day, list(product_types), per_source=per_source, bucket_days=bucket_days)
 
 
 class Frontend:
     def __init__(self):
-        mc = MongoClient(st.secrets["MONGODB_CONNECTION_STRING"])
-        self.db = PriceDatabase(collection_name="GPU", client=mc)
+        self.collection_name = "GPU"
+        self.db = get_database(self.collection_name)
+
+    def get_cache_version(self) -> Optional[str]:
+        """
+        Cached results of today are dropped when a fetcher cycle inserts posts
+        """
+        if self.formatted_selected_date != get_today_date():
+            return None
+        return self.db.find_last_cycle_timestamp()
 
     def display_filters(self):
         with st.sidebar.expander(label="Filters", expanded=True):
@@ -18,26 +64,44 @@ class Frontend:
             self.selected_source = st.selectbox("Source", ["All"] + self.available_sources)
             self.apply_filters_clicked = st.button(label="Apply filters")
             self.pick_cheapest_clicked = st.button(label="Pick cheapest")
+            self.best_deals_clicked = st.button(label="Best deals")
 
-    def find_by_filters(self):
-        return self.db.find_all_posts_by_filters(
-            datetime_regex=self.formatted_selected_date,
+    def pick_cheapest_by_filters(self):
+        return self.db.find_daily_cheapest(
+            day=self.formatted_selected_date,
             product_type=self.selected_product_type if self.selected_product_type != "All" else None,
             product_brand=self.selected_brand if self.selected_brand != "All" else None,
             source=self.selected_source if self.selected_source != "All" else None,
         )
 
-    def pick_cheapest_by_filters(self):
-        mongo_cursor = self.find_by_filters()
-        second_cursor = mongo_cursor.sort("product_price", ASCENDING)
-        for post in second_cursor.limit(1):
-            return post
+    def display_best_deals(self):
+        cheapest_posts = get_cheapest_per_product_type(self.db, self.collection_name, self.formatted_selected_date, self.cache_version)
+        st.table([
+            {key: cheapest_posts[product_type][key] for key in ["product_type", "product_price", "product_name", "source", "url"]}
+            for product_type in sorted(cheapest_posts)
+        ])
+
+    def find_posts_page(self, page: int) -> Tuple[int, List[dict]]:
+        return self.db.find_posts_page(
+            day=self.formatted_selected_date,
+            product_type=self.selected_product_type if self.selected_product_type != "All" else None,
+            product_brand=self.selected_brand if self.selected_brand != "All" else None,
+            source=self.selected_source if self.selected_source != "All" else None,
+            page=page,
+            page_size=PAGE_SIZE,
+        )
 
     def apply_filters(self):
-        mongo_cursor = self.find_by_filters()
-        if mongo_cursor.count():
-            for post in mongo_cursor:
-                st.write(post)
+        page = st.number_input("Page", min_value=1, value=1, step=1) - 1
+        total, rows = self.find_posts_page(page)
+        page_count = (total + PAGE_SIZE - 1) // PAGE_SIZE
+        if total and page >= page_count:
+            # Page past the end (filters changed since it was picked): show the last one
+            page = page_count - 1
+            total, rows = self.find_posts_page(page)
+        if total:
+            st.caption(f"[{total}] posts, page [{page + 1}/{page_count}]")
+            st.dataframe(rows, use_container_width=True)
         else:
             st.info(
                 f"Nothing to display for [{self.selected_product_type}], "
@@ -45,61 +109,47 @@ class Frontend:
                 f"and [{self.selected_source}]"
             )
 
-
-
     def display_graph(self):
-        self.year = 2021
-        # self.start_date = date(year=self.year, month=1, day=1)
-        # self.end_date = date(year=self.year, month=12, day=31)
-        self.start_date = date(year=self.year, month=11, day=1)
-        self.end_date = date(year=self.year, month=11, day=7)
-        logger.info('Prepare prices from [{}] to [{}]'.format(self.start_date, self.end_date))
-
-        # dico = {
-        #     'LDLC': {"20211101": 1, "20211102": 2},
-        #     'TopAchat': {"20211101": 1, "20211102": 2},
-        # }
-
-        # dico = {}
-        # for product_type in ["3080"]:
-        #     dico[product_type] = {}
-        #     for single_date in date_range(self.start_date, self.end_date):
-        #         current_date = single_date.strftime("%Y%m%d")
-        #         all_posts = self.db.find_all_posts_by_filters(
-        #             datetime_regex=current_date,
-        #             product_type=product_type,
-        #         )
-        #         logger.info(current_date)
-        #         cheapest_post = self.db.find_cheapest_from_cursor(mongo_cursor=all_posts)
-        #         if cheapest_post:
-        #             dico[product_type][current_date] = cheapest_post["product_price"]
-        #
-        # st.write(dico)
-        # chart_data = pd.DataFrame(dico)
-        # st.line_chart(chart_data)
+        with st.expander(label="Price history", expanded=False):
+            today = datetime.now(timezone.utc).date()
+            selected_range = st.date_input(label="Range", value=(today - timedelta(days=30), today))
+            product_types = st.multiselect("Product types", self.available_product_types, default=self.available_product_types[:3])
+            per_source = st.checkbox("Per source")
+            # Range is incomplete while the user picks its end
+            if not product_types or len(selected_range) != 2:
+                return
+            start_date, end_date = selected_range
+            cache_version = self.db.find_last_cycle_timestamp() if end_date >= today else None
+            # Long ranges are downsampled by the database to about MAX_CHART_POINTS points
+            bucket_days = max(1, ((end_date - start_date).days + 1) // MAX_CHART_POINTS)
+            logger.info('Prepare prices from [{}] to [{}] by [{}] days'.format(start_date, end_date, bucket_days))
+            rows = get_daily_minimums(self.db, self.collection_name, start_date.strftime("%Y%m%d"), end_date.strftime("%Y%m%d"),
+                                      tuple(product_types), per_source, bucket_days, cache_version)
+            if not rows:
+                st.info("No price history for this range, daily minimums may need a rebuild-daily-minimums")
+                return
+            frame = pd.DataFrame(rows)
+            frame["day"] = pd.to_datetime(frame["day"], format="%Y%m%d")
+            columns = ["product_type", "source"] if per_source else "product_type"
+            chart_data = frame.pivot_table(index="day", columns=columns, values="product_price", aggfunc="min")
+            if per_source:
+                chart_data.columns = [f"{product_type} {source}" for product_type, source in chart_data.columns]
+            st.line_chart(chart_data)
 
     def main(self):
         self.selected_date = st.sidebar.date_input(label="Date", value=datetime.now(timezone.utc))
         self.formatted_selected_date = self.selected_date.strftime("%Y%m%d")
 
-        # Find available product
-        self.available_product_types: List[str] = self.db.find_distinct_criteria_by_date(
-            criteria="product_type",
-            datetime_regex=self.formatted_selected_date,
-        )
+        self.cache_version = self.get_cache_version()
+
+        # Find available product and fill filters
+        facets = get_filter_facets(self.db, self.collection_name, self.formatted_selected_date, self.cache_version)
+        self.available_product_types: List[str] = facets["product_type"]
         if not self.available_product_types:
             st.error(f"No available records for date [{self.formatted_selected_date}]")
             st.stop()
-
-        # Fill filters
-        self.available_sources: List[str] = self.db.find_distinct_criteria_by_date(
-            criteria="source",
-            datetime_regex=self.formatted_selected_date,
-        )
-        self.available_brands: List[str] = self.db.find_distinct_criteria_by_date(
-            criteria="product_brand",
-            datetime_regex=self.formatted_selected_date,
-        )
+        self.available_sources: List[str] = facets["source"]
+        self.available_brands: List[str] = facets["product_brand"]
         self.display_filters()
 
         no_click = True
@@ -107,7 +157,15 @@ class Frontend:
             mongo_post = self.pick_cheapest_by_filters()
             st.write(mongo_post)
             no_click = False
+        if self.best_deals_clicked:
+            self.display_best_deals()
+            no_click = False
+        # Filtered view stays displayed while browsing pages
         if self.apply_filters_clicked:
+            st.session_state["filters_applied"] = True
+        if self.pick_cheapest_clicked or self.best_deals_clicked:
+            st.session_state["filters_applied"] = False
+        if st.session_state.get("filters_applied"):
             self.apply_filters()
             no_click = False
 
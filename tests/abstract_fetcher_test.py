@@ -1,9 +1,10 @@
-import pytest
+import threading
 import unittest
+from bestdeal.core.cycle_summary import PageMetrics
+from bestdeal.core.fetch_pool import FetchPool
 from bestdeal.core.toolbox import get_today_datetime, get_yesterday_datetime
 from bestdeal.backend.abstract_fetcher import AbstractFetcher
-from bestdeal.core.pricedatabase import PriceDatabase
-from pymongo_inmemory import MongoClient
+from bestdeal.core.sqlite_database import SqlitePriceDatabase
 
 
 class MockedFetcher(AbstractFetcher):
@@ -11,15 +12,93 @@ class MockedFetcher(AbstractFetcher):
         super().__init__(database)
 
 
-@pytest.mark.skip(reason="TravisCI doesn't correctly handle pymongo_inmemory...")
+class StreamedDatabase(SqlitePriceDatabase):
+    def __init__(self):
+        super().__init__(collection_name="UnitTests")
+        self.written = threading.Event()
+
+    def bulk_write_posts(self, posts, write_concern=None):
+        document_count = super().bulk_write_posts(posts, write_concern)
+        self.written.set()
+        return document_count
+
+
+class StubSource:
+    source_name = "Vendor"
+
+    def __init__(self):
+        self.page_states = {}
+
+
+class PagedFetcher(MockedFetcher):
+    def __init__(self, database, pages):
+        super().__init__(database)
+        self.pages = pages
+        self.source = StubSource()
+        self.sources = {StubSource: self.source}
+        self.written_before_next_page = None
+
+    def _extract_product_data(self, product_description):
+        if product_description == "Broken":
+            raise ValueError("Unable to classify")
+        return "ASUS", "2080 TI"
+
+    def _scrap_all_products(self):
+        for index, deals in enumerate(self.pages):
+            if index:
+                self.written_before_next_page = self.database.written.wait(timeout=5)
+            yield self.source, PageMetrics(self.source.source_name, "2080 TI", "http://www.vendor.com"), deals
+
+
+class TestStoreDeals(unittest.TestCase):
+    def setUp(self) -> None:
+        self.db = StreamedDatabase()
+
+    def tearDown(self) -> None:
+        self.db.close()
+
+    def test_page_is_written_before_next_page(self):
+        fetcher = PagedFetcher(self.db, [{"ASUS 2080 TI": "900"}, {"MSI 2080 TI": "950"}])
+        fetcher._scrap_and_store()
+        self.assertTrue(fetcher.written_before_next_page)
+        self.assertEqual(2, fetcher.cycle_summary.inserted_posts)
+
+    def test_pages_are_forgotten_on_failure(self):
+        fetcher = PagedFetcher(self.db, [{"ASUS 2080 TI": "900"}, {"Broken": "950"}])
+        fetcher.source.page_states["http://www.vendor.com"] = "validators"
+        self.assertRaises(ValueError, fetcher._scrap_and_store)
+        self.assertEqual({}, fetcher.source.page_states)
+        # Pages stored before the failure are kept
+        self.assertEqual(1, fetcher.cycle_summary.inserted_posts)
+
+
+class TestFetchPool(unittest.TestCase):
+    def test_own_pool_is_shut_down(self):
+        fetcher = MockedFetcher(None)
+        fetch_pool = fetcher._get_fetch_pool()
+        fetcher.stop()
+        fetcher.continuous_watch()
+        self.assertIsNone(fetcher.fetch_pool)
+        self.assertRaises(RuntimeError, fetch_pool.submit, print)
+
+    def test_shared_pool_is_kept(self):
+        fetch_pool = FetchPool()
+        fetcher = MockedFetcher(None)
+        fetcher.fetch_pool = fetch_pool
+        fetcher.stop()
+        fetcher.continuous_watch()
+        self.assertIs(fetch_pool, fetcher._get_fetch_pool())
+        fetch_pool.submit(print).result()
+        fetch_pool.shutdown()
+
+
 class TestAbstractFetcher(unittest.TestCase):
     def setUp(self) -> None:
-        self.client = MongoClient()
-        self.db = PriceDatabase(collection_name="UnitTests", client=self.client)
+        self.db = SqlitePriceDatabase(collection_name="UnitTests")
         self.fetcher = MockedFetcher(self.db)
 
     def tearDown(self) -> None:
-        self.client.close()
+        self.db.close()
 
     def test_no_data_case(self):
         self.assertRaises(Exception, self.fetcher._format_cheapest_product_tweet, "2080 TI")
@@ -38,13 +117,13 @@ class TestAbstractFetcher(unittest.TestCase):
     def test_only_yesterday_post_case(self):
         yesterday_post = self.create_basic_post()
         yesterday_post["timestamp"] = get_yesterday_datetime()
-        self.db.collection.insert_one(yesterday_post)
+        self.db.bulk_insert([yesterday_post])
         self.assertRaises(Exception, self.fetcher._format_cheapest_product_tweet, "2080 TI")
 
     def test_only_today_post_case(self):
         today_post = self.create_basic_post()
         today_post["timestamp"] = get_today_datetime()
-        self.db.collection.insert_one(today_post)
+        self.db.bulk_insert([today_post])
         self.fetcher._format_cheapest_product_tweet("2080 TI")
 
     def test_yesterday_and_today_post_case(self):
@@ -52,5 +131,5 @@ class TestAbstractFetcher(unittest.TestCase):
         posts[0]["timestamp"] = get_yesterday_datetime()
         posts[1]["timestamp"] = get_today_datetime()
         posts[1]["product_price"] = posts[0]["product_price"] * 2
-        self.db.collection.insert_many(posts)
+        self.db.bulk_insert(posts)
         self.fetcher._format_cheapest_product_tweet("2080 TI")
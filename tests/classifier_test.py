@@ -0,0 +1,80 @@
+import os
+import tempfile
+import unittest
+from bestdeal.core.classifier import TokenMatcher, ProductClassifier, JsonFileClassificationStore
+from bestdeal.backend.gpu_fetcher import GpuFetcher
+
+
+class TestTokenMatcher(unittest.TestCase):
+    def setUp(self) -> None:
+        self.matcher = TokenMatcher(["TI", "SUPER"])
+
+    def test_found(self):
+        self.assertEqual("TI", self.matcher.find_exactly_one("MSI RTX 3080 Ti 6 Go"))
+
+    def test_glued_token_is_ignored(self):
+        self.assertIsNone(self.matcher.find_exactly_one("MSI RTX 3080TIX"))
+
+    def test_ambiguous(self):
+        self.assertIsNone(self.matcher.find_exactly_one("MSI RTX 2080 Ti Super"))
+
+
+class TestProductClassifier(unittest.TestCase):
+    def setUp(self) -> None:
+        self.calls = []
+        self.classifier = ProductClassifier(self.classify, max_size=2)
+
+    def classify(self, product_description):
+        self.calls.append(product_description)
+        return "MSI", product_description
+
+    def test_cache_hit(self):
+        self.assertEqual(("MSI", "3080"), self.classifier.classify("3080"))
+        self.assertEqual(("MSI", "3080"), self.classifier.classify("3080"))
+        self.assertEqual(["3080"], self.calls)
+        self.assertEqual((1, 1), (self.classifier.hits, self.classifier.misses))
+
+    def test_least_recently_used_is_evicted(self):
+        for product_description in ["3070", "3080", "3070", "3090", "3080"]:
+            self.classifier.classify(product_description)
+        self.assertEqual(["3070", "3080", "3090", "3080"], self.calls)
+
+    def test_vendor_name_is_classified(self):
+        self.assertEqual(("MSI", "msi  RTX 3080"), self.classifier.classify("msi  RTX 3080"))
+        self.classifier.classify("MSI RTX 3080")
+        self.assertEqual(["msi  RTX 3080"], self.calls)
+
+
+class TestPersistentClassification(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.store = JsonFileClassificationStore(os.path.join(self.directory.name, "classification.json"))
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def create_fetcher(self) -> GpuFetcher:
+        fetcher = GpuFetcher(database=None)
+        fetcher.classification_store = self.store
+        return fetcher
+
+    def test_warm_restart(self):
+        classifier = self.create_fetcher()._get_classifier()
+        self.assertEqual(("MSI", "3080 TI"), classifier.classify("MSI RTX 3080 Ti 6 Go"))
+        classifier.save()
+
+        restarted_classifier = self.create_fetcher()._get_classifier()
+        self.assertEqual(("MSI", "3080 TI"), restarted_classifier.classify("msi  rtx 3080 ti 6 go"))
+        self.assertEqual((1, 0), (restarted_classifier.hits, restarted_classifier.misses))
+
+    def test_rules_change(self):
+        classifier = self.create_fetcher()._get_classifier()
+        classifier.classify("MSI RTX 3080 Ti 6 Go")
+        classifier.save()
+
+        fetcher = self.create_fetcher()
+        fetcher.brands.append("COLORFUL")
+        restarted_classifier = fetcher._get_classifier()
+        self.assertNotEqual(classifier.version, restarted_classifier.version)
+        restarted_classifier.classify("MSI RTX 3080 Ti 6 Go")
+        self.assertEqual((0, 1), (restarted_classifier.hits, restarted_classifier.misses))
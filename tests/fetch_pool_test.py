@@ -0,0 +1,32 @@
+import time
+import threading
+import unittest
+from bestdeal.core.fetch_pool import FetchPool
+
+
+class TestFetchPool(unittest.TestCase):
+    def setUp(self) -> None:
+        self.pool = FetchPool(max_workers=6, max_requests_per_host=2)
+        self.lock = threading.Lock()
+        self.in_flight = {}
+        self.max_in_flight = {}
+
+    def tearDown(self) -> None:
+        self.pool.shutdown()
+
+    def fake_request(self, url: str) -> str:
+        with self.pool.host_limiter.slot(url):
+            with self.lock:
+                self.in_flight[url] = self.in_flight.get(url, 0) + 1
+                self.max_in_flight[url] = max(self.max_in_flight.get(url, 0), self.in_flight[url])
+            time.sleep(0.02)
+            with self.lock:
+                self.in_flight[url] -= 1
+        return url
+
+    def test_per_host_cap(self):
+        urls = ["https://vendor-a.com/page"] * 6 + ["https://vendor-b.com/page"] * 6
+        futures = [self.pool.submit(self.fake_request, url) for url in urls]
+        self.assertEqual(urls, [future.result() for future in futures])
+        self.assertEqual(2, self.max_in_flight["https://vendor-a.com/page"])
+        self.assertEqual(2, self.max_in_flight["https://vendor-b.com/page"])
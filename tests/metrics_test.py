@@ -0,0 +1,107 @@
+import json
+import threading
+import unittest
+import requests
+from pymongo import monitoring
+from bestdeal.core.cycle_summary import CycleSummary, PageMetrics
+from bestdeal.core.metrics import CommandMetrics, MetricsRegistry, MetricsServer
+
+
+class FakeCommandEvent:
+    def __init__(self, request_id: int, command_name: str, collection: str, duration_micros: int = 0):
+        self.request_id = request_id
+        self.command_name = command_name
+        self.command = {command_name: collection}
+        self.duration_micros = duration_micros
+
+
+def create_summary() -> CycleSummary:
+    summary = CycleSummary()
+    fetched_page = PageMetrics("LDLC", "1660", "https://www.ldlc.com/1660")
+    fetched_page.status = PageMetrics.FETCHED
+    fetched_page.bytes_downloaded = 2048
+    fetched_page.download_seconds = 0.2
+    fetched_page.parse_seconds = 0.05
+    fetched_page.deals_count = 12
+    fetched_page.classification_misses = 3
+    failed_page = PageMetrics("LDLC", "2080", "https://www.ldlc.com/2080")
+    failed_page.status = PageMetrics.FAILED
+    summary.add_page(fetched_page)
+    summary.add_page(failed_page)
+    summary.inserted_posts = 5
+    summary.database_commands = {("GPU", "insert"): {"count": 2, "seconds": 0.01, "failures": 0}}
+    return summary
+
+
+class TestCommandMetrics(unittest.TestCase):
+    def test_commands(self):
+        metrics = CommandMetrics()
+        self.assertIsInstance(metrics, monitoring.CommandListener)
+        before = metrics.snapshot()
+        metrics.started(FakeCommandEvent(1, "find", "GPU"))
+        metrics.succeeded(FakeCommandEvent(1, "find", "GPU", duration_micros=1500))
+        metrics.started(FakeCommandEvent(2, "insert", "GPU"))
+        metrics.failed(FakeCommandEvent(2, "insert", "GPU", duration_micros=500))
+        metrics.started(FakeCommandEvent(3, "find", "CPU"))
+        metrics.succeeded(FakeCommandEvent(3, "find", "CPU"))
+        difference = CommandMetrics.difference(metrics.snapshot(), before, ["GPU"])
+        self.assertEqual({("GPU", "find"): {"count": 1, "seconds": 0.0015, "failures": 0},
+                          ("GPU", "insert"): {"count": 1, "seconds": 0.0005, "failures": 1}}, difference)
+
+    def test_scopes(self):
+        metrics = CommandMetrics()
+
+        def find():
+            metrics.started(FakeCommandEvent(2, "find", "GPU"))
+            metrics.succeeded(FakeCommandEvent(2, "find", "GPU"))
+
+        with metrics.scoped("GPU"):
+            metrics.started(FakeCommandEvent(1, "insert", "Tweet"))
+            metrics.succeeded(FakeCommandEvent(1, "insert", "Tweet"))
+            # Threads started by the GPU fetcher (writer, publisher) count in its scope
+            thread = threading.Thread(target=metrics.bind(find))
+        thread.start()
+        thread.join()
+        with metrics.scoped("CPU"):
+            metrics.started(FakeCommandEvent(3, "insert", "Tweet"))
+            metrics.succeeded(FakeCommandEvent(3, "insert", "Tweet"))
+        self.assertEqual({("Tweet", "insert"), ("GPU", "find")}, set(metrics.snapshot("GPU")))
+        self.assertEqual(1, metrics.snapshot("CPU")[("Tweet", "insert")]["count"])
+        self.assertEqual({}, metrics.snapshot())
+
+
+class TestCycleReport(unittest.TestCase):
+    def test_report(self):
+        report = create_summary().to_report("GpuFetcher")
+        self.assertEqual(12, report["deals_count"])
+        self.assertEqual({"download": 0.2, "parse": 0.05}, report["stages"])
+        self.assertEqual({"pages": 2, "failed_pages": 1, "bytes_downloaded": 2048, "download_ms": 200.,
+                          "parse_ms": 50., "deals_count": 12, "classification_misses": 3}, report["sources"]["LDLC"])
+        self.assertEqual([{"collection": "GPU", "command": "insert", "count": 2, "seconds": 0.01, "failures": 0}],
+                         report["database"])
+
+    def test_render(self):
+        registry = MetricsRegistry()
+        registry.update(create_summary().to_report("GpuFetcher"))
+        text = registry.render_prometheus()
+        self.assertIn('bestdeal_cycles_total{fetcher="GpuFetcher"} 1', text)
+        self.assertIn('bestdeal_page_bytes{fetcher="GpuFetcher",source="LDLC",product="1660"} 2048', text)
+        self.assertIn('bestdeal_page_failed{fetcher="GpuFetcher",source="LDLC",product="2080"} 1', text)
+        self.assertIn('bestdeal_database_round_trips{fetcher="GpuFetcher",collection="GPU",command="insert"} 2', text)
+        self.assertEqual(5, json.loads(registry.render_json())["reports"]["GpuFetcher"]["inserted_posts"])
+
+    def test_server(self):
+        registry = MetricsRegistry()
+        registry.update(create_summary().to_report("GpuFetcher"))
+        server = MetricsServer(registry, host="127.0.0.1", port=0).start()
+        try:
+            base_url = f"http://127.0.0.1:{server.port}"
+            self.assertIn("bestdeal_cycle_deals", requests.get(f"{base_url}/metrics").text)
+            self.assertEqual(1, requests.get(f"{base_url}/metrics.json").json()["cycles"]["GpuFetcher"])
+            self.assertEqual(404, requests.get(f"{base_url}/unknown").status_code)
+        finally:
+            server.stop()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import io
+import gzip
+import unittest
+import urllib3
+import requests
+from bestdeal.core.cycle_summary import PageMetrics
+from bestdeal.backend.gpu_fetcher import GpuFetcher
+from bestdeal.core.more_exceptions import PageNotModified
+from bestdeal.sources.topachat import TopAchat
+
+
+def build_response(status_code: int, content: bytes, headers: dict) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = content
+    response.headers.update(headers)
+    response.encoding = "utf-8"
+    return response
+
+
+class MockedTopAchat(TopAchat):
+    def __init__(self, responses):
+        super().__init__()
+        self.responses = responses
+        self.sent_headers = []
+
+    def _download(self, url, headers):
+        self.sent_headers.append(headers)
+        return self.responses.pop(0)
+
+
+class TestPageState(unittest.TestCase):
+    html = b"""
+    <article class="grille-produit"><h3>MSI RTX 3080</h3><div itemprop="price">799,99 EUR</div></article>
+    """
+    url = "https://www.topachat.com/rtx"
+
+    def test_not_modified_status(self):
+        source = MockedTopAchat([build_response(200, self.html, {"ETag": '"v1"'}), build_response(304, b"", {})])
+        self.assertEqual({"MSI RTX 3080": "799.99"}, source.fetch_deals("RTX", self.url))
+        self.assertRaises(PageNotModified, source.fetch_deals, "RTX", self.url)
+        self.assertEqual('"v1"', source.sent_headers[1]["If-None-Match"])
+
+    def test_same_content(self):
+        source = MockedTopAchat([build_response(200, self.html, {}), build_response(200, self.html, {})])
+        source.fetch_deals("RTX", self.url)
+        self.assertRaises(PageNotModified, source.fetch_deals, "RTX", self.url)
+
+    def test_new_day(self):
+        source = MockedTopAchat([build_response(200, self.html, {}), build_response(200, self.html, {})])
+        source.fetch_deals("RTX", self.url)
+        source.page_states[self.url].day = "20000101"
+        self.assertEqual({"MSI RTX 3080": "799.99"}, source.fetch_deals("RTX", self.url))
+        self.assertNotIn("If-None-Match", source.sent_headers[1])
+
+    def test_error_status(self):
+        source = MockedTopAchat([build_response(503, b"<html>Service Unavailable</html>", {})])
+        self.assertRaises(requests.HTTPError, source.fetch_deals, "RTX", self.url)
+        self.assertNotIn(self.url, source.page_states)
+
+    def test_error_status_is_failed_page(self):
+        source = MockedTopAchat([build_response(503, b"<html>Service Unavailable</html>", {})])
+        page_metrics = PageMetrics("TopAchat", "RTX", self.url)
+        self.assertIsNone(GpuFetcher(database=None)._scrap_product(source, page_metrics))
+        self.assertEqual(PageMetrics.FAILED, page_metrics.status)
+
+    def test_compressed_size(self):
+        compressed = gzip.compress(self.html * 10)
+        response = requests.Response()
+        response.status_code = 200
+        response.raw = urllib3.HTTPResponse(body=io.BytesIO(compressed), headers={"Content-Encoding": "gzip"},
+                                            preload_content=False)
+        page_metrics = PageMetrics("TopAchat", "RTX", self.url)
+        MockedTopAchat([response]).fetch_deals("RTX", self.url, page_metrics)
+        self.assertEqual(len(compressed), page_metrics.bytes_downloaded)
+        # Without the raw stream, Content-Length is read
+        page_metrics = PageMetrics("TopAchat", "RTX", self.url)
+        MockedTopAchat([build_response(200, self.html, {"Content-Length": "42"})]).fetch_deals("RTX", self.url, page_metrics)
+        self.assertEqual(42, page_metrics.bytes_downloaded)
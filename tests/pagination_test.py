@@ -0,0 +1,139 @@
+import time
+import threading
+import unittest
+import requests
+from bestdeal.core.cycle_summary import PageMetrics
+from bestdeal.core.more_exceptions import PageNotModified
+from bestdeal.core.pagination import set_query_parameter, find_last_page_number, build_page_urls
+from bestdeal.sources.pcw import PCW
+
+
+def build_response(status_code: int, content: bytes, headers: dict) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = content
+    response.headers.update(headers)
+    response.encoding = "utf-8"
+    return response
+
+
+def build_pcw_page(deals: dict, last_page: int = 1) -> bytes:
+    products = "".join(f'<div class="price-and-status d-flex flex-wrap align-items-center">'
+                       f'<a itemprop="url" href="/p">{name}</a><span class="price product-price">{price} €</span></div>'
+                       for name, price in deals.items())
+    links = "".join(f'<a href="https://www.pcw.fr/231-amd?page={number}">{number}</a>' for number in range(2, last_page + 1))
+    return f"<html><body>{products}<nav>{links}</nav></body></html>".encode("utf-8")
+
+
+class MockedPCW(PCW):
+    def __init__(self, responses: dict):
+        super().__init__()
+        self.responses = responses
+        self.requested_urls = []
+        self.lock = threading.Lock()
+
+    def _download(self, url, headers):
+        with self.lock:
+            self.requested_urls.append(url)
+            return self.responses[url].pop(0)
+
+
+class ConcurrencySession:
+    """
+    Stand-in for requests.Session recording the highest number of requests in flight
+    """
+
+    def __init__(self, responses: dict):
+        self.responses = responses
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def get(self, url, headers, timeout):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(0.05)
+        with self.lock:
+            self.in_flight -= 1
+        return self.responses[url]
+
+
+class StandInSessionRegistry:
+    def __init__(self, session: ConcurrencySession):
+        self.session = session
+
+    def get_session(self, source):
+        return self.session
+
+
+class TestPaginationHelpers(unittest.TestCase):
+    def test_set_query_parameter(self):
+        self.assertEqual("https://www.grosbill.com/cpu?tri=w&page=3#filtre_mini=-1",
+                         set_query_parameter("https://www.grosbill.com/cpu?page=1&tri=w#filtre_mini=-1", "page", 3))
+        self.assertEqual("https://www.pcw.fr/231-amd?page=2", set_query_parameter("https://www.pcw.fr/231-amd", "page", 2))
+        # Encoding of other parameters is kept
+        self.assertEqual("https://www.cybertek.fr/cpu?crit=Marque%3aAMD%7cIntel&q=a+b&page=2",
+                         set_query_parameter("https://www.cybertek.fr/cpu?crit=Marque%3aAMD%7cIntel&q=a+b&page=1", "page", 2))
+
+    def test_find_last_page_number(self):
+        self.assertEqual(3, find_last_page_number(build_pcw_page({}, last_page=3)))
+        self.assertEqual(4, find_last_page_number(b'<a href="/cpu?tri=w&amp;page=4">4</a>'))
+        self.assertEqual(1, find_last_page_number(b'<a href="/cpu?filtre_page=100">100</a>'))
+
+    def test_build_page_urls(self):
+        self.assertEqual(["https://www.pcw.fr/231-amd?page=2", "https://www.pcw.fr/231-amd?page=3"],
+                         build_page_urls("https://www.pcw.fr/231-amd", 3))
+
+
+class TestPaginatedSource(unittest.TestCase):
+    url = "https://www.pcw.fr/231-amd"
+
+    def test_merge_pages(self):
+        source = MockedPCW({
+            self.url: [build_response(200, build_pcw_page({"Ryzen 5 3600": "150,00", "Ryzen 7 3700X": "300,00"}, 3), {})],
+            f"{self.url}?page=2": [build_response(200, build_pcw_page({"Ryzen 7 3700X": "290,00"}), {})],
+            f"{self.url}?page=3": [build_response(200, build_pcw_page({"Ryzen 9 3900X": "450,00"}), {})],
+        })
+        page_metrics = PageMetrics("PCW", "AMD", self.url)
+        deals = source.fetch_deals("AMD", self.url, page_metrics)
+        self.assertEqual({"Ryzen 5 3600": "150.00", "Ryzen 7 3700X": "290.00", "Ryzen 9 3900X": "450.00"}, deals)
+        self.assertEqual([2, 1, 1], page_metrics.page_deals_counts)
+        self.assertEqual(3, page_metrics.deals_count)
+
+    def test_max_pages(self):
+        source = MockedPCW({self.url: [build_response(200, build_pcw_page({"Ryzen 5 3600": "150,00"}, 9), {})]})
+        source.max_pages = 1
+        self.assertEqual({"Ryzen 5 3600": "150.00"}, source.fetch_deals("AMD", self.url))
+        self.assertEqual([self.url], source.requested_urls)
+
+    def test_unchanged_pages(self):
+        first_page = build_pcw_page({"Ryzen 5 3600": "150,00"}, 2)
+        source = MockedPCW({
+            self.url: [build_response(200, first_page, {"ETag": '"v1"'}), build_response(304, b"", {}),
+                       build_response(304, b"", {})],
+            f"{self.url}?page=2": [build_response(200, build_pcw_page({"Ryzen 9 3900X": "450,00"}), {}),
+                                   build_response(200, build_pcw_page({"Ryzen 9 3900X": "440,00"}), {}),
+                                   build_response(200, build_pcw_page({"Ryzen 9 3900X": "440,00"}), {})],
+        })
+        source.fetch_deals("AMD", self.url)
+        # First page unchanged, its deals come from previous fetch
+        self.assertEqual({"Ryzen 5 3600": "150.00", "Ryzen 9 3900X": "440.00"}, source.fetch_deals("AMD", self.url))
+        self.assertRaises(PageNotModified, source.fetch_deals, "AMD", self.url)
+
+    def test_host_limit_without_fetch_pool(self):
+        responses = {self.url: build_response(200, build_pcw_page({"Ryzen 5 3600": "150,00"}, 5), {})}
+        for number in range(2, 6):
+            responses[f"{self.url}?page={number}"] = build_response(200, build_pcw_page({f"Ryzen {number}": "100,00"}), {})
+        session = ConcurrencySession(responses)
+        source = PCW()
+        source.session_registry = StandInSessionRegistry(session)
+        self.assertEqual(5, len(source.fetch_deals("AMD", self.url)))
+        # Sequential fetch (no shared limiter), next pages still respect the per host bound
+        self.assertEqual(source.max_requests_per_host, session.max_in_flight)
+        source.close()
+        self.assertIsNone(source._page_executor)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,21 @@
+import unittest
+from bestdeal.benchmark.parser_benchmark import run_benchmark, load_baselines, find_regressions
+
+
+class TestParserBenchmark(unittest.TestCase):
+    def test_corpus_deals_counts(self):
+        """
+        Only deals counts are checked, parse times are compared by the benchmark command (CI runners are too noisy)
+        """
+        baselines = load_baselines()
+        self.assertTrue(baselines)
+        results = run_benchmark(repeat=1)
+        self.assertEqual({page: baseline["deals_count"] for page, baseline in baselines.items()},
+                         {page: result["deals_count"] for page, result in results.items()})
+
+    def test_find_regressions(self):
+        baselines = {"TopAchat/page": {"deals_count": 48, "parse_ms": 10.}}
+        self.assertEqual([], find_regressions({"TopAchat/page": {"deals_count": 48, "parse_ms": 30.}}, baselines))
+        self.assertEqual(1, len(find_regressions({"TopAchat/page": {"deals_count": 47, "parse_ms": 10.}}, baselines)))
+        self.assertEqual(1, len(find_regressions({"TopAchat/page": {"deals_count": 48, "parse_ms": 40.}}, baselines)))
+        self.assertEqual(1, len(find_regressions({}, baselines)))
@@ -0,0 +1,171 @@
+import argparse
+import unittest
+from datetime import datetime
+from pymongo import MongoClient
+from bestdeal.core.maintenance import migrate_dates
+from bestdeal.core.more_exceptions import CollectionScanError
+from bestdeal.core.pricedatabase import PriceDatabase
+
+
+class MockedPriceDatabase(PriceDatabase):
+    def __init__(self, winning_plan):
+        super().__init__(collection_name="UnitTests", client=MongoClient(connect=False), create_indexes=False)
+        self.winning_plan = winning_plan
+
+    def _explain(self, command):
+        return {"queryPlanner": {"winningPlan": self.winning_plan, "rejectedPlans": [{"stage": "COLLSCAN"}]}}
+
+
+class TestCheckQueryPlans(unittest.TestCase):
+    def test_index_scan(self):
+        database = MockedPriceDatabase({"stage": "LIMIT", "inputStage": {"stage": "FETCH", "inputStage": {"stage": "IXSCAN"}}})
+        database.check_query_plans()
+
+    def test_collection_scan(self):
+        database = MockedPriceDatabase({"stage": "SORT", "inputStage": {"stage": "COLLSCAN"}})
+        self.assertRaises(CollectionScanError, database.check_query_plans)
+
+
+class TestCompletePost(unittest.TestCase):
+    def setUp(self) -> None:
+        self.database = PriceDatabase(collection_name="UnitTests", client=MongoClient(connect=False), create_indexes=False)
+
+    def test_date_fields(self):
+        post = self.database.add_date_fields({"timestamp": "20211101_181011"})
+        self.assertEqual("20211101", post["day"])
+        self.assertEqual(18, post["date"].hour)
+
+    def test_orderable(self):
+        self.assertFalse(self.database.is_orderable("MindFactory"))
+        self.assertTrue(self.database.is_orderable("LDLC"))
+
+
+class RecordingCollection:
+    def __init__(self):
+        self.filters = []
+
+    def find(self, post_filter):
+        self.filters.append(post_filter)
+        return self
+
+    def sort(self, key, direction):
+        return self
+
+    def limit(self, count):
+        return []
+
+
+class TestCheapestByFilters(unittest.TestCase):
+    def test_orderable_only(self):
+        database = PriceDatabase(collection_name="UnitTests", client=MongoClient(connect=False), create_indexes=False)
+        database.collection = RecordingCollection()
+        self.assertIsNone(database.find_daily_cheapest("20211101", "3080", "MSI"))
+        self.assertEqual([{"day": "20211101", "product_type": "3080", "product_brand": "MSI", "orderable": True}],
+                         database.collection.filters)
+
+
+class TestDailyMinimums(unittest.TestCase):
+    @staticmethod
+    def build_post(source, product_type, price, orderable=True):
+        return {"source": source, "product_type": product_type, "product_price": price, "product_name": f"{source} {price}",
+                "product_brand": "MSI", "url": "https://", "timestamp": "20211101_181011", "day": "20211101",
+                "orderable": orderable}
+
+    def test_select(self):
+        minimums = PriceDatabase.select_daily_minimums([
+            self.build_post("LDLC", "3080", 900.),
+            self.build_post("LDLC", "3080", 850.),
+            self.build_post("TopAchat", "3080", 870.),
+            self.build_post("MindFactory", "3080", 500., orderable=False),
+            self.build_post("LDLC", None, 10.),
+        ])
+        self.assertEqual({"20211101|3080|*", "20211101|3080|LDLC", "20211101|3080|TopAchat"}, set(minimums))
+        self.assertEqual("LDLC 850.0", minimums["20211101|3080|*"]["product_name"])
+        self.assertEqual("*", minimums["20211101|3080|*"]["scope"])
+        self.assertEqual("LDLC", minimums["20211101|3080|*"]["source"])
+        self.assertEqual(870., minimums["20211101|3080|TopAchat"]["product_price"])
+
+    def test_operations(self):
+        minimums = PriceDatabase.select_daily_minimums([self.build_post("LDLC", "3080", 850.)])
+        operations = PriceDatabase.build_minimum_operations(minimums.values())
+        self.assertEqual(4, len(operations))
+        # Upsert first, then conditional update of the same document
+        self.assertEqual({"_id": "20211101|3080|*"}, operations[0]._filter)
+        self.assertEqual({"_id": "20211101|3080|*", "product_price": {"$gt": 850.}}, operations[1]._filter)
+
+    def test_select_all_time_lows(self):
+        posts = [self.build_post("LDLC", "3080", 900.), self.build_post("TopAchat", "3080", 870.),
+                 self.build_post("LDLC", "3080", 800., orderable=False)]
+        posts[0]["day"] = "20200101"
+        minimums = PriceDatabase.select_all_time_lows(posts)
+        self.assertEqual({"3080|*", "3080|LDLC 900.0", "3080|TopAchat 870.0"}, set(minimums))
+        self.assertEqual("TopAchat", minimums["3080|*"]["source"])
+        self.assertEqual("20200101", minimums["3080|LDLC 900.0"]["day"])
+
+
+class BulkWriteResult:
+    def __init__(self, modified_count):
+        self.modified_count = modified_count
+
+
+class InMemoryCursor(list):
+    def limit(self, count):
+        return InMemoryCursor(self[:count])
+
+
+class InMemoryCollection:
+    """
+    Enough of a collection for migrate_date_fields: {"date": {"$exists": False}} filter and UpdateOne $set
+    """
+    name = "UnitTests"
+
+    def __init__(self, posts):
+        self.posts = {post["_id"]: post for post in posts}
+        self.batch_sizes = []
+
+    def find(self, post_filter, projection):
+        assert post_filter == {"date": {"$exists": False}}
+        return InMemoryCursor({"_id": post["_id"], "timestamp": post.get("timestamp")}
+                              for post in self.posts.values() if "date" not in post)
+
+    def bulk_write(self, operations, ordered=True):
+        self.batch_sizes.append(len(operations))
+        for operation in operations:
+            self.posts[operation._filter["_id"]].update(operation._doc["$set"])
+        return BulkWriteResult(len(operations))
+
+
+class TestMigrateDateFields(unittest.TestCase):
+    def setUp(self) -> None:
+        self.database = PriceDatabase(collection_name="UnitTests", client=MongoClient(connect=False), create_indexes=False)
+        migrated_date = datetime(2020, 1, 1)
+        self.database.collection = InMemoryCollection([
+            {"_id": 1, "timestamp": "20211101_181011"},
+            {"_id": 2, "timestamp": "20211102_090000"},
+            {"_id": 3, "timestamp": "20200101_000000", "date": migrated_date, "day": "20200101"},
+            {"_id": 4, "timestamp": "not a timestamp"},
+            {"_id": 5},
+        ])
+
+    def test_migrate(self):
+        self.assertEqual(4, self.database.migrate_date_fields(batch_size=2))
+        posts = self.database.collection.posts
+        self.assertEqual(datetime(2021, 11, 1, 18, 10, 11), posts[1]["date"].replace(tzinfo=None))
+        self.assertEqual("20211101", posts[1]["day"])
+        self.assertEqual("20211102", posts[2]["day"])
+        # Already migrated post is not rewritten
+        self.assertEqual(datetime(2020, 1, 1), posts[3]["date"])
+        self.assertEqual([2, 2], self.database.collection.batch_sizes)
+        # Unreadable timestamps are flagged, the migration does not select them again
+        self.assertEqual({"date": None, "day": None}, {key: posts[4][key] for key in ("date", "day")})
+        self.assertEqual({"_id": 5, "date": None, "day": None}, posts[5])
+
+    def test_resume(self):
+        self.database.collection.posts[1].update(self.database.add_date_fields({"timestamp": "20211101_181011"}))
+        self.assertEqual(3, self.database.migrate_date_fields(batch_size=10))
+        self.assertEqual([3], self.database.collection.batch_sizes)
+        self.assertEqual(0, self.database.migrate_date_fields(batch_size=10))
+
+    def test_command(self):
+        migrate_dates(self.database, argparse.Namespace(batch_size=1000))
+        self.assertTrue(all("day" in post for post in self.database.collection.posts.values()))
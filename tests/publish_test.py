@@ -0,0 +1,79 @@
+import threading
+import unittest
+from bestdeal.core.more_exceptions import PublishRateLimited
+from bestdeal.core.publish import Publisher, StubPublisher, PublishQueue
+
+
+class FlakyPublisher(Publisher):
+    def __init__(self, failures):
+        self.failures = list(failures)
+        self.published = []
+
+    def publish(self, text_to_publish):
+        if self.failures:
+            raise self.failures.pop(0)
+        self.published.append(text_to_publish)
+
+
+class TestPublishQueue(unittest.TestCase):
+    def test_publish(self):
+        publisher = StubPublisher()
+        recorded = []
+        publish_queue = PublishQueue(publisher, on_published=recorded.append)
+        self.assertTrue(publish_queue.submit("3080", "3080 lowest price"))
+        self.assertTrue(publish_queue.submit("3070", "3070 lowest price"))
+        publish_queue.join()
+        publish_queue.close()
+        self.assertEqual(["3080 lowest price", "3070 lowest price"], publisher.published)
+        self.assertEqual(["3080", "3070"], recorded)
+
+    def test_pending_key_is_not_queued_twice(self):
+        release = threading.Event()
+
+        class BlockedPublisher(StubPublisher):
+            def publish(self, text_to_publish):
+                release.wait()
+                super().publish(text_to_publish)
+
+        publisher = BlockedPublisher()
+        publish_queue = PublishQueue(publisher)
+        self.assertTrue(publish_queue.submit("3080", "first"))
+        self.assertFalse(publish_queue.submit("3080", "second"))
+        self.assertTrue(publish_queue.is_pending("3080"))
+        release.set()
+        publish_queue.join()
+        publish_queue.close()
+        self.assertEqual(["first"], publisher.published)
+        self.assertFalse(publish_queue.is_pending("3080"))
+
+    def test_retries(self):
+        publisher = FlakyPublisher([PublishRateLimited(0.01), Exception("Timeout"), Exception("Timeout")])
+        recorded = []
+        publish_queue = PublishQueue(publisher, on_published=recorded.append, max_attempts=3, retry_delay=0.01)
+        publish_queue.submit("3080", "3080 lowest price")
+        publish_queue.join()
+        publish_queue.close()
+        self.assertEqual(["3080 lowest price"], publisher.published)
+        self.assertEqual(["3080"], recorded)
+
+    def test_abandon(self):
+        publisher = FlakyPublisher([Exception("Forbidden")] * 2)
+        recorded = []
+        publish_queue = PublishQueue(publisher, on_published=recorded.append, max_attempts=2, retry_delay=0.01)
+        publish_queue.submit("3080", "3080 lowest price")
+        publish_queue.join()
+        publish_queue.close()
+        self.assertEqual([], publisher.published)
+        self.assertEqual([], recorded)
+        self.assertFalse(publish_queue.is_pending("3080"))
+        self.assertTrue(publish_queue.is_abandoned("3080"))
+        # Not retried during the next cycle
+        self.assertFalse(publish_queue.submit("3080", "3080 lowest price"))
+
+    def test_rate_limit_wait_is_capped(self):
+        publisher = FlakyPublisher([PublishRateLimited(3600.)])
+        publish_queue = PublishQueue(publisher, max_rate_limit_wait=0.01)
+        publish_queue.submit("3080", "3080 lowest price")
+        publish_queue.join()
+        publish_queue.close()
+        self.assertEqual(["3080 lowest price"], publisher.published)
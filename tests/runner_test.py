@@ -0,0 +1,47 @@
+import os
+import json
+import tempfile
+import unittest
+from pymongo import MongoClient
+from bestdeal.backend.runner import Runner, CategoryConfig, load_category_configs
+from bestdeal.backend.gpu_fetcher import GpuFetcher
+from bestdeal.core.publish import StubPublisher
+from bestdeal.core.sqlite_database import SqlitePriceDatabase, SqliteClassificationStore
+
+
+class TestRunner(unittest.TestCase):
+    def test_load_category_configs(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "runner.json")
+            with open(path, "w", encoding="utf-8") as config_file:
+                json.dump({"GPU": {"collection_name": "GraphicCards", "options": {"tweet_products": False}}}, config_file)
+            gpu_config, cpu_config = load_category_configs(["GPU", "CPU"], path)
+        self.assertEqual("GraphicCards", gpu_config.collection_name)
+        self.assertEqual({"tweet_products": False}, gpu_config.options)
+        self.assertEqual("CPU", cpu_config.collection_name)
+        self.assertRaises(ValueError, CategoryConfig, "RAM")
+
+    def test_shared_resources(self):
+        # No category: databases are not created, the client never connects
+        runner = Runner([], client=MongoClient(connect=False), publisher=StubPublisher(0.))
+        fetcher = runner._create_fetcher(CategoryConfig("GPU", options={"wait_in_seconds": 60}), None, None)
+        self.assertIsInstance(fetcher, GpuFetcher)
+        self.assertEqual("GPU", fetcher.name)
+        self.assertEqual(60, fetcher.wait_in_seconds)
+        self.assertIs(runner.fetch_pool, fetcher.fetch_pool)
+        self.assertIs(runner.scheduler, fetcher.scheduler)
+        self.assertIs(runner.publisher, fetcher.publisher)
+        self.assertRaises(ValueError, runner._create_fetcher, CategoryConfig("CPU", options={"unknown": 1}), None, None)
+        runner.fetch_pool.shutdown()
+
+    def test_sqlite_database(self):
+        runner = Runner([CategoryConfig("GPU"), CategoryConfig("CPU")], database_uri="sqlite://:memory:",
+                        publisher=StubPublisher(0.))
+        self.assertIsNone(runner.client)
+        self.assertIsInstance(runner.fetchers["GPU"].database, SqlitePriceDatabase)
+        self.assertIsInstance(runner.fetchers["CPU"].classification_store, SqliteClassificationStore)
+        runner.fetch_pool.shutdown()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import time
+import threading
+import unittest
+from bestdeal.backend.abstract_fetcher import AbstractFetcher
+from bestdeal.core.scheduler import AdaptiveScheduler
+from bestdeal.sources.topachat import TopAchat
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestAdaptiveScheduler(unittest.TestCase):
+    def setUp(self) -> None:
+        self.clock = FakeClock()
+        self.scheduler = AdaptiveScheduler(min_interval=100., max_interval=1000., initial_interval=400., clock=self.clock)
+
+    def test_new_pages_due(self):
+        self.scheduler.sync("GPU", ["RTX", "GTX"])
+        self.assertEqual({"RTX", "GTX"}, set(self.scheduler.pop_due("GPU")))
+        # In flight until reported
+        self.assertEqual([], self.scheduler.pop_due("GPU"))
+        self.assertIsNone(self.scheduler.get_delay("GPU"))
+        self.assertEqual([], self.scheduler.pop_due("CPU"))
+
+    def test_adapt_interval(self):
+        self.scheduler.sync("GPU", ["RTX", "GTX"])
+        self.scheduler.pop_due("GPU")
+        self.scheduler.report("GPU", "RTX", changed=True)
+        self.scheduler.report("GPU", "GTX", changed=False)
+        self.assertEqual({"RTX": 200., "GTX": 600.}, self.scheduler.get_intervals("GPU"))
+        self.assertEqual(200., self.scheduler.get_delay("GPU"))
+        self.clock.now = 200.
+        self.assertEqual(["RTX"], self.scheduler.pop_due("GPU"))
+        self.scheduler.report("GPU", "RTX", changed=True)
+        self.scheduler.pop_due("GPU")
+        self.clock.now = 600.
+        self.assertEqual({"RTX", "GTX"}, set(self.scheduler.pop_due("GPU")))
+        self.scheduler.report("GPU", "RTX", changed=True)
+        self.scheduler.report("GPU", "GTX", changed=False, failed=True)
+        self.assertEqual({"RTX": 100., "GTX": 1000.}, self.scheduler.get_intervals("GPU"))
+
+    def test_release_and_removed_pages(self):
+        self.scheduler.sync("GPU", ["RTX", "GTX"])
+        self.scheduler.pop_due("GPU")
+        self.scheduler.release("GPU", "RTX")
+        self.scheduler.sync("GPU", ["RTX"])
+        self.scheduler.report("GPU", "GTX", changed=True)
+        self.assertEqual({"RTX": 400.}, self.scheduler.get_intervals("GPU"))
+        self.clock.now = 400.
+        self.assertEqual(["RTX"], self.scheduler.pop_due("GPU"))
+
+    def test_request_budget(self):
+        scheduler = AdaptiveScheduler(max_requests_per_minute=2, clock=self.clock)
+        scheduler.sync("GPU", ["RTX"])
+        scheduler.sync("CPU", ["Ryzen", "Core"])
+        self.assertEqual(2, len(scheduler.pop_due("CPU")))
+        self.assertEqual([], scheduler.pop_due("GPU"))
+        self.assertEqual(30., scheduler.get_delay("GPU"))
+        self.clock.now = 30.
+        self.assertEqual(["RTX"], scheduler.pop_due("GPU"))
+
+
+
+class SequentialFetcher(AbstractFetcher):
+    def __init__(self):
+        super().__init__(None)
+        self.concurrent_fetch = False
+        self.fetch_threads = []
+
+    def _get_source_product_urls(self):
+        return {TopAchat: {"RTX": "https://www.topachat.com/rtx", "GTX": "https://www.topachat.com/gtx"}}
+
+    def _scrap_product(self, source, page_metrics):
+        self.fetch_threads.append(threading.current_thread())
+        return {}
+
+
+class TestScheduledFetch(unittest.TestCase):
+    def test_sequential_fetch(self):
+        fetcher = SequentialFetcher()
+        pages = list(fetcher._scrap_due_products(deadline=time.monotonic() + 0.05))
+        self.assertEqual({"RTX", "GTX"}, {page_metrics.product for _, page_metrics, _ in pages})
+        self.assertEqual([threading.current_thread()] * 2, fetcher.fetch_threads)
+        self.assertIsNone(fetcher.fetch_pool)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,26 @@
+import unittest
+from bestdeal.core.session_registry import SessionRegistry
+from bestdeal.sources.topachat import TopAchat
+from bestdeal.sources.ldlc import LDLC
+
+
+class TestSessionRegistry(unittest.TestCase):
+    def setUp(self) -> None:
+        self.registry = SessionRegistry()
+
+    def tearDown(self) -> None:
+        self.registry.close()
+
+    def test_one_session_per_vendor(self):
+        first_session = self.registry.get_session(TopAchat())
+        self.assertIs(first_session, self.registry.get_session(TopAchat()))
+        self.assertIsNot(first_session, self.registry.get_session(LDLC()))
+
+    def test_retry_policy(self):
+        source = TopAchat()
+        adapter = self.registry.get_session(source).get_adapter("https://www.topachat.com")
+        self.assertEqual(source.retry_total, adapter.max_retries.total)
+        self.assertEqual(source.retry_backoff_factor, adapter.max_retries.backoff_factor)
+
+    def test_compression_is_negotiated(self):
+        self.assertIn("gzip", TopAchat().headers["Accept-Encoding"])
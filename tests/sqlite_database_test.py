@@ -0,0 +1,127 @@
+import unittest
+from datetime import datetime, timezone
+from bestdeal.core.metrics import CommandMetrics, default_command_metrics
+from bestdeal.core.more_exceptions import CollectionScanError
+from bestdeal.core.sqlite_database import SqlitePriceDatabase
+from bestdeal.core.storage import create_price_database
+
+
+def create_post(product_name: str, product_price: float, timestamp: str, source: str = "LDLC") -> dict:
+    return {"product_name": product_name, "product_brand": "MSI", "product_type": "3080", "product_price": product_price,
+            "source": source, "url": "http://www.vendor.com", "timestamp": timestamp}
+
+
+class TestSqlitePriceDatabase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.database = create_price_database("UnitTests", "sqlite://:memory:")
+        self.database.bulk_insert([
+            create_post("MSI RTX 3080", 800., "20211101_100000"),
+            create_post("MSI RTX 3080", 750., "20211101_120000"),
+            create_post("MSI RTX 3080 Ti", 1200., "20211101_110000", source="TopAchat"),
+            create_post("MSI RTX 3080", 500., "20211101_130000", source="MindFactory"),
+            create_post("MSI RTX 3080", 900., "20211102_100000"),
+        ])
+
+    def tearDown(self) -> None:
+        self.database.close()
+
+    def test_factory(self):
+        self.assertIsInstance(self.database, SqlitePriceDatabase)
+        self.assertRaises(ValueError, SqlitePriceDatabase, 'UnitTests"; DROP TABLE "Tweet')
+
+    def test_cheapest(self):
+        cheapest = self.database.find_cheapest("3080", "20211101")
+        self.assertEqual(750., cheapest["product_price"])
+        self.assertEqual(datetime(2021, 11, 1, 12, tzinfo=timezone.utc), cheapest["date"])
+        self.assertEqual(750., self.database.find_cheapest("3080", None)["product_price"])
+        self.assertEqual(1200., self.database.find_daily_minimum("20211101", "3080", "TopAchat")["product_price"])
+        self.assertEqual(1200., self.database.find_all_time_low("3080", "MSI RTX 3080 Ti")["product_price"])
+        # MindFactory post at 500 cannot be ordered
+        self.assertEqual(750., self.database.find_cheapest_by_filters("20211101")["product_price"])
+        self.assertRaises(Exception, self.database.find_cheapest, "3090", "20211101")
+
+    def test_daily_cheapest(self):
+        self.assertEqual(750., self.database.find_daily_cheapest("20211101", "3080")["product_price"])
+        self.assertEqual(1200., self.database.find_daily_cheapest("20211101", source="TopAchat")["product_price"])
+        # Brand selected, posts are searched and MindFactory is still ignored
+        self.assertEqual(750., self.database.find_daily_cheapest("20211101", "3080", "MSI")["product_price"])
+        # Day not rolled up yet, posts are searched
+        with self.database.transaction() as connection:
+            connection.execute(f"DELETE FROM {self.database.daily_minimum_table}")
+        self.assertIsNone(self.database.find_daily_minimum("20211102", "3080"))
+        self.assertEqual(900., self.database.find_daily_cheapest("20211102", "3080")["product_price"])
+        self.assertIsNone(self.database.find_daily_cheapest("20211103", "3080"))
+
+    def test_cheapest_per_product_type_partly_rolled_up(self):
+        post = create_post("MSI RTX 3090", 1500., "20211101_140000")
+        post["product_type"] = "3090"
+        self.database.bulk_insert([post])
+        # Rollup of the 3090 batch failed
+        with self.database.transaction() as connection:
+            connection.execute(f"DELETE FROM {self.database.daily_minimum_table} WHERE product_type = '3090'")
+        cheapest_posts = self.database.find_cheapest_per_product_type("20211101")
+        self.assertEqual({"3080": 750., "3090": 1500.},
+                         {product_type: post["product_price"] for product_type, post in cheapest_posts.items()})
+
+    def test_command_metrics(self):
+        with default_command_metrics.scoped("SqliteUnitTests"):
+            before = default_command_metrics.snapshot("SqliteUnitTests")
+            self.database.bulk_insert([create_post("MSI RTX 3080", 700., "20211101_150000")])
+            self.database.find_last_prices("20211101")
+            commands = CommandMetrics.difference(default_command_metrics.snapshot("SqliteUnitTests"), before,
+                                                 self.database.get_collection_names())
+        self.assertEqual({("UnitTests", "insert"), ("UnitTests", "select"), ("UnitTestsDailyMinimum", "insert"),
+                          ("UnitTestsDailyMinimum", "update"), ("UnitTestsAllTimeLow", "insert"),
+                          ("UnitTestsAllTimeLow", "update")}, set(commands))
+        self.assertEqual(1, commands[("UnitTests", "select")]["count"])
+
+    def test_rebuild_minimums(self):
+        self.assertEqual(5, self.database.rebuild_daily_minimums())
+        self.assertEqual(3, self.database.rebuild_all_time_lows())
+        self.assertEqual(750., self.database.find_cheapest_per_product_type("20211101")["3080"]["product_price"])
+        history = self.database.find_daily_minimums("20211101", "20211107", bucket_days=7)
+        self.assertEqual([{"day": "20211101", "product_type": "3080", "source": "*", "product_price": 750.}], history)
+
+    def test_last_prices(self):
+        self.assertEqual(750., self.database.find_last_price("MSI RTX 3080", "20211101")["product_price"])
+        # Latest post of MSI RTX 3080 is from MindFactory, which cannot be ordered
+        self.assertEqual({"MSI RTX 3080": 750., "MSI RTX 3080 Ti": 1200.}, self.database.find_last_prices("20211101"))
+
+    def test_posts_page(self):
+        total, rows = self.database.find_posts_page("20211101", page=1, page_size=2, columns=("product_price", "source"))
+        self.assertEqual(4, total)
+        self.assertEqual([{"product_price": 800., "source": "LDLC"}, {"product_price": 1200., "source": "TopAchat"}], rows)
+        self.assertEqual(["LDLC", "TopAchat"], self.database.find_filter_facets("20211101")["source"])
+
+    def test_tweets_and_cycles(self):
+        self.assertFalse(self.database.tweet_exists("3080", "20211101"))
+        self.database.insert_tweet_status("3080", "20211101")
+        self.assertTrue(self.database.tweet_exists("3080", "20211101"))
+        self.assertEqual(["3080"], self.database.find_tweeted_product_types("20211101"))
+        self.database.record_cycle("20211101_130000", 5)
+        self.assertEqual("20211101_130000", self.database.find_last_cycle_timestamp())
+        self.database.insert_cycle_report({"fetcher": "GpuFetcher", "date": datetime(2021, 11, 1, 13, tzinfo=timezone.utc)})
+        self.assertEqual(datetime(2021, 11, 1, 13, tzinfo=timezone.utc),
+                         self.database.find_cycle_reports("GpuFetcher")[0]["date"])
+
+    def test_clear_posts(self):
+        self.database.clear_posts()
+        self.assertEqual({}, self.database.find_last_prices("20211101"))
+        self.assertIsNone(self.database.find_all_time_low("3080"))
+
+    def test_classification_store(self):
+        store = self.database.get_classification_store()
+        store.save("GPU", "v1", {"MSI RTX 3080": ("MSI", "3080")})
+        self.assertEqual({"MSI RTX 3080": ("MSI", "3080")}, store.load("GPU", "v1"))
+        self.assertEqual({}, store.load("GPU", "v2"))
+        self.assertEqual({}, store.load("GPU", "v1"))
+
+    def test_query_plans(self):
+        self.database.check_query_plans()
+        database = SqlitePriceDatabase("UnitTests", create_indexes=False)
+        self.assertRaises(CollectionScanError, database.check_query_plans)
+        database.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
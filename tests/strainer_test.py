@@ -0,0 +1,30 @@
+import bs4
+import pytest
+from bestdeal.benchmark.corpus import iterate_corpus
+from bestdeal.benchmark.parser_benchmark import SOURCE_CLASSES
+
+
+def parse_deals(source, content: bytes, strained: bool) -> dict:
+    deals = {}
+    soup = bs4.BeautifulSoup(content, source.parser_features, parse_only=source.parse_only if strained else None,
+                             from_encoding="utf-8")
+    source._enrich_deals_from_soup(soup, deals)
+    return deals
+
+
+@pytest.mark.parametrize("source_name", sorted(SOURCE_CLASSES))
+def test_strained_parse(source_name):
+    """
+    parse_only must not change deals: every corpus page of the vendor (recorded pages included,
+    see python -m bestdeal.benchmark.corpus record) is parsed with and without its strainer
+    """
+    source = SOURCE_CLASSES[source_name]()
+    assert source.parse_only is not None
+    pages = [path for page_source_name, _, path in iterate_corpus() if page_source_name == source_name]
+    assert pages, f"No corpus page for [{source_name}]"
+    for path in pages:
+        with open(path, "rb") as page_file:
+            content = page_file.read()
+        deals = parse_deals(source, content, strained=False)
+        assert deals, path
+        assert deals == parse_deals(source, content, strained=True), path
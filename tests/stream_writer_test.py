@@ -0,0 +1,103 @@
+import threading
+import unittest
+from bestdeal.core.stream_writer import StreamingWriter
+
+
+class BulkWriteError(Exception):
+    def __init__(self, inserted_count):
+        super().__init__("Partial write")
+        self.details = {"nInserted": inserted_count}
+
+
+class MockedDatabase:
+    def __init__(self, failing_source=None, acknowledged=True):
+        self.batches = []
+        self.failing_source = failing_source
+        self.acknowledged = acknowledged
+        self.release = threading.Event()
+        self.release.set()
+
+    def bulk_write_posts(self, posts, write_concern=None):
+        self.release.wait()
+        if posts[0]["source"] == self.failing_source:
+            raise Exception("Write failed")
+        self.batches.append([post["product_name"] for post in posts])
+        return len(posts) if self.acknowledged else None
+
+
+class PartiallyFailingDatabase(MockedDatabase):
+    def bulk_write_posts(self, posts, write_concern=None):
+        # Last post is a duplicate
+        raise BulkWriteError(len(posts) - 1)
+
+
+def create_posts(source, count):
+    return [{"product_name": f"{source} {index}", "source": source} for index in range(count)]
+
+
+class TestStreamingWriter(unittest.TestCase):
+    def test_batches_per_source(self):
+        database = MockedDatabase()
+        writer = StreamingWriter(database, batch_size=2)
+        for post in create_posts("LDLC", 3) + create_posts("PCW", 1):
+            writer.add(post)
+        results = writer.close()
+        self.assertEqual([["LDLC 0", "LDLC 1"], ["LDLC 2"], ["PCW 0"]], database.batches)
+        self.assertEqual([2, 1, 1], [result.document_count for result in results])
+        self.assertEqual(4, writer.written_count)
+
+    def test_interleaved_sources(self):
+        database = MockedDatabase()
+        writer = StreamingWriter(database, batch_size=2)
+        for ldlc_post, pcw_post in zip(create_posts("LDLC", 3), create_posts("PCW", 3)):
+            writer.add(ldlc_post)
+            writer.add(pcw_post)
+        writer.close()
+        self.assertEqual([["LDLC 0", "LDLC 1"], ["PCW 0", "PCW 1"], ["LDLC 2"], ["PCW 2"]], database.batches)
+
+    def test_flush_one_source(self):
+        database = MockedDatabase()
+        writer = StreamingWriter(database, batch_size=10)
+        for post in create_posts("LDLC", 2) + create_posts("PCW", 1):
+            writer.add(post)
+        writer.flush("PCW")
+        writer.add(create_posts("PCW", 2)[1])
+        writer.close()
+        self.assertEqual([["PCW 0"], ["LDLC 0", "LDLC 1"], ["PCW 1"]], database.batches)
+
+    def test_unacknowledged_writes(self):
+        writer = StreamingWriter(MockedDatabase(acknowledged=False), batch_size=2)
+        for post in create_posts("LDLC", 3):
+            writer.add(post)
+        results = writer.close()
+        self.assertEqual([None, None], [result.document_count for result in results])
+        self.assertEqual(0, writer.written_count)
+        self.assertEqual(3, writer.unacknowledged_count)
+
+    def test_partial_write(self):
+        writer = StreamingWriter(PartiallyFailingDatabase(), batch_size=10)
+        for post in create_posts("LDLC", 4):
+            writer.add(post)
+        self.assertRaises(BulkWriteError, writer.close)
+        self.assertEqual(3, writer.written_count)
+
+    def test_back_pressure(self):
+        database = MockedDatabase()
+        database.release.clear()
+        writer = StreamingWriter(database, batch_size=1, max_pending_batches=1)
+        adder = threading.Thread(target=lambda: [writer.add(post) for post in create_posts("LDLC", 4)])
+        adder.start()
+        adder.join(timeout=0.2)
+        self.assertTrue(adder.is_alive(), "Scraping should wait for pending batches")
+        database.release.set()
+        adder.join()
+        writer.close()
+        self.assertEqual(4, len(database.batches))
+
+    def test_failed_batch(self):
+        database = MockedDatabase(failing_source="PCW")
+        writer = StreamingWriter(database, batch_size=10)
+        for post in create_posts("LDLC", 2) + create_posts("PCW", 2):
+            writer.add(post)
+        self.assertRaises(Exception, writer.close)
+        self.assertEqual(2, writer.written_count)
@@ -0,0 +1,51 @@
+import unittest
+import requests
+from bestdeal.core.structured_data import js_literal_to_json, extract_js_objects, extract_json_ld, iterate_products
+from bestdeal.sources.ldlc import LDLC
+
+
+LDLC_PAGE = """
+<html><head>
+<script>var tracking = {'page': 'listing'};</script>
+<script>
+dataLayer.push({
+    'event': 'productImpressions',
+    'ecommerce': {
+        'currencyCode': 'EUR',
+        'impressions': [
+            {'name': 'MSI GeForce RTX 3080 GAMING Z TRIO LHR, 10 Go', 'id': 'AR202109', 'price': '1099.95', 'position': 1},
+            {'name': 'ASUS TUF RTX 3070 Ti: O8G', 'id': 'AR202110', 'price': 749.9, 'position': 2},
+            {'name': 'Gainward RTX 3060 Ghost (l\\'edition)', 'id': 'AR202111', 'price': '429.95', 'position': 3},
+        ]
+    }
+});
+</script>
+</head><body></body></html>
+"""
+
+
+class TestStructuredData(unittest.TestCase):
+    def test_js_literal_to_json(self):
+        literal = """{name: 'MSI, 10 Go: "OC"', 'price': 42.5, tags: ['a', "b",],}"""
+        self.assertEqual('{"name": "MSI, 10 Go: \\"OC\\"", "price": 42.5, "tags": ["a", "b"]}', js_literal_to_json(literal))
+
+    def test_extract_js_objects(self):
+        objects = list(extract_js_objects(LDLC_PAGE, "ecommerce"))
+        self.assertEqual(1, len(objects))
+        self.assertEqual(3, len(objects[0]["impressions"]))
+
+    def test_extract_json_ld(self):
+        page = '<script type="application/ld+json">{"@type": "Product", "name": "PNY RTX 3090", "offers": {"price": "1599.00"}}</script>'
+        products = [product for data in extract_json_ld(page) for product in iterate_products(data)]
+        self.assertEqual([("PNY RTX 3090", "1599.00")], products)
+
+    def test_ldlc_deals(self):
+        response = requests.Response()
+        response._content = LDLC_PAGE.encode("utf-8")
+        response.encoding = "utf-8"
+        deals = LDLC()._extract_deals(response)
+        self.assertEqual({
+            "MSI GeForce RTX 3080 GAMING Z TRIO LHR, 10 Go": "1099.95",
+            "ASUS TUF RTX 3070 Ti: O8G": "749.90",
+            "Gainward RTX 3060 Ghost (l'edition)": "429.95",
+        }, deals)
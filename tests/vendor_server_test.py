@@ -0,0 +1,32 @@
+import unittest
+import requests
+from bestdeal.benchmark.vendor_server import VendorServer
+from bestdeal.sources.topachat import TopAchat
+
+
+class TestVendorServer(unittest.TestCase):
+    def setUp(self) -> None:
+        self.server = VendorServer(catalog_size=12, latency=0., jitter=0., price_change_rate=1.).start()
+
+    def tearDown(self) -> None:
+        self.server.stop()
+
+    def test_page(self):
+        response = requests.get(self.server.url("TopAchat", "page_0"))
+        self.assertEqual(200, response.status_code)
+        deals = TopAchat().extract_deals_from_page(response.content, response.encoding)
+        self.assertEqual(12, len(deals))
+
+    def test_not_modified(self):
+        etag = requests.get(self.server.url("LDLC", "page_0")).headers["ETag"]
+        response = requests.get(self.server.url("LDLC", "page_0"), headers={"If-None-Match": etag})
+        self.assertEqual(304, response.status_code)
+        self.server.advance_cycle()
+        response = requests.get(self.server.url("LDLC", "page_0"), headers={"If-None-Match": etag})
+        self.assertEqual(200, response.status_code)
+        self.assertNotEqual(etag, response.headers["ETag"])
+
+    def test_errors(self):
+        self.server.error_rate = 1.
+        self.assertEqual(503, requests.get(self.server.url("PCW", "page_0")).status_code)
+        self.assertEqual(404, requests.get(f"{self.server.base_url}/Unknown/page_0").status_code)